@@ -0,0 +1,2 @@
+# This file makes the benchmarks directory a Python package.
+# Standalone benchmark scripts, run with: python -m backend.benchmarks.<name>
@@ -0,0 +1,107 @@
+"""Benchmark evaluation of running A/B tests from their variant statistics.
+
+Creates synthetic A/B tests with variant statistics in a throwaway SQLite
+database, then times the vectorized z-test alone and ``evaluate_running``,
+which also loads the tests and statistics and stores every test's metrics,
+winner and confidence level.
+
+Usage:
+    python -m backend.benchmarks.ab_test_evaluation --tests 100 500 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from .. import models  # noqa: F401  (configures all mappers)
+from ..models.ab_test_stats import ABTestVariantStats
+from ..models.ai_data import ABTest
+from ..services.ab_test_monitor import ABTestMonitor, two_proportion_z_test
+
+
+def fill_tests(engine, first_id: int, n_tests: int, rng: np.random.Generator, now: datetime):
+    """Insert running tests with ids from ``first_id``; about a third have a real difference between variants."""
+    ids = np.arange(first_id, first_id + n_tests)
+    leads = rng.integers(0, 50000, size=(2, n_tests))
+    base_rate = rng.uniform(0.01, 0.2, size=n_tests)
+    lift = np.where(rng.random(n_tests) < 0.33, rng.uniform(0.8, 1.3, size=n_tests), 1.0)
+    conversions = rng.binomial(leads, np.minimum(np.stack([base_rate, base_rate * lift]), 1.0))
+
+    with engine.begin() as connection:
+        connection.execute(insert(ABTest.__table__), [
+            {
+                "id": int(ab_test_id),
+                "campaign_a_id": int(2 * ab_test_id),
+                "campaign_b_id": int(2 * ab_test_id + 1),
+                "start_date": now - timedelta(days=int(rng.integers(1, 30))),
+                "end_date": None
+            }
+            for ab_test_id in ids
+        ])
+        connection.execute(insert(ABTestVariantStats.__table__), [
+            {
+                "ab_test_id": int(ab_test_id),
+                "variant": variant,
+                "exposures": int(leads[v, i]) * 3,
+                "unique_leads": int(leads[v, i]),
+                "conversions": int(conversions[v, i]),
+                "updated_at": now
+            }
+            for i, ab_test_id in enumerate(ids)
+            for v, variant in enumerate(("A", "B"))
+        ])
+    return leads, conversions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tests", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        for model in (ABTest, ABTestVariantStats):
+            model.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+
+        leads = np.zeros((2, 0), dtype=np.int64)
+        conversions = np.zeros((2, 0), dtype=np.int64)
+        for n_tests in sorted(args.tests):
+            # Grow the same table so smaller sizes are a prefix of larger ones
+            added_leads, added_conversions = fill_tests(engine, leads.shape[1] + 1, n_tests - leads.shape[1], rng, now)
+            leads = np.concatenate([leads, added_leads], axis=1)
+            conversions = np.concatenate([conversions, added_conversions], axis=1)
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                two_proportion_z_test(conversions[0], leads[0], conversions[1], leads[1])
+            z_test_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+            timings = []
+            for _ in range(args.repeat):
+                db = Session()
+                try:
+                    start = time.perf_counter()
+                    evaluations = ABTestMonitor(db).evaluate_running(now)
+                    timings.append(time.perf_counter() - start)
+                finally:
+                    db.close()
+
+            significant = sum(evaluation["metrics"]["significant"] for evaluation in evaluations)
+            print(
+                f"{n_tests:>6} tests  z-test {z_test_ms:7.3f}ms  "
+                f"evaluate_running p50 {np.median(timings) * 1000:8.1f}ms  "
+                f"max {max(timings) * 1000:8.1f}ms  significant {significant}"
+            )
+
+
+if __name__ == "__main__":
+    main()
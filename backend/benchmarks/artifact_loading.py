@@ -0,0 +1,161 @@
+"""Benchmark cold-load time and per-process memory of model artifacts.
+
+Compares the legacy single-file ``joblib.load`` artifacts with the memory-mapped
+artifact directories. N worker processes load the same artifacts concurrently,
+touch every array as serving would, and then report load time plus RSS, private
+(anonymous) RSS and PSS from /proc, so page-cache sharing between workers shows up.
+
+Usage:
+    python -m backend.benchmarks.artifact_loading --leads 200000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import StandardScaler
+
+from .recommendation_index import synthetic_profiles
+from ..services.compiled_forest import CompiledForest
+from ..services.model_artifacts import save_artifact, load_artifact
+from ..services.neighbor_index import NeighborIndex
+
+
+def _memory_kb():
+    """VmRSS, RssAnon and Pss of the current process in kB (Linux only)."""
+    values = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(rest.split()[0])
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            if line.startswith("Pss:"):
+                values["Pss"] = int(line.split()[1])
+    return values
+
+
+def build_artifacts(directory: str, n_leads: int, k: int, seed: int = 42):
+    """Write legacy and mmap variants of a recommendation and a lead scoring artifact."""
+    rng = np.random.default_rng(seed)
+
+    vectorizer = TfidfVectorizer(analyzer='word', token_pattern=r'[^:]+:[^:\s]+', min_df=2)
+    vectorizer.fit(synthetic_profiles(n_leads, seed))
+
+    counts = np.full(n_leads, k, dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    index = NeighborIndex(
+        indptr,
+        rng.integers(n_leads, size=indptr[-1], dtype=np.int32),
+        np.sort(rng.random(indptr[-1], dtype=np.float32))[::-1].copy(),
+        np.arange(1, n_leads + 1, dtype=np.int64)
+    )
+
+    X = rng.normal(size=(20_000, 8)) * [1, 1, 10, 3, 20, 3, 500, 100]
+    y = (X[:, 2] + 0.3 * X[:, 4] + rng.normal(size=len(X)) * 5 > 0).astype(int)
+    scaler = StandardScaler()
+    forest = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    forest.fit(scaler.fit_transform(X), y)
+
+    paths = {
+        "recommendation_joblib": os.path.join(directory, "recommendation.joblib"),
+        "recommendation_mmap": os.path.join(directory, "recommendation"),
+        "scoring_joblib": os.path.join(directory, "lead_scoring.joblib"),
+        "scoring_mmap": os.path.join(directory, "lead_scoring"),
+    }
+    joblib.dump({'vectorizer': vectorizer, 'neighbor_index': index}, paths["recommendation_joblib"])
+    joblib.dump({'model': forest, 'scaler': scaler}, paths["scoring_joblib"])
+
+    arrays = index.to_arrays()
+    arrays['vocabulary'] = vectorizer.get_feature_names_out().astype(str)
+    arrays['idf'] = vectorizer.idf_
+    save_artifact(paths["recommendation_mmap"], arrays, {'vectorizer_params': vectorizer.get_params()})
+
+    compiled = CompiledForest.from_sklearn(forest, scaler)
+    save_artifact(paths["scoring_mmap"], compiled.to_arrays(), compiled.to_objects())
+    return paths
+
+
+def child(mode: str, recommendation_path: str, scoring_path: str):
+    """Load both artifacts, touch them like a serving worker, then report memory."""
+    rows = np.random.default_rng(0).normal(size=(256, 8))
+
+    start = time.perf_counter()
+    if mode == "joblib":
+        recommendation = joblib.load(recommendation_path)
+        scoring = joblib.load(scoring_path)
+        index = recommendation['neighbor_index']
+    else:
+        arrays, _ = load_artifact(recommendation_path)
+        index = NeighborIndex.from_arrays(arrays)
+        scoring_arrays, scoring_objects = load_artifact(scoring_path)
+        scoring = CompiledForest.from_arrays(scoring_arrays, scoring_objects)
+    load_seconds = time.perf_counter() - start
+
+    # Touch every page of the index and run one scoring batch
+    float(index.scores.sum()) + int(index.indices.sum()) + int(index.ids.sum())
+    if mode == "joblib":
+        scoring['model'].predict_proba(scoring['scaler'].transform(rows))
+    else:
+        scoring.predict_proba(rows)
+
+    print(json.dumps({"load_s": load_seconds}), flush=True)
+    sys.stdin.readline()  # wait until every worker is loaded
+    print(json.dumps(_memory_kb()), flush=True)
+
+
+def run_workers(mode: str, paths, n_workers: int):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "backend.benchmarks.artifact_loading", "--child", mode,
+             paths[f"recommendation_{mode}"], paths[f"scoring_{mode}"]],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(n_workers)
+    ]
+    loads = [json.loads(proc.stdout.readline())["load_s"] for proc in procs]
+    memory = []
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        memory.append(json.loads(proc.stdout.readline()))
+        proc.wait()
+    return loads, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "RECOMMENDATION", "SCORING"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_artifacts(directory, args.leads, args.k)
+        print(f"{args.leads} leads, k={args.k}, {args.workers} concurrent workers")
+        print(f"{'format':>8} {'load s':>8} {'RSS MB':>8} {'anon MB':>8} {'PSS MB':>8}")
+        for mode in ("joblib", "mmap"):
+            loads, memory = run_workers(mode, paths, args.workers)
+            print(
+                f"{mode:>8} {np.mean(loads):>8.3f} "
+                f"{np.mean([m['VmRSS'] for m in memory]) / 1024:>8.1f} "
+                f"{np.mean([m['RssAnon'] for m in memory]) / 1024:>8.1f} "
+                f"{np.mean([m['Pss'] for m in memory]) / 1024:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
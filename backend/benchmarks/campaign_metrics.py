@@ -0,0 +1,204 @@
+"""Benchmark campaign metrics from rollups against aggregating or loading every interaction.
+
+Fills a throwaway SQLite database with synthetic interactions for one large
+campaign, alongside a smaller amount of traffic from other campaigns, rebuilds
+the analytics rollups, then times ``AnalyticsService._calculate_campaign_metrics``
+(rollups for closed hours, raw rows for the current one) against a grouped
+aggregate over all of the campaign's interactions and against the original
+implementation, which loaded them as ORM objects and counted them in Python.
+All must return the same metrics. With ``--memory`` the peak Python allocation
+of each path is measured in a separate, traced run.
+
+Usage:
+    python -m backend.benchmarks.campaign_metrics --sizes 1000000 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from .. import models  # noqa: F401  (configures all mappers)
+from ..config.ai_config import MODEL_PARAMETERS
+from ..models.analytics_rollup import CampaignInteractionRollup, CampaignLead, LeadInteractionRollup
+from ..models.user_item_interaction import UserItemInteraction
+from ..services.analytics_rollup_service import AnalyticsRollupService
+from ..services.analytics_service import AnalyticsService
+
+CAMPAIGN_ID = 1
+TYPES = ["view", "click", "email_open", "form_submit", "conversion"]
+TYPE_WEIGHTS = [0.55, 0.25, 0.12, 0.05, 0.03]
+
+
+def fill_interactions(
+    engine,
+    campaign_id: int,
+    n_interactions: int,
+    n_leads: int,
+    rng: np.random.Generator,
+    now: datetime,
+    chunk_size: int = 200000
+):
+    """Insert ``n_interactions`` rows for ``campaign_id`` from leads skewed towards low ids."""
+    with engine.begin() as connection:
+        for start in range(0, n_interactions, chunk_size):
+            size = min(chunk_size, n_interactions - start)
+            lead_ids = np.minimum(rng.zipf(1.3, size=size), n_leads)
+            kinds = rng.choice(len(TYPES), size=size, p=TYPE_WEIGHTS)
+            ages = rng.integers(0, 90 * 86400, size=size)
+            connection.execute(insert(UserItemInteraction.__table__), [
+                {
+                    "user_id": int(lead_id % 1000) + 1,
+                    "lead_id": int(lead_id),
+                    "campaign_id": campaign_id,
+                    "item_id": int(kind),
+                    "interaction_type": TYPES[kind],
+                    "timestamp": now - timedelta(seconds=int(age))
+                }
+                for lead_id, kind, age in zip(lead_ids.tolist(), kinds.tolist(), ages.tolist())
+            ])
+
+
+def aggregate_campaign_metrics(campaign, db):
+    """Grouped aggregates over every interaction of the campaign."""
+    total_interactions, unique_leads = db.query(
+        func.count(UserItemInteraction.id),
+        func.count(func.distinct(UserItemInteraction.lead_id))
+    ).filter(UserItemInteraction.campaign_id == campaign.id).one()
+    interaction_types = dict(
+        db.query(UserItemInteraction.interaction_type, func.count(UserItemInteraction.id))
+        .filter(UserItemInteraction.campaign_id == campaign.id)
+        .group_by(UserItemInteraction.interaction_type)
+        .all()
+    )
+    return {
+        "total_interactions": total_interactions,
+        "unique_leads": unique_leads,
+        "interaction_types": interaction_types,
+        "engagement_rate": total_interactions / unique_leads if unique_leads > 0 else 0,
+        "conversion_rate": interaction_types.get("conversion", 0) / unique_leads if unique_leads > 0 else 0,
+        "timestamp": datetime.utcnow()
+    }
+
+
+def orm_campaign_metrics(campaign, db):
+    """The previous implementation: every interaction becomes an ORM object."""
+    interactions = db.query(UserItemInteraction).filter(
+        UserItemInteraction.campaign_id == campaign.id
+    ).all()
+    total_interactions = len(interactions)
+    unique_leads = len(set(i.lead_id for i in interactions))
+    interaction_types = {}
+    for interaction in interactions:
+        if interaction.interaction_type not in interaction_types:
+            interaction_types[interaction.interaction_type] = 0
+        interaction_types[interaction.interaction_type] += 1
+    conversions = sum(1 for i in interactions if i.interaction_type == "conversion")
+    return {
+        "total_interactions": total_interactions,
+        "unique_leads": unique_leads,
+        "interaction_types": interaction_types,
+        "engagement_rate": total_interactions / unique_leads if unique_leads > 0 else 0,
+        "conversion_rate": conversions / unique_leads if unique_leads > 0 else 0,
+        "timestamp": datetime.utcnow()
+    }
+
+
+def run(metrics, campaign, Session, traced: bool):
+    """Metrics, seconds and (when traced) peak traced allocation in bytes."""
+    db = Session()
+    try:
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = metrics(campaign, db)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traced else None
+    finally:
+        if traced:
+            tracemalloc.stop()
+        db.close()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--leads", type=int, default=200_000)
+    parser.add_argument(
+        "--other-campaigns",
+        type=float,
+        default=0.2,
+        help="other campaigns' rows, as a share of the largest size"
+    )
+    parser.add_argument(
+        "--orm-max",
+        type=int,
+        default=10_000_000,
+        help="skip the ORM path above this many interactions"
+    )
+    parser.add_argument("--memory", action="store_true", help="also measure peak allocation of each path")
+    args = parser.parse_args()
+
+    # Only the metric query is exercised; it needs no Vertex AI client
+    service = AnalyticsService.__new__(AnalyticsService)
+    service.config = MODEL_PARAMETERS["analytics"]
+    campaign = SimpleNamespace(id=CAMPAIGN_ID)
+
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        for model in (UserItemInteraction, CampaignInteractionRollup, LeadInteractionRollup, CampaignLead):
+            model.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+
+        start = time.perf_counter()
+        fill_interactions(engine, CAMPAIGN_ID + 1, int(max(args.sizes) * args.other_campaigns), args.leads, rng, now)
+        print(f"filled other campaigns in {time.perf_counter() - start:.1f}s")
+
+        n_filled = 0
+        for size in sorted(args.sizes):
+            # Grow the same campaign so smaller sizes are a prefix of larger ones
+            start = time.perf_counter()
+            fill_interactions(engine, CAMPAIGN_ID, size - n_filled, args.leads, rng, now)
+            n_filled = size
+            print(f"filled campaign to {size} interactions in {time.perf_counter() - start:.1f}s")
+
+            db = Session()
+            try:
+                start = time.perf_counter()
+                written = AnalyticsRollupService(db).rebuild()
+                print(f"rebuilt rollups {written} in {time.perf_counter() - start:.1f}s")
+            finally:
+                db.close()
+
+            paths = [("rollup", service._calculate_campaign_metrics), ("aggregate", aggregate_campaign_metrics)]
+            if size <= args.orm_max:
+                paths.append(("orm", orm_campaign_metrics))
+
+            line = f"{size:>9} interactions"
+            baseline = None
+            for name, metrics in paths:
+                result, seconds, _ = run(metrics, campaign, Session, traced=False)
+                if baseline is None:
+                    baseline = (result, seconds)
+                    line += f"  {name} {seconds:7.3f}s"
+                    continue
+                same = all(result[key] == baseline[0][key] for key in result if key != "timestamp")
+                line += f"  {name} {seconds:7.3f}s ({seconds / baseline[1]:7.1f}x, same {same})"
+            if args.memory:
+                for name, metrics in paths:
+                    _, _, peak = run(metrics, campaign, Session, traced=True)
+                    line += f"  {name} peak {peak / 2**20:8.1f}MiB"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Train-time, memory and query-latency benchmark of the implicit ALS engine.
+
+Generates synthetic implicit feedback with latent user/item clusters and
+Zipf-distributed item popularity, holds out one interaction per user, trains
+with the same settings as CollaborativeFilteringService and reports train
+time per iteration, peak traced memory, single-user top-k latency and the
+hit rate of the held-out items as a sanity check.
+
+Usage:
+    python -m backend.benchmarks.collaborative_filtering --users 200000 --items 20000 --interactions 5000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+
+from .forest_scoring import percentiles
+from ..config.ai_config import MODEL_PARAMETERS
+from ..services.collaborative_filtering import FactorModel, implicit_als
+
+
+def synthetic_interactions(n_users: int, n_items: int, n_interactions: int, rng: np.random.Generator):
+    """(user, item, weight) triples where users mostly interact with items of their cluster."""
+    n_clusters = 50
+    user_cluster = rng.integers(n_clusters, size=n_users)
+    item_cluster = rng.integers(n_clusters, size=n_items)
+    items_by_cluster = [np.flatnonzero(item_cluster == c) for c in range(n_clusters)]
+
+    users = rng.integers(n_users, size=n_interactions)
+    items = np.empty(n_interactions, dtype=np.int64)
+    in_cluster = rng.random(n_interactions) < 0.8
+    # Popular items first within each cluster
+    for cluster in range(n_clusters):
+        mask = in_cluster & (user_cluster[users] == cluster)
+        pool = items_by_cluster[cluster]
+        if len(pool):
+            items[mask] = pool[(rng.zipf(1.3, size=mask.sum()) - 1) % len(pool)]
+        else:
+            in_cluster &= ~mask
+    items[~in_cluster] = (rng.zipf(1.3, size=(~in_cluster).sum()) - 1) % n_items
+
+    weights = rng.choice([1.0, 2.0, 5.0], p=[0.8, 0.15, 0.05], size=n_interactions)
+    return users, items, weights
+
+
+def main():
+    config = MODEL_PARAMETERS["collaborative_filtering"]
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--interactions", type=int, default=2_000_000)
+    parser.add_argument("--factors", type=int, default=config["factors"])
+    parser.add_argument("--iterations", type=int, default=config["iterations"])
+    parser.add_argument("--k", type=int, default=10, help="recommendations per query")
+    parser.add_argument("--queries", type=int, default=2_000, help="single-user queries to time")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    users, items, weights = synthetic_interactions(args.users, args.items, args.interactions, rng)
+    matrix = sparse.csr_matrix(
+        (1.0 + config["alpha"] * weights, (users, items)),
+        shape=(args.users, args.items),
+        dtype=np.float32
+    )
+    matrix.sum_duplicates()
+
+    # Hold out one interaction of every user with at least two
+    counts = np.diff(matrix.indptr)
+    holdout_users = np.flatnonzero(counts >= 2)
+    holdout_pos = matrix.indptr[holdout_users] + rng.integers(counts[holdout_users])
+    holdout_items = matrix.indices[holdout_pos].copy()
+    matrix.data[holdout_pos] = 0
+    matrix.eliminate_zeros()
+    print(f"{matrix.shape[0]} users, {matrix.shape[1]} items, {matrix.nnz} user-item pairs")
+
+    tracemalloc.start()
+    iteration_times = []
+    last = [time.perf_counter()]
+
+    def on_iteration(iteration):
+        now = time.perf_counter()
+        iteration_times.append(now - last[0])
+        last[0] = now
+
+    start = time.perf_counter()
+    user_factors, item_factors = implicit_als(
+        matrix,
+        factors=args.factors,
+        regularization=config["regularization"],
+        iterations=args.iterations,
+        cg_steps=config["cg_steps"],
+        max_block_bytes=config["max_block_bytes"],
+        callback=on_iteration
+    )
+    train_seconds = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"train {train_seconds:.1f}s ({np.mean(iteration_times):.2f}s/iteration), "
+        f"peak traced memory {peak_bytes / 1024 ** 2:.0f} MB, "
+        f"input {(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1024 ** 2:.0f} MB"
+    )
+
+    model = FactorModel(
+        user_factors,
+        item_factors,
+        np.arange(args.users, dtype=np.int64),
+        np.arange(args.items, dtype=np.int64),
+        matrix.indptr.astype(np.int64),
+        matrix.indices.astype(np.int32)
+    )
+
+    query_users = rng.choice(holdout_users, size=min(args.queries, len(holdout_users)), replace=False)
+    times = []
+    for user in query_users:
+        start = time.perf_counter()
+        model.recommend(int(user), args.k)
+        times.append(time.perf_counter() - start)
+    print(f"top-{args.k} query  {percentiles(times)}")
+
+    sample = rng.choice(len(holdout_users), size=min(10_000, len(holdout_users)), replace=False)
+    hits = sum(
+        holdout_items[i] in model.recommend(int(holdout_users[i]), args.k)[0]
+        for i in sample
+    )
+    popular = np.argsort(-np.bincount(matrix.indices, minlength=args.items))[:args.k]
+    popular_hits = sum(holdout_items[i] in popular for i in sample)
+    print(f"hit rate@{args.k}  ALS {hits / len(sample):.3f}  most-popular baseline {popular_hits / len(sample):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Latency benchmark of the compiled lead scoring forest.
+
+Trains a RandomForestClassifier + StandardScaler with the same settings as
+LeadScoringService.train_model on synthetic lead features and reports
+single-row latency percentiles and batch throughput of sklearn and of
+CompiledForest loaded from an artifact. Parity with sklearn is covered by
+tests/test_compiled_forest.py.
+
+Usage:
+    python -m backend.benchmarks.forest_scoring --rows 20000 --calls 2000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from ..services.compiled_forest import CompiledForest
+from ..services.model_artifacts import save_artifact, load_artifact
+
+
+def synthetic_features(n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    """Rows shaped like LeadScoringService FEATURE_NAMES."""
+    return np.column_stack([
+        rng.integers(0, 2, n_rows),             # has_company
+        rng.integers(0, 2, n_rows),             # has_phone
+        rng.poisson(12, n_rows),                # total_events
+        rng.poisson(1, n_rows),                 # form_submissions
+        rng.poisson(8, n_rows),                 # page_views
+        rng.poisson(0.5, n_rows),               # resource_downloads
+        rng.lognormal(4, 1.5, n_rows).round(),  # company_size
+        rng.integers(0, 720, n_rows),           # days_since_creation
+    ]).astype(np.float64)
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1e6
+    return f"p50 {np.percentile(samples, 50):8.1f}us  p99 {np.percentile(samples, 99):8.1f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000, help="training rows")
+    parser.add_argument("--calls", type=int, default=2_000, help="single-row calls to time")
+    parser.add_argument("--batch", type=int, default=100_000, help="batch size to time")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = synthetic_features(args.rows, rng)
+    logits = 0.4 * X[:, 3] + 0.8 * X[:, 5] + 0.05 * X[:, 4] - 0.002 * X[:, 7] + rng.normal(size=len(X))
+    y = (logits > 1.0).astype(int)
+
+    scaler = StandardScaler()
+    forest = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    forest.fit(scaler.fit_transform(X), y)
+
+    compiled = CompiledForest.from_sklearn(forest, scaler)
+    with tempfile.TemporaryDirectory() as directory:
+        path = save_artifact(f"{directory}/lead_scoring", compiled.to_arrays(), compiled.to_objects())
+        loaded = CompiledForest.from_arrays(*load_artifact(path))
+
+        X_test = synthetic_features(args.calls, rng)
+        sklearn_times = []
+        compiled_times = []
+        for row in X_test:
+            start = time.perf_counter()
+            forest.predict_proba(scaler.transform(row[None, :]))[0][1]
+            sklearn_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            loaded.predict_proba_one(row)[1]
+            compiled_times.append(time.perf_counter() - start)
+
+        print(f"single row  sklearn   {percentiles(sklearn_times)}")
+        print(f"single row  compiled  {percentiles(compiled_times)}")
+
+        X_batch = synthetic_features(args.batch, rng)
+        start = time.perf_counter()
+        forest.predict_proba(scaler.transform(X_batch))
+        sklearn_batch = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded.predict_proba(X_batch)
+        compiled_batch = time.perf_counter() - start
+        print(f"batch {args.batch}  sklearn {sklearn_batch:.2f}s  compiled {compiled_batch:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark building the top-k recommendation neighbor index on synthetic leads.
+
+Usage:
+    python -m backend.benchmarks.recommendation_index --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ..services.neighbor_index import build_neighbor_index
+
+EVENT_TYPES = [
+    "page_viewed", "form_submitted", "resource_downloaded", "email_opened",
+    "email_clicked", "webinar_registered", "demo_requested", "pricing_viewed"
+]
+
+
+def synthetic_profiles(n_leads: int, seed: int = 42):
+    """Generate lead profile strings shaped like RecommendationService._create_lead_profile."""
+    rng = np.random.default_rng(seed)
+    n_companies = max(n_leads // 5, 1)
+    for _ in range(n_leads):
+        parts = [
+            f"company:c{rng.integers(n_companies)}",
+            f"industry:i{rng.integers(40)}"
+        ]
+        parts.extend(f"event:{EVENT_TYPES[i]}" for i in rng.integers(len(EVENT_TYPES), size=rng.integers(1, 12)))
+        parts.extend(f"interest:t{i}" for i in rng.zipf(1.5, size=rng.integers(0, 6)) % 500)
+        yield " ".join(parts)
+
+
+def run(n_leads: int, k: int, chunk_rows: int, max_chunk_bytes: int):
+    vectorizer = TfidfVectorizer(
+        analyzer='word',
+        token_pattern=r'[^:]+:[^:\s]+',
+        min_df=2
+    )
+
+    start = time.perf_counter()
+    tfidf_matrix = vectorizer.fit_transform(synthetic_profiles(n_leads))
+    vectorize_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = build_neighbor_index(tfidf_matrix, k=k, chunk_rows=chunk_rows, max_chunk_bytes=max_chunk_bytes)
+    build_seconds = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "n_leads": n_leads,
+        "vectorize_s": vectorize_seconds,
+        "build_s": build_seconds,
+        "peak_mb": peak_bytes / 1024 ** 2,
+        "index_mb": index.nbytes / 1024 ** 2,
+        "dense_mb": n_leads * n_leads * 8 / 1024 ** 2
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--chunk-rows", type=int, default=1024)
+    parser.add_argument("--max-chunk-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'leads':>10} {'vectorize s':>12} {'build s':>10} {'peak MB':>10} {'index MB':>10} {'dense MB':>14}")
+    for n_leads in args.sizes:
+        result = run(n_leads, args.k, args.chunk_rows, args.max_chunk_mb * 1024 ** 2)
+        print(
+            f"{result['n_leads']:>10} {result['vectorize_s']:>12.2f} {result['build_s']:>10.2f} "
+            f"{result['peak_mb']:>10.1f} {result['index_mb']:>10.1f} {result['dense_mb']:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
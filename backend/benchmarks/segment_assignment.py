@@ -0,0 +1,76 @@
+"""Benchmark the in-process segmentation model: fit time and assignment throughput.
+
+Generates synthetic segmentation feature rows from a mixture of engagement
+profiles, fits the centroid model on a sample as ``train_local_model`` does, and
+times vectorized assignment of all rows plus conversion of feature dicts to the
+feature matrix. Agreement with the generating profile stands in for agreement
+with the remote model.
+
+Usage:
+    python -m backend.benchmarks.segment_assignment --leads 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..config.ai_config import MODEL_PARAMETERS
+from ..services.segment_clustering import (
+    SegmentCentroids, agreement, feature_matrix, fit_centroids, majority_segments
+)
+
+
+def synthetic_features(n_leads: int, feature_names, rng: np.random.Generator):
+    """Feature rows drawn around one profile per segment, and the segment of each row."""
+    n_features = len(feature_names)
+    profiles = rng.normal(0.0, 1.0, size=(5, n_features))
+    segments = rng.choice(5, size=n_leads, p=[0.4, 0.25, 0.15, 0.05, 0.15])
+    X = profiles[segments] + rng.normal(0.0, 0.6, size=(n_leads, n_features))
+    return X.astype(np.float32), segments
+
+
+def main():
+    config = MODEL_PARAMETERS["segmentation"]["local_model"]
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--train", type=int, default=config["training_sample"])
+    parser.add_argument("--clusters", type=int, default=config["n_clusters"])
+    parser.add_argument("--dict-rows", type=int, default=100_000, help="feature dicts converted to a matrix")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    feature_names = config["features"]
+    X, truth = synthetic_features(args.leads, feature_names, rng)
+
+    sample = rng.choice(args.leads, size=min(args.train, args.leads), replace=False)
+    start = time.perf_counter()
+    mean, scale, centroids, clusters = fit_centroids(
+        X[sample],
+        n_clusters=args.clusters,
+        batch_size=config["kmeans_batch_size"],
+        max_iter=config["max_iter"]
+    )
+    cluster_segments = majority_segments(clusters, truth[sample], len(centroids))
+    model = SegmentCentroids(feature_names, mean, scale, centroids, cluster_segments)
+    print(f"fit {len(sample)} rows into {len(centroids)} clusters in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    segments, confidence = model.assign(X)
+    elapsed = time.perf_counter() - start
+    print(
+        f"assign {args.leads} rows in {elapsed:.2f}s ({args.leads / elapsed / 1e6:.1f}M rows/s), "
+        f"median confidence {np.median(confidence):.3f}"
+    )
+
+    rows = [dict(zip(feature_names, row)) for row in X[:args.dict_rows].tolist()]
+    start = time.perf_counter()
+    feature_matrix(rows, feature_names)
+    elapsed = time.perf_counter() - start
+    print(f"feature dicts -> matrix  {len(rows) / elapsed / 1e6:.2f}M rows/s")
+
+    report = agreement(segments, truth, 5)
+    print(f"agreement with generating segment {report['agreement']:.3f}  per segment {report['per_segment']}")
+
+
+if __name__ == "__main__":
+    main()
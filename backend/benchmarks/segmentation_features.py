@@ -0,0 +1,152 @@
+"""Benchmark bulk against per-lead segmentation feature preparation.
+
+Fills a throwaway SQLite database with synthetic user-item interactions
+attributed to leads, then times ``prepare_segmentation_features`` called once per
+lead (the previous ``batch_segment_leads`` path) against
+``prepare_batch_segmentation_features`` and checks both produce the same features.
+
+Usage:
+    python -m backend.benchmarks.segmentation_features --sizes 1000 10000 100000
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from .. import models  # noqa: F401  (configures all mappers)
+from ..config.ai_config import FEATURE_ENGINEERING, MODEL_PARAMETERS
+from ..models.event import Event  # noqa: F401  (target of Lead.events, not re-exported by models)
+from ..models.lead import Lead
+from ..models.user_item_interaction import UserItemInteraction
+from ..services.segmentation_service import SegmentationService
+
+
+def synthetic_leads(n_leads: int, rng: np.random.Generator, now: datetime):
+    """Unsaved leads with ids 1..n_leads; about 20% were never enriched."""
+    return [
+        Lead(
+            id=lead_id,
+            email=f"lead{lead_id}@example.com",
+            lead_score=float(rng.random()),
+            created_at=now - timedelta(days=int(rng.integers(1, 720))),
+            data={
+                "company": {
+                    "industry": str(rng.choice(["saas", "retail", "finance", "health"])),
+                    "employees": int(rng.integers(1, 5000))
+                },
+                "budget": float(rng.integers(1, 100)) * 1000
+            } if rng.random() < 0.8 else {}
+        )
+        for lead_id in range(1, n_leads + 1)
+    ]
+
+
+def fill_interactions(
+    engine,
+    first_lead: int,
+    last_lead: int,
+    per_lead: float,
+    rng: np.random.Generator,
+    now: datetime
+) -> int:
+    """Insert a Poisson number of interactions for each lead id in [first_lead, last_lead].
+
+    About 10% of leads get none, and some interactions have a type that is not
+    configured.
+    """
+    types = FEATURE_ENGINEERING["interaction_types"] + ["shared"]
+    n_leads = last_lead - first_lead + 1
+    counts = rng.poisson(per_lead, size=n_leads) * (rng.random(n_leads) >= 0.1)
+    lead_ids = np.repeat(np.arange(first_lead, last_lead + 1), counts)
+    ages = rng.exponential(20.0, size=len(lead_ids))
+
+    rows = [
+        {
+            "user_id": int(rng.integers(1, 1000)),
+            "lead_id": int(lead_id),
+            "item_id": int(rng.integers(1, 5000)),
+            "interaction_type": types[int(kind)],
+            "timestamp": now - timedelta(days=float(age))
+        }
+        for lead_id, kind, age in zip(lead_ids, rng.integers(len(types), size=len(lead_ids)), ages)
+    ]
+    with engine.begin() as connection:
+        for start in range(0, len(rows), 50000):
+            connection.execute(insert(UserItemInteraction.__table__), rows[start:start + 50000])
+    return len(rows)
+
+
+def same_features(a, b) -> bool:
+    if a.keys() != b.keys():
+        return False
+    return all(
+        math.isclose(a[key], b[key], rel_tol=1e-9, abs_tol=1e-12) if isinstance(a[key], float) else a[key] == b[key]
+        for key in a
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--interactions-per-lead", type=float, default=20.0)
+    parser.add_argument(
+        "--per-lead-max",
+        type=int,
+        default=100000,
+        help="time the per-lead path on at most this many leads and extrapolate beyond"
+    )
+    args = parser.parse_args()
+
+    # Only the feature methods are exercised; they need no Vertex AI client
+    service = SegmentationService.__new__(SegmentationService)
+    service.config = MODEL_PARAMETERS["segmentation"]
+    service.feature_config = FEATURE_ENGINEERING
+
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        UserItemInteraction.__table__.create(engine)
+        Session = sessionmaker(bind=engine)
+
+        n_filled = 0
+        n_interactions = 0
+        for size in sorted(args.sizes):
+            # Grow the same table so smaller sizes are a prefix of larger ones
+            if size > n_filled:
+                n_interactions += fill_interactions(engine, n_filled + 1, size, args.interactions_per_lead, rng, now)
+                n_filled = size
+            leads = synthetic_leads(size, rng, now)
+
+            db = Session()
+            try:
+                timed = leads[:min(size, args.per_lead_max)]
+                start = time.perf_counter()
+                per_lead = [service.prepare_segmentation_features(lead, db) for lead in timed]
+                per_lead_seconds = (time.perf_counter() - start) * size / len(timed)
+                db.expunge_all()
+
+                start = time.perf_counter()
+                bulk = service.prepare_batch_segmentation_features(leads, db)
+                bulk_seconds = time.perf_counter() - start
+            finally:
+                db.close()
+
+            # Both paths read the clock themselves, so a lead may rarely differ at a day boundary
+            mismatches = sum(not same_features(a, b) for a, b in zip(per_lead, bulk))
+            estimated = " (extrapolated)" if len(timed) < size else ""
+            print(
+                f"{size:>7} leads ({n_interactions} interactions in table)  "
+                f"per-lead {per_lead_seconds:8.2f}s{estimated}  bulk {bulk_seconds:7.2f}s  "
+                f"speedup {per_lead_seconds / bulk_seconds:6.1f}x  mismatches {mismatches}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Maintenance commands for the marketing automation backend.
+
+Usage:
+    python -m backend.cli rebuild-feature-store [--days N]
+    python -m backend.cli rebuild-analytics-rollups [--days N]
+    python -m backend.cli rebuild-analytics-sketches [--days N]
+    python -m backend.cli rebuild-ab-test-stats [--test ID ...]
+    python -m backend.cli compact-recommendations
+    python -m backend.cli rebuild-lead-facets
+    python -m backend.cli refresh-recommendation-lists [--force]
+    python -m backend.cli segment-leads [--force] [--restart]
+    python -m backend.cli forecast-campaigns [--force]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from .database import SessionLocal
+from .services.ab_test_monitor import ABTestMonitor
+from .services.analytics_rollup_service import AnalyticsRollupService
+from .services.analytics_sketch_service import AnalyticsSketchService
+from .services.feature_store_service import FeatureStoreService
+from .services.lead_facet_service import LeadFacetService
+from .services.recommendation_list_service import RecommendationListService
+from .services.recommendation_service import RecommendationService
+
+
+def rebuild_feature_store(args: argparse.Namespace):
+    """Regenerate per-lead event buckets from the events table."""
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    db = SessionLocal()
+    try:
+        buckets = FeatureStoreService(db).rebuild(since=since)
+        print(f"Rebuilt {buckets} lead event buckets")
+    finally:
+        db.close()
+
+
+def rebuild_analytics_rollups(args: argparse.Namespace):
+    """Regenerate the campaign and lead interaction rollups from the interactions table."""
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    db = SessionLocal()
+    try:
+        written = AnalyticsRollupService(db).rebuild(since=since)
+        print("Rebuilt " + ", ".join(f"{rows} {table}" for table, rows in written.items()))
+    finally:
+        db.close()
+
+
+def rebuild_analytics_sketches(args: argparse.Namespace):
+    """Regenerate the per campaign and day distinct-lead sketches used by approximate analytics."""
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    db = SessionLocal()
+    try:
+        sketches = AnalyticsSketchService(db).rebuild(since=since)
+        print(f"Rebuilt {sketches} campaign daily sketches")
+    finally:
+        db.close()
+
+
+def rebuild_ab_test_stats(args: argparse.Namespace):
+    """Recompute A/B test variant statistics from the interactions table and re-evaluate the running tests."""
+    db = SessionLocal()
+    try:
+        monitor = ABTestMonitor(db)
+        tests = monitor.rebuild(args.test)
+        evaluations = monitor.evaluate_running()
+        print(f"Rebuilt statistics of {tests} A/B tests, evaluated {len(evaluations)} running tests")
+    finally:
+        db.close()
+
+
+def compact_recommendations(args: argparse.Namespace):
+    """Recompute IDF and rebuild the neighbor index of the streaming recommendation model (run nightly)."""
+    db = SessionLocal()
+    try:
+        metrics = RecommendationService(db).compact_model()
+        print(f"Compacted recommendation model over {metrics['n_docs']} leads")
+    finally:
+        db.close()
+
+
+def rebuild_lead_facets(args: argparse.Namespace):
+    """Regenerate the lead facet summaries used by recommendation explanations."""
+    db = SessionLocal()
+    try:
+        summaries = LeadFacetService(db).rebuild()
+        print(f"Rebuilt {summaries} lead facet summaries")
+    finally:
+        db.close()
+
+
+def refresh_recommendation_lists(args: argparse.Namespace):
+    """Materialize every lead's recommendation list for the active recommendation model."""
+    db = SessionLocal()
+    try:
+        run = RecommendationListService(db).refresh(force=args.force)
+        if run is None:
+            print("Recommendation lists are up to date, being refreshed elsewhere, or no model is active")
+        else:
+            print(f"Refresh of recommendation lists for model v{run.model_version} {run.status}: {run.n_leads} leads")
+    finally:
+        db.close()
+
+
+def segment_leads(args: argparse.Namespace):
+    """Re-segment every lead in committed chunks, resuming an unfinished run."""
+    # Imported here: the segmentation service pulls in the Vertex AI client
+    from .services.segmentation_service import SegmentationService
+
+    db = SessionLocal()
+    try:
+        service = SegmentationService()
+        run = service.start_run(db, force=args.force, restart=args.restart)
+        print(f"Segmentation run {run.id}: leads {run.last_lead_id + 1}..{run.max_lead_id}")
+        run = asyncio.run(service.segment_all_leads(
+            db,
+            run,
+            progress=lambda run: print(
+                f"  up to lead {run.last_lead_id}: {run.processed} segmented, {run.predicted} predicted"
+            )
+        ))
+        print(f"Segmentation run {run.id} {run.status}: {run.processed} leads, {run.predicted} sent to a model")
+    finally:
+        db.close()
+
+
+def forecast_campaigns(args: argparse.Namespace):
+    """Regenerate the stored performance forecasts of active campaigns that are missing or stale."""
+    # Imported here: the analytics service pulls in the Vertex AI client
+    from .services.analytics_service import AnalyticsService
+    from .services.campaign_forecast_service import CampaignForecastService
+
+    db = SessionLocal()
+    try:
+        result = asyncio.run(CampaignForecastService(db, AnalyticsService()).forecast_portfolio(force=args.force))
+        print(f"Regenerated {result['regenerated']} of {result['campaigns']} active campaign forecasts")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Marketing automation maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-feature-store", help=rebuild_feature_store.__doc__)
+    rebuild.add_argument("--days", type=int, help="Only rebuild the last N days (default: everything)")
+    rebuild.set_defaults(func=rebuild_feature_store)
+
+    rollups = subparsers.add_parser("rebuild-analytics-rollups", help=rebuild_analytics_rollups.__doc__)
+    rollups.add_argument("--days", type=int, help="Only rebuild the last N days (default: everything)")
+    rollups.set_defaults(func=rebuild_analytics_rollups)
+
+    sketches = subparsers.add_parser("rebuild-analytics-sketches", help=rebuild_analytics_sketches.__doc__)
+    sketches.add_argument("--days", type=int, help="Only rebuild the last N days (default: everything)")
+    sketches.set_defaults(func=rebuild_analytics_sketches)
+
+    ab_tests = subparsers.add_parser("rebuild-ab-test-stats", help=rebuild_ab_test_stats.__doc__)
+    ab_tests.add_argument("--test", type=int, nargs="+", help="Only rebuild these A/B test ids (default: all)")
+    ab_tests.set_defaults(func=rebuild_ab_test_stats)
+
+    compact = subparsers.add_parser("compact-recommendations", help=compact_recommendations.__doc__)
+    compact.set_defaults(func=compact_recommendations)
+
+    facets = subparsers.add_parser("rebuild-lead-facets", help=rebuild_lead_facets.__doc__)
+    facets.set_defaults(func=rebuild_lead_facets)
+
+    lists = subparsers.add_parser("refresh-recommendation-lists", help=refresh_recommendation_lists.__doc__)
+    lists.add_argument("--force", action="store_true", help="Rewrite the lists even if they match the active model")
+    lists.set_defaults(func=refresh_recommendation_lists)
+
+    segment = subparsers.add_parser("segment-leads", help=segment_leads.__doc__)
+    segment.add_argument("--force", action="store_true", help="Re-segment leads whose stored segment is still fresh")
+    segment.add_argument("--restart", action="store_true", help="Start over instead of resuming an unfinished run")
+    segment.set_defaults(func=segment_leads)
+
+    forecasts = subparsers.add_parser("forecast-campaigns", help=forecast_campaigns.__doc__)
+    forecasts.add_argument("--force", action="store_true", help="Regenerate forecasts whose metrics have not changed")
+    forecasts.set_defaults(func=forecast_campaigns)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ from typing import Dict, Any
 VERTEX_AI_CONFIG = {
     "project_id": os.getenv("GOOGLE_CLOUD_PROJECT_ID"),
     "location": os.getenv("VERTEX_AI_LOCATION", "us-central1"),
+    # Prediction batches in flight per call
+    "max_concurrent_predictions": int(os.getenv("VERTEX_AI_MAX_CONCURRENT_PREDICTIONS", "8")),
 }
 
 # Model Endpoint IDs
@@ -17,6 +19,7 @@ ENDPOINTS = {
     "content_analysis": os.getenv("CONTENT_ANALYSIS_ENDPOINT_ID"),
     "response_generation": os.getenv("RESPONSE_GENERATION_ENDPOINT_ID"),
     "performance_prediction": os.getenv("PERFORMANCE_PREDICTION_ENDPOINT_ID"),
+    "performance": os.getenv("PERFORMANCE_PREDICTION_ENDPOINT_ID"),  # alias of performance_prediction
 }
 
 # Model Parameters
@@ -24,6 +27,7 @@ MODEL_PARAMETERS: Dict[str, Dict[str, Any]] = {
     "lead_scoring": {
         "threshold": 0.7,
         "batch_size": 100,
+        "query_chunk_size": 5000,  # lead ids per IN (...) clause in bulk feature queries
         "features": [
             "email_engagement",
             "website_visits",
@@ -34,23 +38,108 @@ MODEL_PARAMETERS: Dict[str, Dict[str, Any]] = {
             "company_size",
             "industry",
             "budget",
-        ]
+        ],
+        "rescoring": {
+            "enabled": True,
+            "poll_interval": 10,  # seconds between backlog checks
+            "batch_size": 1000,  # leads rescored per model call
+            "max_staleness": 300,  # seconds a changed lead may wait before rescoring
+            "max_leads_per_second": 2000,  # throughput cap of each process running the rescoring loop
+            "claim_timeout": 600,  # seconds before a batch claimed by a crashed worker is released
+        },
+        "training": {
+            "chunk_size": 20000,  # training leads per feature query chunk
+            "feature_workers": min(4, os.cpu_count() or 1),  # processes reading and featurizing chunks; 1 runs inline
+            "n_jobs": -1,  # RandomForest fit/predict parallelism
+            "keep_artifacts": 3,  # newest artifact directories kept for rollback, besides the active one
+        }
     },
     "recommendation": {
         "content_similarity_threshold": 0.6,
         "max_recommendations": 10,
         "personalization_weight": 0.8,
         "recency_weight": 0.2,
+        "index_neighbors": 50,  # neighbors kept per lead in the trained index
+        "index_chunk_rows": 1024,
+        "index_max_chunk_bytes": 256 * 1024 ** 2,
+        "hash_features": 2 ** 20,  # term space of streaming-trained models
+        "min_df": 2,  # terms in fewer leads get no weight
+        "training_chunk_size": 5000,  # leads per profile/hash chunk in streaming training
+        "batch_chunk_size": 1000,  # leads per index slice and lookup query in batch recommendations
+        "employee_buckets": [10, 50, 200, 1000, 5000],  # company size band edges for explanations
+        "facet_cache_size": 100000,  # lead facet summaries cached per process
+        "facet_cache_ttl": 300,  # seconds; changes in this process invalidate immediately
+        "precomputed": {
+            "enabled": True,
+            "poll_interval": 30,  # seconds between checks for a newly activated model version
+            "list_size": 20,  # recommendations stored per lead; larger requests are computed live
+            "chunk_size": 1000,  # leads per index slice and write transaction
+            "stale_run_seconds": 3600,  # a run not finished after this long is assumed dead and retried
+        },
+        # Batched fold-ins and compaction of streaming-trained models, run as training jobs
+        "maintenance": {
+            "enabled": True,
+            "poll_interval": 60,  # seconds between checks for due fold-ins and compactions
+            "fold_in_interval": 300,  # seconds queued leads may wait before a fold-in is started
+            "fold_in_batch_size": 5000,  # queued leads that start a fold-in at once; most leads folded per job
+            "compaction_interval": 24 * 3600,  # seconds between compactions of a model with folded-in leads
+            "keep_artifacts": 3,  # newest artifact directories kept per model for rollback, besides the active one
+        },
+    },
+    "collaborative_filtering": {
+        "factors": 64,
+        "regularization": 0.01,
+        "iterations": 15,
+        "cg_steps": 3,  # conjugate gradient steps per ALS half-step
+        "alpha": 40.0,  # confidence = 1 + alpha * weighted interaction count
+        "interaction_weights": {
+            "viewed": 1.0,
+            "clicked": 2.0,
+            "purchased": 5.0,
+        },
+        "default_weight": 1.0,  # interaction types not listed above
+        "max_block_bytes": 256 * 1024 ** 2,  # gathered factor rows per solver block
+        "query_chunk_size": 100000,  # aggregated (user, item) rows per read
+        "max_recommendations": 100,
     },
     "segmentation": {
         "min_confidence": 0.8,
         "update_frequency": 24,  # hours
+        "batch_size": 100,  # leads per prediction request
+        "feature_chunk_size": 5000,  # leads per grouped interaction query
+        "sweep_chunk_size": 1000,  # leads per committed chunk when re-segmenting the whole table
         "segment_thresholds": {
             "cold": 0.2,
             "warm": 0.4,
             "hot": 0.7,
             "champion": 0.9,
-        }
+        },
+        # "remote" (Vertex endpoint), "local" (in-process centroids) or "auto" (remote, falling back to local)
+        "backend": os.getenv("SEGMENTATION_BACKEND", "auto"),
+        "local_model": {
+            "n_clusters": 20,  # k-means clusters, each labeled with one segment
+            "training_sample": 200000,  # leads sampled for fitting
+            "label_sample": 20000,  # training leads labeled by the remote model, when reachable
+            "agreement_sample": 5000,  # leads compared against the remote model on request
+            "kmeans_batch_size": 4096,
+            "max_iter": 100,
+            "features": [
+                "company_size",
+                "score",
+                "budget",
+                "total_interactions",
+                "engagement_rate",
+                "recency_score",
+                "frequency_score",
+                "conversion_rate",
+                "viewed_ratio",
+                "clicked_ratio",
+                "purchased_ratio",
+                "conversion_ratio",
+                "days_since_creation",
+                "days_since_last_interaction",
+            ],
+        },
     },
     "nlp": {
         "sentiment_confidence_threshold": 0.7,
@@ -59,12 +148,34 @@ MODEL_PARAMETERS: Dict[str, Dict[str, Any]] = {
         "max_entities": 20,
         "response_temperature": 0.7,
         "max_response_length": 500,
+        "batch_size": 100,  # texts per prediction request
     },
     "analytics": {
-        "prediction_horizon": 30,  # days
+        "prediction_horizon": 30,  # days ahead of stored forecasts; other horizons are generated per request
         "confidence_interval": 0.95,
         "min_data_points": 100,
+        "prediction_threshold": 0.7,  # forecasts below this confidence are logged
         "ab_test_significance": 0.05,
+        "conversion_type": "conversion",  # interaction type that converts a lead
+        "ab_monitor": {
+            "enabled": True,
+            "poll_interval": 60,  # seconds between evaluations of the running tests
+        },
+        # Approximate mode (exact=false): per campaign and day sketches of distinct leads
+        "sketches": {
+            "hll_precision": 12,  # 4096 registers, about 1.6% relative standard error
+            "sample_size": 1024,  # leads kept in each bottom-k sample for rate estimates
+        },
+        # Stored performance forecasts, regenerated in bulk for the whole portfolio
+        "forecasts": {
+            "enabled": True,
+            "poll_interval": 3600,  # seconds between portfolio forecast runs
+            "active_statuses": ["active"],
+            "batch_size": 100,  # campaigns per prediction request
+            "max_age": 24,  # hours after which a stored forecast is regenerated anyway
+            "change_threshold": 0.1,  # relative change of a tracked metric that makes a forecast stale
+            "tracked_metrics": ["total_interactions", "unique_leads", "engagement_rate", "conversion_rate"],
+        },
     }
 }
 
@@ -83,7 +194,12 @@ FEATURE_ENGINEERING = {
         "short_term": 7,    # days
         "medium_term": 30,  # days
         "long_term": 90,    # days
-    }
+    },
+    # Segmentation engagement features
+    "interaction_types": ["viewed", "clicked", "purchased", "conversion"],  # a <type>_ratio feature each
+    "recency_decay": 30,  # days; recency score is exp(-days since latest interaction / recency_decay)
+    "frequency_window": 30,  # days counted by the frequency score
+    "expected_interactions": 50,  # interactions of a fully engaged lead
 }
 
 # Monitoring and Logging
@@ -108,4 +224,28 @@ ERROR_HANDLING = {
     "retry_delay": 1,  # seconds
     "fallback_threshold": 0.5,
     "cache_ttl": 3600,  # seconds
-} 
\ No newline at end of file
+}
+
+# In-process model artifact cache
+MODEL_REGISTRY = {
+    "recheck_interval": 30,  # seconds between active-version lookups without a local change
+}
+
+# Background loops (rescoring, training, list refresh, maintenance, A/B evaluation, forecasts)
+BACKGROUND_JOBS = {
+    # Set to false on every host but one when several hosts share the database
+    "enabled": os.getenv("RUN_BACKGROUND_JOBS", "true").lower() in ("1", "true", "yes"),
+    # Only the API process holding this lock runs the loops, so several workers on a host start them once
+    "lock_path": os.getenv("BACKGROUND_JOBS_LOCK_PATH", "./background_jobs.lock"),
+}
+
+# Background model training jobs
+TRAINING_JOBS = {
+    "enabled": True,
+    "poll_interval": 2,  # seconds between checks for queued, finished or cancelled jobs
+    "max_concurrent_jobs": 1,  # training worker processes across all API processes
+    "max_cpus": max(1, (os.cpu_count() or 2) // 2),  # CPUs a training worker and its children may use
+    "niceness": 10,  # scheduling priority offset so serving traffic wins under contention
+    "cancel_grace_seconds": 30,  # wait for a cooperative stop before terminating the worker
+    "stale_after_seconds": 60,  # running jobs not heartbeated by any runner for this long are marked failed
+}
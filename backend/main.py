@@ -2,6 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import leads, forms, ai
 from .database import Base, engine
+from .services.ab_test_monitor import ab_test_evaluator
+from .services.background_leader import background_job_leader
+from .services.campaign_forecast_service import campaign_forecast_scheduler
+from .services.recommendation_list_service import recommendation_list_refresher
+from .services.recommendation_maintenance import recommendation_maintenance_scheduler
+from .services.rescoring_service import rescoring_scheduler
+from .services.training_job_service import training_job_runner
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -26,6 +33,24 @@ app.include_router(leads.router, prefix="/api", tags=["leads"])
 app.include_router(forms.router, prefix="/api", tags=["forms"])
 app.include_router(ai.router, prefix="/api", tags=["ai"])
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start background loops that keep derived data fresh, in the one leader process only."""
+    if not background_job_leader.acquire():
+        return
+    rescoring_scheduler.start()
+    training_job_runner.start()
+    recommendation_list_refresher.start()
+    recommendation_maintenance_scheduler.start()
+    ab_test_evaluator.start()
+    campaign_forecast_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    """Stop training workers so the server does not wait on them to exit."""
+    training_job_runner.stop()
+    background_job_leader.release()
+
 @app.get("/")
 def read_root():
     return {
@@ -15,3 +15,15 @@ from .action_execution import ActionExecution
 from .workflow_collaborator import WorkflowCollaborator
 from .aimodel import AIModel
 from .ai_data import ModelVersion, Prediction, PerformanceMetric, ABTest
+from .lead_feature import LeadEventBucket
+from .lead_rescore_queue import LeadRescoreQueue
+from .training_job import TrainingJob
+from .lead_facet import LeadFacetSummary
+from .recommendation_list import RecommendationList, RecommendationMaterialization
+from .lead_segment import LeadSegment
+from .segmentation_run import SegmentationRun
+from .analytics_rollup import CampaignInteractionRollup, LeadInteractionRollup, CampaignLead
+from .ab_test_stats import ABTestVariantStats, ABTestLead
+from .analytics_sketch import CampaignDailySketch
+from .campaign_forecast import CampaignForecast
+from .recommendation_update_queue import RecommendationUpdateQueue
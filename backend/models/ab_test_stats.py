@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class ABTestVariantStats(Base):
+    """Running totals of one A/B test variant, enough to test its conversion rate against the other."""
+    __tablename__ = "ab_test_variant_stats"
+
+    ab_test_id = Column(Integer, ForeignKey("ab_tests.id"), primary_key=True)
+    variant = Column(String, primary_key=True)  # 'A' or 'B'
+    exposures = Column(Integer, default=0, nullable=False)  # interactions with the variant's campaign during the test
+    unique_leads = Column(Integer, default=0, nullable=False)
+    conversions = Column(Integer, default=0, nullable=False)  # leads with at least one conversion
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<ABTestVariantStats(ab_test_id={self.ab_test_id}, variant='{self.variant}', "
+            f"unique_leads={self.unique_leads}, conversions={self.conversions})>"
+        )
+
+
+class ABTestLead(Base):
+    """A lead exposed to an A/B test variant, so each lead is counted and converted once."""
+    __tablename__ = "ab_test_leads"
+
+    ab_test_id = Column(Integer, ForeignKey("ab_tests.id"), primary_key=True)
+    variant = Column(String, primary_key=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), primary_key=True)
+    converted = Column(Boolean, default=False, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<ABTestLead(ab_test_id={self.ab_test_id}, variant='{self.variant}', "
+            f"lead_id={self.lead_id}, converted={self.converted})>"
+        )
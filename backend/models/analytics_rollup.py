@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, UniqueConstraint
+
+from ..database import Base
+
+
+class CampaignInteractionRollup(Base):
+    """Hourly interaction count per campaign and interaction type, maintained as interactions are written."""
+    __tablename__ = "campaign_interaction_rollups"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "day", "hour", "interaction_type", name="uq_campaign_interaction_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), index=True, nullable=False)
+    day = Column(Date, nullable=False)
+    hour = Column(Integer, nullable=False)  # 0-23, UTC
+    interaction_type = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<CampaignInteractionRollup(campaign_id={self.campaign_id}, day={self.day}, hour={self.hour}, "
+            f"interaction_type='{self.interaction_type}', count={self.count})>"
+        )
+
+
+class LeadInteractionRollup(Base):
+    """Daily interaction count per lead and interaction type, with the first and last interaction of the day."""
+    __tablename__ = "lead_interaction_rollups"
+    __table_args__ = (
+        UniqueConstraint("lead_id", "day", "interaction_type", name="uq_lead_interaction_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), index=True, nullable=False)
+    day = Column(Date, nullable=False)
+    interaction_type = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    first_interaction_at = Column(DateTime, nullable=False)
+    last_interaction_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<LeadInteractionRollup(lead_id={self.lead_id}, day={self.day}, "
+            f"interaction_type='{self.interaction_type}', count={self.count})>"
+        )
+
+
+class CampaignLead(Base):
+    """Each lead that interacted with a campaign, with its first interaction.
+
+    Distinct leads of a campaign are counted from these rows without scanning interactions.
+    """
+    __tablename__ = "campaign_leads"
+
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), primary_key=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), primary_key=True, index=True)
+    first_interaction_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<CampaignLead(campaign_id={self.campaign_id}, lead_id={self.lead_id}, "
+            f"first_interaction_at={self.first_interaction_at})>"
+        )
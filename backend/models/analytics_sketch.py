@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Date, DateTime, LargeBinary, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class CampaignDailySketch(Base):
+    """Mergeable sketches of the distinct leads that interacted with a campaign on one day."""
+    __tablename__ = "campaign_daily_sketches"
+
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    leads_hll = Column(LargeBinary, nullable=False)  # HyperLogLog registers
+    lead_sample = Column(LargeBinary, nullable=False)  # bottom-k lead hashes and converted flags
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CampaignDailySketch(campaign_id={self.campaign_id}, day={self.day})>"
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
+# Leads added to a campaign, e.g. by an automation's add_to_campaign action
+campaign_members = Table(
+    "campaign_members",
+    Base.metadata,
+    Column("campaign_id", Integer, ForeignKey("campaigns.id"), primary_key=True),
+    Column("lead_id", Integer, ForeignKey("leads.id"), primary_key=True, index=True),
+)
+
 class Campaign(Base):
     __tablename__ = "campaigns"
 
@@ -30,7 +38,7 @@ class Campaign(Base):
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_campaigns")
     modifier = relationship("User", foreign_keys=[last_modified_by], back_populates="modified_campaigns")
     launcher = relationship("User", foreign_keys=[launched_by], back_populates="launched_campaigns")
-    leads = relationship("Lead", back_populates="campaign")
+    leads = relationship("Lead", secondary=campaign_members, back_populates="campaigns")
     
     # Stats
     leads_count = Column(Integer, default=0)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, DateTime, JSON, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class CampaignForecast(Base):
+    """Latest performance forecast of a campaign and the metrics it was generated from."""
+    __tablename__ = "campaign_forecasts"
+
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), primary_key=True)
+    current_metrics = Column(JSON, nullable=False)  # campaign metrics used as prediction features
+    predicted_metrics = Column(JSON, nullable=False)
+    confidence = Column(Float)
+    factors = Column(JSON)
+    recommendations = Column(JSON)
+    generated_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+
+    def __repr__(self):
+        return f"<CampaignForecast(campaign_id={self.campaign_id}, generated_at={self.generated_at})>"
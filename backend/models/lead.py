@@ -20,6 +20,7 @@ class Lead(Base):
 
     # Relationships
     events = relationship("Event", back_populates="lead", cascade="all, delete-orphan")
+    campaigns = relationship("Campaign", secondary="campaign_members", back_populates="leads")
 
     def __repr__(self):
         return f"<Lead(id={self.id}, email='{self.email}', first_name='{self.first_name}', last_name='{self.last_name}', company='{self.company}')>"
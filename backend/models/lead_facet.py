@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class LeadFacetSummary(Base):
+    """Per-lead facets used to explain recommendations, maintained as leads and events change."""
+    __tablename__ = "lead_facet_summaries"
+
+    lead_id = Column(Integer, ForeignKey("leads.id"), primary_key=True)
+    industry = Column(String, nullable=True)
+    employee_bucket = Column(Integer, default=0, nullable=False)  # company size band, see MODEL_PARAMETERS
+    interests = Column(JSON, default=list, nullable=False)  # sorted distinct interests from events
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<LeadFacetSummary(lead_id={self.lead_id}, industry='{self.industry}', "
+            f"employee_bucket={self.employee_bucket})>"
+        )
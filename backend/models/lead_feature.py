@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, UniqueConstraint
+
+from ..database import Base
+
+
+class LeadEventBucket(Base):
+    """Daily event count per lead and event type, maintained as events are tracked."""
+    __tablename__ = "lead_event_buckets"
+    __table_args__ = (
+        UniqueConstraint("lead_id", "day", "event_type", name="uq_lead_event_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    lead_id = Column(Integer, ForeignKey("leads.id"), index=True, nullable=False)
+    day = Column(Date, index=True, nullable=False)
+    event_type = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<LeadEventBucket(lead_id={self.lead_id}, day={self.day}, "
+            f"event_type='{self.event_type}', count={self.count})>"
+        )
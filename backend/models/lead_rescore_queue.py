@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class LeadRescoreQueue(Base):
+    """Leads whose scoring features changed since their score was last written."""
+    __tablename__ = "lead_rescore_queue"
+
+    lead_id = Column(Integer, ForeignKey("leads.id"), primary_key=True)
+    first_marked_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+    last_marked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = Column(String, index=True, nullable=True)  # batch currently rescoring the lead
+    claimed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<LeadRescoreQueue(lead_id={self.lead_id}, first_marked_at={self.first_marked_at})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from datetime import datetime
+
+from ..database import Base
+
+
+class LeadSegment(Base):
+    """Latest segment assigned to a lead and the interaction state it was computed from."""
+    __tablename__ = "lead_segments"
+
+    lead_id = Column(Integer, primary_key=True)
+    segment_id = Column(Integer, nullable=False)
+    segment = Column(String, nullable=False)
+    confidence = Column(Float, nullable=False)
+    # Highest interaction id of the lead when it was segmented
+    interaction_watermark = Column(Integer, default=0, nullable=False)
+    segmented_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<LeadSegment(lead_id={self.lead_id}, segment='{self.segment}', segmented_at={self.segmented_at})>"
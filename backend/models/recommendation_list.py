@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from datetime import datetime
+
+from ..database import Base
+
+
+class RecommendationList(Base):
+    """Top recommendations of one lead, materialized from a recommendation model version."""
+    __tablename__ = "recommendation_lists"
+
+    lead_id = Column(Integer, primary_key=True)
+    model_version = Column(Integer, index=True, nullable=False)  # recommendation model the list was computed with
+    # [{"lead_id", "similarity_score", "explanation"}], best first
+    recommendations = Column(JSON, default=list, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<RecommendationList(lead_id={self.lead_id}, model_version={self.model_version})>"
+
+
+class RecommendationMaterialization(Base):
+    """One run writing the recommendation lists of every lead for a model version."""
+    __tablename__ = "recommendation_materializations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_version = Column(Integer, unique=True, nullable=False)
+    status = Column(String, default="running", nullable=False)  # running, succeeded, failed
+    list_size = Column(Integer, nullable=False)  # recommendations stored per lead
+    n_leads = Column(Integer, default=0, nullable=False)  # lists written so far
+    max_lead_id = Column(Integer, nullable=True)  # leads with higher ids are served live
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<RecommendationMaterialization(model_version={self.model_version}, "
+            f"status='{self.status}', n_leads={self.n_leads})>"
+        )
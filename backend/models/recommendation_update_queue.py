@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from datetime import datetime
+
+from ..database import Base
+
+
+class RecommendationUpdateQueue(Base):
+    """Leads waiting to be folded into the active streaming-trained recommendation model."""
+    __tablename__ = "recommendation_update_queue"
+
+    lead_id = Column(Integer, ForeignKey("leads.id"), primary_key=True)
+    first_queued_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+    last_queued_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<RecommendationUpdateQueue(lead_id={self.lead_id}, first_queued_at={self.first_queued_at})>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from datetime import datetime
+
+from ..database import Base
+
+
+class SegmentationRun(Base):
+    """A chunked re-segmentation of the whole lead table and its resume checkpoint."""
+    __tablename__ = "segmentation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, index=True, default="running", nullable=False)  # running, succeeded, failed
+    force = Column(Boolean, default=False, nullable=False)  # re-segment leads whose stored segment is fresh
+    chunk_size = Column(Integer, nullable=False)
+    last_lead_id = Column(Integer, default=0, nullable=False)  # checkpoint: leads up to this id are committed
+    max_lead_id = Column(Integer, nullable=False)  # leads created after the run started are not included
+    processed = Column(Integer, default=0, nullable=False)
+    predicted = Column(Integer, default=0, nullable=False)  # leads sent to a segmentation model
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<SegmentationRun(id={self.id}, status='{self.status}', "
+            f"last_lead_id={self.last_lead_id}, processed={self.processed})>"
+        )
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, text
+from datetime import datetime
+
+from ..database import Base
+
+
+class TrainingJob(Base):
+    """A model training run executed outside the request path by the training job runner."""
+    __tablename__ = "training_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_name = Column(String, index=True, nullable=False)  # e.g., "lead_scoring", "recommendation"
+    # queued, running, succeeded, failed, cancelled
+    status = Column(String, index=True, default="queued", nullable=False)
+    stage = Column(String, nullable=True)  # current training stage
+    progress = Column(Float, default=0.0, nullable=False)  # 0.0 - 1.0
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    params = Column(Text, nullable=True)  # JSON string of training inputs, large ones by file path
+    metrics = Column(Text, nullable=True)  # JSON string of resulting model metrics
+    error = Column(Text, nullable=True)
+    model_id = Column(Integer, ForeignKey("ai_models.id"), nullable=True)  # model version produced by the job
+    worker_pid = Column(Integer, nullable=True)
+    # Concurrency slot, 0 to max_concurrent_jobs - 1, held while running; unique among running jobs
+    slot = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # last time the runner owning the worker saw it alive
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "uq_training_jobs_running_slot",
+            "slot",
+            unique=True,
+            postgresql_where=text("status = 'running'"),
+            sqlite_where=text("status = 'running'")
+        ),
+    )
+
+    def __repr__(self):
+        return (
+            f"<TrainingJob(id={self.id}, model_name='{self.model_name}', "
+            f"status='{self.status}', progress={self.progress})>"
+        )
@@ -10,6 +10,7 @@ class Trigger(Base):
     workflow_id = Column(Integer, ForeignKey("workflows.id"))
 
     workflow = relationship("Workflow", back_populates="triggers")
+    actions = relationship("Action", back_populates="trigger")
 
     def __init__(self, type, workflow_id):
         self.type = type
@@ -14,12 +14,13 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String, default="user")
 
-    leads = relationship("Lead", back_populates="owner")
-    campaigns = relationship("Campaign", back_populates="user")
-    onboarding = relationship("Onboarding", back_populates="user", uselist=False)
-    automations = relationship("Automation", back_populates="user")
-    funnels = relationship("Funnel", back_populates="user")
+    # Campaigns created by the user
+    campaigns = relationship("Campaign", foreign_keys="Campaign.created_by", viewonly=True)
+    created_campaigns = relationship("Campaign", foreign_keys="Campaign.created_by", back_populates="creator")
+    modified_campaigns = relationship("Campaign", foreign_keys="Campaign.last_modified_by", back_populates="modifier")
+    launched_campaigns = relationship("Campaign", foreign_keys="Campaign.launched_by", back_populates="launcher")
     workflows = relationship("Workflow", back_populates="user")
+    interactions = relationship("UserItemInteraction", back_populates="user")
 
     def __init__(self, email, hashed_password, first_name, last_name, company, is_active=True, role='user'):
         self.email = email
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime
@@ -8,13 +8,24 @@ class UserItemInteraction(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)  # lead the interaction is attributed to
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=True)  # campaign that produced it
     item_id = Column(Integer)  # This could reference different types of items
     interaction_type = Column(String)  # e.g., 'viewed', 'clicked', 'purchased'
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="interactions")
 
-    def __init__(self, user_id, item_id, interaction_type):
+    __table_args__ = (
+        # Per-lead and per-campaign lookups, and the recent rows analytics reads past its rollups
+        Index("ix_user_item_interactions_lead_time", "lead_id", "timestamp"),
+        Index("ix_user_item_interactions_campaign_time", "campaign_id", "timestamp"),
+    )
+
+    def __init__(self, user_id, item_id, interaction_type, lead_id=None, campaign_id=None, timestamp=None):
         self.user_id = user_id
         self.item_id = item_id
         self.interaction_type = interaction_type
+        self.lead_id = lead_id
+        self.campaign_id = campaign_id
+        self.timestamp = timestamp or datetime.utcnow()
@@ -13,7 +13,8 @@ class Workflow(Base):
 
     user = relationship("User", back_populates="workflows")
     triggers = relationship("Trigger", back_populates="workflow")
-    actions = relationship("Action", back_populates="workflow")
+    # Actions of all the workflow's triggers
+    actions = relationship("Action", secondary="triggers", viewonly=True)
 
     def __init__(self, name, description, is_active, user_id):
         self.name = name
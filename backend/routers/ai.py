@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, File, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 import json
 
-from ..database import get_db
-from ..services.lead_scoring_service import LeadScoringService
+from ..database import get_db, SessionLocal
+from ..services.ab_test_monitor import ABTestMonitor, ab_test_evaluator
+from ..services.campaign_forecast_service import campaign_forecast_scheduler
+from ..services.collaborative_filtering_service import CollaborativeFilteringService
+from ..services.lead_scoring_service import LeadScoringService, save_training_data
 from ..services.recommendation_service import RecommendationService
+from ..services.recommendation_list_service import RecommendationListService, recommendation_list_refresher
+from ..services.recommendation_maintenance import recommendation_maintenance_scheduler
+from ..services.model_registry import model_registry
+from ..services.rescoring_service import rescoring_scheduler
+from ..services.training_job_service import TrainingJobService, FINISHED_STATUSES
 from ..models.lead import Lead
 from ..models.ai_model import AIModel
+from ..models.training_job import TrainingJob
 
 router = APIRouter()
 
@@ -40,60 +50,246 @@ def score_lead(lead_id: int, db: Session = Depends(get_db)):
         "explanation": _generate_score_explanation(score, feature_importance)
     }
 
+@router.get("/ai/leads/rescoring")
+def get_rescoring_metrics():
+    """Report backlog size, lag and throughput of the background rescoring loop."""
+    return rescoring_scheduler.metrics
+
+@router.get("/ai/ab-tests/evaluations")
+def get_ab_test_evaluations():
+    """Report how many A/B tests the background loop last evaluated and how long it took."""
+    return ab_test_evaluator.metrics
+
+@router.get("/ai/campaigns/forecasts")
+def get_campaign_forecast_runs():
+    """Report how many active campaigns the forecast loop last covered and how many forecasts it regenerated."""
+    return campaign_forecast_scheduler.metrics
+
+@router.post("/ai/ab-tests/evaluate")
+def evaluate_ab_tests(db: Session = Depends(get_db)):
+    """Evaluate every running A/B test now and store the results on the tests."""
+    return ABTestMonitor(db).evaluate_running()
+
+@router.post("/ai/ab-tests/{ab_test_id}/rebuild")
+def rebuild_ab_test(ab_test_id: int, db: Session = Depends(get_db)):
+    """Recompute an A/B test's variant statistics from its campaigns' interactions."""
+    if not ABTestMonitor(db).rebuild([ab_test_id]):
+        raise HTTPException(status_code=404, detail="A/B test not found")
+        
+    return {"ab_test_id": ab_test_id, "message": "A/B test statistics rebuilt"}
+
 @router.post("/ai/leads/{lead_id}/recommendations")
 def get_recommendations(
     lead_id: int,
+    response: Response,
     n_recommendations: int = 5,
     db: Session = Depends(get_db)
 ):
-    """Get personalized recommendations for a lead."""
+    """Get personalized recommendations for a lead.
+    
+    Served from the lead's precomputed list when it has one, which after an
+    activation may still come from the previous model version until the
+    lists are refreshed; otherwise computed live. The
+    ``X-Recommendations-Source``, ``X-Recommendations-Computed-At`` and
+    ``X-Recommendations-Model-Version`` headers tell which.
+    """
+    # Precomputed list: a single primary-key read
+    stored = RecommendationListService(db).get(lead_id, n_recommendations)
+    if stored is not None:
+        recommendations, computed_at, model_version = stored
+        response.headers["X-Recommendations-Source"] = "precomputed"
+        response.headers["X-Recommendations-Computed-At"] = computed_at.isoformat()
+        response.headers["X-Recommendations-Model-Version"] = str(model_version)
+        return recommendations
+        
     # Get lead
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
         
-    # Get recommendations
     recommendation_service = RecommendationService(db)
+    if recommendation_service.model is None:
+        raise HTTPException(status_code=400, detail="No active recommendation model found")
+        
+    # Get recommendations
     recommendations = recommendation_service.get_recommendations(
         lead,
         n_recommendations=n_recommendations
     )
-    
-    if not recommendations:
-        raise HTTPException(status_code=400, detail="No active recommendation model found")
         
+    response.headers["X-Recommendations-Source"] = "live"
+    response.headers["X-Recommendations-Model-Version"] = str(recommendation_service.model_version)
     return recommendations
 
-@router.post("/ai/models/lead-scoring/train")
+@router.get("/ai/recommendations/lists")
+def get_recommendation_list_status(db: Session = Depends(get_db)):
+    """Report whether precomputed recommendation lists match the active model version."""
+    return {
+        **RecommendationListService(db).status(),
+        "refresher": recommendation_list_refresher.metrics
+    }
+
+@router.get("/ai/recommendations/maintenance")
+def get_recommendation_maintenance_metrics():
+    """Report the fold-in backlog and the fold-in and compaction jobs the maintenance loop queued."""
+    return recommendation_maintenance_scheduler.metrics
+
+@router.post("/ai/recommendations/batch")
+def get_batch_recommendations(
+    lead_ids: List[int],
+    n_recommendations: int = 5,
+    explain: bool = False
+):
+    """Get recommendations for many leads as newline-delimited JSON, one line per lead."""
+    # The stream outlives the request handler, so it owns its session
+    db = SessionLocal()
+    recommendation_service = RecommendationService(db)
+    if recommendation_service.model is None:
+        db.close()
+        raise HTTPException(status_code=400, detail="No active recommendation model found")
+        
+    def lines():
+        try:
+            for result in recommendation_service.iter_batch_recommendations(
+                lead_ids,
+                n_recommendations=n_recommendations,
+                explain=explain
+            ):
+                yield json.dumps(result) + "\n"
+        finally:
+            db.close()
+            
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/ai/users/{user_id}/item-recommendations")
+def get_item_recommendations(
+    user_id: int,
+    n_recommendations: int = 10,
+    db: Session = Depends(get_db)
+):
+    """Get items a user is likely to interact with, from their interaction history."""
+    recommendations = CollaborativeFilteringService(db).recommend_items(
+        user_id,
+        n_recommendations=n_recommendations
+    )
+    if recommendations is None:
+        raise HTTPException(status_code=400, detail="No active collaborative filtering model found")
+        
+    return {"user_id": user_id, "recommendations": recommendations}
+
+@router.post("/ai/models/lead-scoring/train", status_code=202)
 def train_lead_scoring_model(
     training_data: List[Dict[str, Any]],
     db: Session = Depends(get_db)
 ):
-    """Train a new lead scoring model."""
-    scoring_service = LeadScoringService(db)
-    metrics = scoring_service.train_model(training_data)
+    """Queue training of a new lead scoring model.
+    
+    The examples are written to a file the job refers to, so the job row
+    stays small however large the training set is.
+    """
+    if not training_data:
+        raise HTTPException(status_code=400, detail="No training data provided")
+        
+    try:
+        training_data_path = save_training_data(training_data)
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Each example needs a lead id and a converted flag")
+        
+    job = TrainingJobService(db).submit("lead_scoring", {"training_data_path": training_data_path})
     
     return {
-        "message": "Lead scoring model trained successfully",
-        "metrics": metrics
+        "message": "Lead scoring model training queued",
+        "job": _training_job_response(job)
     }
 
-@router.post("/ai/models/recommendations/train")
-def train_recommendation_model(db: Session = Depends(get_db)):
-    """Train a new recommendation model."""
-    # Get all leads for training
-    leads = db.query(Lead).all()
-    if not leads:
+@router.post("/ai/models/recommendations/train", status_code=202)
+def train_recommendation_model(streaming: bool = False, db: Session = Depends(get_db)):
+    """Queue training of a new recommendation model on all leads.
+    
+    With ``streaming`` the model is trained chunk by chunk in a hashed term
+    space and can afterwards be updated incrementally.
+    """
+    if db.query(Lead.id).first() is None:
         raise HTTPException(status_code=400, detail="No leads available for training")
         
+    job = TrainingJobService(db).submit("recommendation", {"mode": "streaming" if streaming else "full"})
+    
+    return {
+        "message": "Recommendation model training queued",
+        "job": _training_job_response(job)
+    }
+
+@router.post("/ai/models/collaborative-filtering/train", status_code=202)
+def train_collaborative_filtering_model(db: Session = Depends(get_db)):
+    """Queue training of a new collaborative filtering model on all user-item interactions."""
+    job = TrainingJobService(db).submit("collaborative_filtering")
+    
+    return {
+        "message": "Collaborative filtering model training queued",
+        "job": _training_job_response(job)
+    }
+
+@router.post("/ai/models/segmentation/train", status_code=202)
+def train_segmentation_model(db: Session = Depends(get_db)):
+    """Queue training of a new in-process segmentation model on a sample of leads."""
+    if db.query(Lead.id).first() is None:
+        raise HTTPException(status_code=400, detail="No leads available for training")
+        
+    job = TrainingJobService(db).submit("segmentation")
+    
+    return {
+        "message": "Segmentation model training queued",
+        "job": _training_job_response(job)
+    }
+
+@router.post("/ai/models/recommendations/update", status_code=202)
+def update_recommendation_model(lead_ids: List[int], db: Session = Depends(get_db)):
+    """Queue new or changed leads to be folded into the active streaming-trained recommendation model.
+    
+    The maintenance loop folds queued leads in as one batched training job.
+    """
+    if not lead_ids:
+        raise HTTPException(status_code=400, detail="No lead ids provided")
+        
     recommendation_service = RecommendationService(db)
-    metrics = recommendation_service.train_model(leads)
+    queued = recommendation_service.queue_updates(lead_ids)
+    db.commit()
+    backlog, oldest = recommendation_service.update_backlog()
     
     return {
-        "message": "Recommendation model trained successfully",
-        "metrics": metrics
+        "message": "Leads queued for the next recommendation model update",
+        "queued": queued,
+        "backlog": backlog,
+        "oldest_queued_at": oldest
     }
 
+@router.get("/ai/training-jobs")
+def list_training_jobs(limit: int = 50, db: Session = Depends(get_db)):
+    """List the most recent training jobs."""
+    return [_training_job_response(job) for job in TrainingJobService(db).recent(limit)]
+
+@router.get("/ai/training-jobs/{job_id}")
+def get_training_job(job_id: int, db: Session = Depends(get_db)):
+    """Get status, progress and metrics of a training job."""
+    job = TrainingJobService(db).get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+        
+    return _training_job_response(job)
+
+@router.post("/ai/training-jobs/{job_id}/cancel")
+def cancel_training_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued or running training job."""
+    job_service = TrainingJobService(db)
+    job = job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Training job already {job.status}")
+        
+    job = job_service.request_cancel(job)
+    return _training_job_response(job)
+
 @router.get("/ai/models")
 def list_models(db: Session = Depends(get_db)):
     """List all AI models."""
@@ -112,6 +308,11 @@ def list_models(db: Session = Depends(get_db)):
         for model in models
     ]
 
+@router.get("/ai/models/registry")
+def get_model_registry_stats():
+    """Report per-model load counts and timings of the in-process model cache."""
+    return model_registry.stats()
+
 @router.post("/ai/models/{model_id}/activate")
 def activate_model(model_id: int, db: Session = Depends(get_db)):
     """Activate a specific model version."""
@@ -119,19 +320,32 @@ def activate_model(model_id: int, db: Session = Depends(get_db)):
     model = db.query(AIModel).filter(AIModel.id == model_id).first()
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
+    if not model.filepath:
+        raise HTTPException(status_code=409, detail="Model artifact was pruned; train a new version instead")
         
-    # Deactivate other models of the same type
-    db.query(AIModel).filter(
-        AIModel.name == model.name,
-        AIModel.is_active == True
-    ).update({"is_active": False})
-    
-    # Activate selected model
-    model.is_active = True
-    db.commit()
-    
+    # Deactivate other models of the same type and activate the selected one
+    model_registry.activate(db, model)
+
     return {"message": f"Model {model.name} v{model.version} activated successfully"}
 
+def _training_job_response(job: TrainingJob) -> Dict[str, Any]:
+    """Serialize a training job without its (potentially large) training inputs."""
+    return {
+        "id": job.id,
+        "model_name": job.model_name,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "cancel_requested": job.cancel_requested,
+        "model_id": job.model_id,
+        "metrics": json.loads(job.metrics) if job.metrics else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at
+    }
+
 def _generate_score_explanation(score: float, feature_importance: Dict[str, float]) -> str:
     """Generate a human-readable explanation for a lead score."""
     # Sort features by importance
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
+from datetime import date
 
 from ..database import get_db
 from ..services.lead_scoring_service import LeadScoringService
 from ..services.recommendation_service import RecommendationService
 from ..services.segmentation_service import SegmentationService
+from ..services.segment_freshness import segment_freshness
 from ..services.nlp_service import NLPService
 from ..services.analytics_service import AnalyticsService
 from ..models.lead import Lead
 from ..models.campaign import Campaign
+from ..models.segmentation_run import SegmentationRun
 
 router = APIRouter(
     prefix="/ai",
@@ -44,10 +47,22 @@ async def batch_score_leads(
     db: Session = Depends(get_db)
 ):
     try:
-        scoring_service = LeadScoringService()
-        leads = db.query(Lead).filter(Lead.id.in_(lead_ids)).all()
-        scores = await scoring_service.batch_score_leads(leads, db)
+        scoring_service = LeadScoringService(db)
+        chunk_size = scoring_service.config["query_chunk_size"]
+        leads = []
+        for start in range(0, len(lead_ids), chunk_size):
+            leads.extend(
+                db.query(Lead).filter(Lead.id.in_(lead_ids[start:start + chunk_size])).all()
+            )
+        scores = scoring_service.batch_score_leads(leads)
+        if scores is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No active lead scoring model found"
+            )
         return {"scores": scores}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -103,6 +118,7 @@ async def get_campaign_recommendations(
 @router.post("/leads/{lead_id}/segment")
 async def get_lead_segment(
     lead_id: int,
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
     try:
@@ -113,7 +129,7 @@ async def get_lead_segment(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Lead not found"
             )
-        segment = await segmentation_service.get_lead_segment(lead, db)
+        segment = await segmentation_service.get_lead_segment(lead, db, force=refresh)
         return {"lead_id": lead_id, "segment": segment}
     except Exception as e:
         raise HTTPException(
@@ -124,12 +140,13 @@ async def get_lead_segment(
 @router.post("/leads/batch-segment")
 async def batch_segment_leads(
     lead_ids: List[int],
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
     try:
         segmentation_service = SegmentationService()
         leads = db.query(Lead).filter(Lead.id.in_(lead_ids)).all()
-        segments = await segmentation_service.batch_segment_leads(leads, db)
+        segments = await segmentation_service.batch_segment_leads(leads, db, force=refresh)
         return {"segments": segments}
     except Exception as e:
         raise HTTPException(
@@ -137,6 +154,55 @@ async def batch_segment_leads(
             detail=str(e)
         )
 
+@router.get("/segmentation/cache")
+async def get_segmentation_cache_stats():
+    """Report how often stored segments were reused instead of calling the segmentation model."""
+    return segment_freshness.stats()
+
+@router.get("/segmentation/runs")
+async def list_segmentation_runs(
+    limit: int = 10,
+    db: Session = Depends(get_db)
+):
+    """Progress and checkpoints of the most recent whole-table segmentation runs."""
+    runs = db.query(SegmentationRun).order_by(SegmentationRun.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": run.id,
+            "status": run.status,
+            "force": run.force,
+            "last_lead_id": run.last_lead_id,
+            "max_lead_id": run.max_lead_id,
+            "processed": run.processed,
+            "predicted": run.predicted,
+            "error": run.error,
+            "started_at": run.started_at,
+            "updated_at": run.updated_at,
+            "finished_at": run.finished_at
+        }
+        for run in runs
+    ]
+
+@router.get("/segmentation/local-model/agreement")
+async def get_segmentation_agreement(
+    sample_size: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Compare the in-process segmentation model with the remote one on a sample of leads."""
+    try:
+        segmentation_service = SegmentationService()
+        return await segmentation_service.compare_with_remote(db, sample_size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 # NLP Endpoints
 @router.post("/nlp/analyze-sentiment")
 async def analyze_sentiment(
@@ -188,6 +254,7 @@ async def generate_response(
 @router.get("/analytics/campaigns/{campaign_id}/performance")
 async def get_campaign_performance(
     campaign_id: int,
+    exact: bool = True,
     db: Session = Depends(get_db)
 ):
     try:
@@ -198,7 +265,7 @@ async def get_campaign_performance(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Campaign not found"
             )
-        performance = await analytics_service.get_campaign_performance(campaign, db)
+        performance = await analytics_service.get_campaign_performance(campaign_id, db, exact=exact)
         return performance
     except Exception as e:
         raise HTTPException(
@@ -210,6 +277,7 @@ async def get_campaign_performance(
 async def predict_campaign_performance(
     campaign_id: int,
     days_ahead: int = 30,
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
     try:
@@ -220,7 +288,12 @@ async def predict_campaign_performance(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Campaign not found"
             )
-        prediction = await analytics_service.predict_campaign_performance(campaign, days_ahead, db)
+        prediction = await analytics_service.predict_campaign_performance(
+            campaign_id,
+            db,
+            refresh=refresh,
+            days_ahead=days_ahead
+        )
         return prediction
     except Exception as e:
         raise HTTPException(
@@ -228,10 +301,32 @@ async def predict_campaign_performance(
             detail=str(e)
         )
 
+@router.get("/analytics/forecasts")
+async def get_campaign_forecasts(
+    campaign_ids: List[int] = Query(...),
+    days_ahead: int = 30,
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    try:
+        analytics_service = AnalyticsService()
+        return await analytics_service.predict_campaigns_performance(
+            campaign_ids,
+            db,
+            refresh=refresh,
+            days_ahead=days_ahead
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @router.get("/analytics/ab-test")
 async def get_ab_test_results(
     campaign_a_id: int,
     campaign_b_id: int,
+    exact: bool = True,
     db: Session = Depends(get_db)
 ):
     try:
@@ -243,8 +338,30 @@ async def get_ab_test_results(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="One or both campaigns not found"
             )
-        results = await analytics_service.get_ab_test_results(campaign_a, campaign_b, db)
+        results = await analytics_service.get_ab_test_results(campaign_a_id, campaign_b_id, db, exact=exact)
         return results
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.get("/analytics/reach")
+async def get_campaign_reach(
+    start_date: date,
+    end_date: date,
+    campaign_ids: List[int] = Query(...),
+    exact: bool = True,
+    db: Session = Depends(get_db)
+):
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    try:
+        analytics_service = AnalyticsService()
+        return await analytics_service.get_campaign_reach(campaign_ids, start_date, end_date, db, exact=exact)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -2,6 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.user_item_interaction import UserItemInteraction as DBUserItemInteraction
+from ..services.ab_test_monitor import ABTestMonitor
+from ..services.analytics_rollup_service import AnalyticsRollupService
+from ..services.analytics_sketch_service import AnalyticsSketchService
 from ..schemas.user_item_interaction import UserItemInteraction, UserItemInteractionCreate
 
 router = APIRouter(prefix="/user_item_interactions", tags=["user_item_interactions"])
@@ -10,6 +13,10 @@ router = APIRouter(prefix="/user_item_interactions", tags=["user_item_interactio
 def create_user_item_interaction(interaction: UserItemInteractionCreate, db: Session = Depends(get_db)):
     db_interaction = DBUserItemInteraction(**interaction.dict())
     db.add(db_interaction)
+    # Keep the analytics rollups, sketches and A/B test statistics in the same transaction as the interaction
+    AnalyticsRollupService(db).record_interaction(db_interaction)
+    AnalyticsSketchService(db).record_interaction(db_interaction)
+    ABTestMonitor(db).record_interaction(db_interaction)
     db.commit()
     db.refresh(db_interaction)
     return db_interaction
@@ -6,6 +6,8 @@ class UserItemInteractionBase(BaseModel):
     user_id: int
     item_id: int
     interaction_type: str  # e.g., 'viewed', 'clicked', 'purchased'
+    lead_id: Optional[int] = None
+    campaign_id: Optional[int] = None
     timestamp: Optional[datetime] = None
 
 class UserItemInteractionCreate(UserItemInteractionBase):
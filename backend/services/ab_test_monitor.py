@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.special import ndtr
+from sqlalchemy import case, func, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.ab_test_stats import ABTestLead, ABTestVariantStats
+from ..models.ai_data import ABTest
+from ..models.user_item_interaction import UserItemInteraction
+from ..config.ai_config import MODEL_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ("A", "B")
+
+
+def two_proportion_z_test(conversions_a, leads_a, conversions_b, leads_b) -> Dict[str, np.ndarray]:
+    """Pooled two-proportion z-test of many A/B pairs at once.
+
+    Takes arrays of converted and exposed leads per variant and returns the
+    conversion rates, z-scores (positive when A converts better) and two-sided
+    p-values. Pairs where a variant has no leads, or where no variance is
+    observed, get z = 0 and p = 1 instead of dividing by zero.
+    """
+    x_a, n_a, x_b, n_b = (
+        np.asarray(values, dtype=np.float64)
+        for values in (conversions_a, leads_a, conversions_b, leads_b)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate_a = np.where(n_a > 0, x_a / n_a, 0.0)
+        rate_b = np.where(n_b > 0, x_b / n_b, 0.0)
+        pooled = np.where(n_a + n_b > 0, (x_a + x_b) / (n_a + n_b), 0.0)
+        se = np.sqrt(pooled * (1.0 - pooled) * (1.0 / n_a + 1.0 / n_b))
+        valid = (n_a > 0) & (n_b > 0) & (se > 0)
+        z = np.where(valid, (rate_a - rate_b) / se, 0.0)
+    return {
+        "rate_a": rate_a,
+        "rate_b": rate_b,
+        "z": z,
+        "p_value": 2.0 * ndtr(-np.abs(z))
+    }
+
+
+class ABTestMonitor:
+    """Per-variant sufficient statistics of A/B tests, and their evaluation.
+
+    Each interaction with a test's campaign during the test updates the
+    variant's exposures, distinct leads and converted leads in the transaction
+    that writes it. Evaluation then needs only those counters: every running
+    test is z-tested in one NumPy pass and the outcome is stored on the test.
+    """
+
+    def __init__(self, db: Session, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = config or MODEL_PARAMETERS["analytics"]
+
+    def record_interaction(self, interaction: UserItemInteraction):
+        """Count an interaction towards the tests its campaign is running in. The caller commits."""
+        if interaction.campaign_id is None or interaction.lead_id is None:
+            return
+
+        timestamp = interaction.timestamp
+        tests = (
+            self.db.query(ABTest.id, ABTest.campaign_a_id)
+            .filter(
+                or_(ABTest.campaign_a_id == interaction.campaign_id, ABTest.campaign_b_id == interaction.campaign_id),
+                ABTest.start_date <= timestamp,
+                or_(ABTest.end_date.is_(None), ABTest.end_date >= timestamp)
+            )
+            .all()
+        )
+        converting = interaction.interaction_type == self.config["conversion_type"]
+        for ab_test_id, campaign_a_id in tests:
+            variant = "A" if campaign_a_id == interaction.campaign_id else "B"
+            new_lead, converted = self._record_lead(ab_test_id, variant, interaction.lead_id, converting)
+            self._increment(ab_test_id, variant, exposures=1, unique_leads=new_lead, conversions=converted)
+
+    def _record_lead(self, ab_test_id: int, variant: str, lead_id: int, converting: bool) -> Tuple[int, int]:
+        """Whether the lead is new to the variant, and whether it converted for the first time."""
+        key = (
+            ABTestLead.ab_test_id == ab_test_id,
+            ABTestLead.variant == variant,
+            ABTestLead.lead_id == lead_id
+        )
+        if self.db.query(ABTestLead.converted).filter(*key).first() is None:
+            try:
+                with self.db.begin_nested():
+                    self.db.add(
+                        ABTestLead(ab_test_id=ab_test_id, variant=variant, lead_id=lead_id, converted=converting)
+                    )
+                return 1, int(converting)
+            except IntegrityError:
+                # Another writer recorded the lead first
+                pass
+
+        if not converting:
+            return 0, 0
+        # Only the writer that flips the flag counts the conversion
+        updated = (
+            self.db.query(ABTestLead)
+            .filter(*key, ABTestLead.converted.is_(False))
+            .update({ABTestLead.converted: True}, synchronize_session=False)
+        )
+        return 0, int(updated > 0)
+
+    def _increment(self, ab_test_id: int, variant: str, **counts):
+        now = datetime.utcnow()
+        update = {
+            getattr(ABTestVariantStats, field): getattr(ABTestVariantStats, field) + value
+            for field, value in counts.items()
+        }
+        update[ABTestVariantStats.updated_at] = now
+        query = self.db.query(ABTestVariantStats).filter(
+            ABTestVariantStats.ab_test_id == ab_test_id,
+            ABTestVariantStats.variant == variant
+        )
+        if query.update(update, synchronize_session=False):
+            return
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(ABTestVariantStats(ab_test_id=ab_test_id, variant=variant, updated_at=now, **counts))
+        except IntegrityError:
+            # Another writer created the row first
+            query.update(update, synchronize_session=False)
+
+    def rebuild(self, ab_test_ids: Optional[List[int]] = None) -> int:
+        """Recompute the statistics of the given tests (default: all) from the interactions table.
+
+        Needed for tests created after their start date, or whose campaigns
+        received interactions written without ``record_interaction``. Returns
+        the number of tests rebuilt.
+        """
+        query = self.db.query(ABTest)
+        if ab_test_ids is not None:
+            query = query.filter(ABTest.id.in_(ab_test_ids))
+        tests = query.all()
+        conversion_type = self.config["conversion_type"]
+        now = datetime.utcnow()
+
+        for test in tests:
+            self.db.query(ABTestLead).filter(ABTestLead.ab_test_id == test.id).delete(synchronize_session=False)
+            self.db.query(ABTestVariantStats).filter(
+                ABTestVariantStats.ab_test_id == test.id
+            ).delete(synchronize_session=False)
+
+            for variant, campaign_id in zip(VARIANTS, (test.campaign_a_id, test.campaign_b_id)):
+                during_test = [
+                    UserItemInteraction.campaign_id == campaign_id,
+                    UserItemInteraction.lead_id.isnot(None),
+                    UserItemInteraction.timestamp >= test.start_date
+                ]
+                if test.end_date is not None:
+                    during_test.append(UserItemInteraction.timestamp <= test.end_date)
+                converted = func.max(case((UserItemInteraction.interaction_type == conversion_type, 1), else_=0)) == 1
+
+                self.db.execute(insert(ABTestLead).from_select(
+                    ["ab_test_id", "variant", "lead_id", "converted"],
+                    select(literal(test.id), literal(variant), UserItemInteraction.lead_id, converted)
+                    .where(*during_test)
+                    .group_by(UserItemInteraction.lead_id)
+                ))
+                exposures = self.db.query(func.count(UserItemInteraction.id)).filter(*during_test).scalar()
+                unique_leads, conversions = self.db.query(
+                    func.count(ABTestLead.lead_id),
+                    func.coalesce(func.sum(case((ABTestLead.converted, 1), else_=0)), 0)
+                ).filter(ABTestLead.ab_test_id == test.id, ABTestLead.variant == variant).one()
+                self.db.add(ABTestVariantStats(
+                    ab_test_id=test.id,
+                    variant=variant,
+                    exposures=exposures,
+                    unique_leads=unique_leads,
+                    conversions=conversions,
+                    updated_at=now
+                ))
+        self.db.commit()
+
+        return len(tests)
+
+    def evaluate_running(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Test every running A/B test and store its metrics, winner and confidence level.
+
+        Tests that ended are evaluated once more and then keep their final
+        winner: 'A' or 'B' when significant, 'tie' otherwise. A running test
+        only gets a winner once both variants have ``min_data_points`` leads
+        and the difference is significant.
+        """
+        now = now or datetime.utcnow()
+        tests = (
+            self.db.query(ABTest)
+            .filter(
+                ABTest.start_date <= now,
+                or_(ABTest.end_date.is_(None), ABTest.end_date > now, ABTest.winner.is_(None))
+            )
+            .order_by(ABTest.id)
+            .all()
+        )
+        if not tests:
+            return []
+
+        index = {test.id: i for i, test in enumerate(tests)}
+        counts = np.zeros((3, len(VARIANTS), len(tests)), dtype=np.int64)
+        for row in self.db.query(ABTestVariantStats).filter(ABTestVariantStats.ab_test_id.in_(list(index))):
+            column = (VARIANTS.index(row.variant), index[row.ab_test_id])
+            counts[(0,) + column] = row.exposures
+            counts[(1,) + column] = row.unique_leads
+            counts[(2,) + column] = row.conversions
+        exposures, leads, conversions = counts
+
+        result = two_proportion_z_test(conversions[0], leads[0], conversions[1], leads[1])
+        enough_data = (leads >= self.config["min_data_points"]).all(axis=0)
+        significant = enough_data & (result["p_value"] < self.config["ab_test_significance"])
+        confidence = 1.0 - result["p_value"]
+        ended = np.array([test.end_date is not None and test.end_date <= now for test in tests])
+        winners = np.where(significant, np.where(result["z"] > 0, "A", "B"), np.where(ended, "tie", ""))
+
+        evaluations = []
+        for i, test in enumerate(tests):
+            rate_a, rate_b = float(result["rate_a"][i]), float(result["rate_b"][i])
+            loser_rate = min(rate_a, rate_b)
+            metrics = {
+                variant: {
+                    "exposures": int(exposures[v, i]),
+                    "unique_leads": int(leads[v, i]),
+                    "conversions": int(conversions[v, i]),
+                    "conversion_rate": rate
+                }
+                for v, (variant, rate) in enumerate(zip(VARIANTS, (rate_a, rate_b)))
+            }
+            metrics.update({
+                "z_score": float(result["z"][i]),
+                "p_value": float(result["p_value"][i]),
+                "improvement_percentage": abs(rate_a - rate_b) / loser_rate * 100 if loser_rate > 0 else None,
+                "enough_data": bool(enough_data[i]),
+                "significant": bool(significant[i]),
+                "evaluated_at": now.isoformat()
+            })
+            test.metrics = metrics
+            test.winner = str(winners[i]) or None
+            test.confidence_level = float(confidence[i])
+            evaluations.append({
+                "ab_test_id": test.id,
+                "winner": test.winner,
+                "confidence_level": test.confidence_level,
+                "metrics": metrics
+            })
+        self.db.commit()
+
+        return evaluations
+
+
+class ABTestEvaluator:
+    """Background loop that re-evaluates running A/B tests from their statistics."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or MODEL_PARAMETERS["analytics"]["ab_monitor"]
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "runs_total": 0,
+            "errors_total": 0,
+            "last_tests": 0,
+            "last_significant": 0,
+            "last_run_seconds": None,
+            "last_run_at": None
+        }
+
+    def _evaluate(self) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return ABTestMonitor(db).evaluate_running()
+        finally:
+            db.close()
+
+    async def run_once(self):
+        """Evaluate every running A/B test."""
+        start = time.perf_counter()
+        evaluations = await asyncio.to_thread(self._evaluate)
+
+        self.metrics["runs_total"] += 1
+        self.metrics["last_tests"] = len(evaluations)
+        self.metrics["last_significant"] = sum(evaluation["metrics"]["significant"] for evaluation in evaluations)
+        self.metrics["last_run_seconds"] = time.perf_counter() - start
+        self.metrics["last_run_at"] = datetime.utcnow()
+
+    async def run(self):
+        """Run the evaluation loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.metrics["errors_total"] += 1
+                logger.error(f"Error in A/B test evaluation loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the evaluation loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+
+ab_test_evaluator = ABTestEvaluator()
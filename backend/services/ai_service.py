@@ -1,11 +1,21 @@
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from google.cloud import aiplatform
 from ..config.ai_config import VERTEX_AI_CONFIG, ENDPOINTS, ERROR_HANDLING
 import asyncio
 
+class BatchPredictionError(Exception):
+    """Raised by predict_batches when a batch still fails after its retries."""
+
+    def __init__(self, endpoint_id: str, batch: int, n_batches: int, error: Exception):
+        super().__init__(f"Batch {batch + 1} of {n_batches} on endpoint {endpoint_id} failed: {error}")
+        self.batch = batch
+        self.n_batches = n_batches
+
 class AIService:
     def __init__(self):
+        self._endpoints: Dict[str, aiplatform.Endpoint] = {}
         try:
             aiplatform.init(
                 project=VERTEX_AI_CONFIG["project_id"],
@@ -16,21 +26,34 @@ class AIService:
             logging.error(f"Failed to initialize Vertex AI: {str(e)}")
             raise
 
-    async def predict(
+    def _endpoint(self, endpoint_id: str) -> aiplatform.Endpoint:
+        """Endpoint handle, created once per endpoint id; creating one is an API round trip."""
+        endpoint = self._endpoints.get(endpoint_id)
+        if endpoint is None:
+            endpoint = self._endpoints[endpoint_id] = aiplatform.Endpoint(endpoint_id)
+        return endpoint
+
+    async def _predict_with_retries(
         self,
         endpoint_id: str,
         instances: List[Dict[str, Any]],
         timeout: Optional[float] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Predictions for one request and the number of attempts it took.
+        
+        The blocking client call runs in a worker thread so that concurrent
+        requests overlap instead of holding up the event loop.
+        """
         retries = 0
         while retries < ERROR_HANDLING["max_retries"]:
             try:
-                endpoint = aiplatform.Endpoint(endpoint_id)
-                predictions = endpoint.predict(
+                endpoint = await asyncio.to_thread(self._endpoint, endpoint_id)
+                predictions = await asyncio.to_thread(
+                    endpoint.predict,
                     instances=instances,
                     timeout=timeout or 120
                 )
-                return predictions.predictions
+                return predictions.predictions, retries + 1
             except Exception as e:
                 retries += 1
                 if retries == ERROR_HANDLING["max_retries"]:
@@ -39,12 +62,84 @@ class AIService:
                 logging.warning(f"Prediction attempt {retries} failed: {str(e)}")
                 await asyncio.sleep(ERROR_HANDLING["retry_delay"])
 
+    async def predict(
+        self,
+        endpoint_id: str,
+        instances: List[Dict[str, Any]],
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        predictions, _ = await self._predict_with_retries(endpoint_id, instances, timeout)
+        return predictions
+
+    async def predict_batches(
+        self,
+        endpoint_id: str,
+        instances: List[Dict[str, Any]],
+        batch_size: int,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Predict many instances in batches sent concurrently.
+        
+        At most ``max_concurrency`` batches are in flight at once. Each batch
+        is retried on its own, so one failing batch does not restart the
+        others; if a batch still fails, the remaining batches are cancelled
+        and a BatchPredictionError naming it is raised, so callers never get
+        partial predictions. Returns the predictions in the order of
+        ``instances`` and one report per batch with its size, attempts and
+        latency in seconds. Batches that needed retries are logged here, so
+        callers only need the reports for their own metrics.
+        """
+        batches = [instances[i:i + batch_size] for i in range(0, len(instances), batch_size)]
+        semaphore = asyncio.Semaphore(max_concurrency or VERTEX_AI_CONFIG["max_concurrent_predictions"])
+        reports: List[Optional[Dict[str, Any]]] = [None] * len(batches)
+        
+        async def run_batch(position: int, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    predictions, attempts = await self._predict_with_retries(endpoint_id, batch, timeout)
+                except Exception as e:
+                    raise BatchPredictionError(endpoint_id, position, len(batches), e) from e
+                elapsed = time.perf_counter() - start
+                
+            if len(predictions) != len(batch):
+                raise ValueError(
+                    f"Endpoint {endpoint_id} returned {len(predictions)} predictions for {len(batch)} instances"
+                )
+            reports[position] = {"batch": position, "size": len(batch), "attempts": attempts, "seconds": elapsed}
+            return predictions
+            
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(run_batch(position, batch)) for position, batch in enumerate(batches)]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+            
+        if reports:
+            latencies = sorted(report["seconds"] for report in reports)
+            logging.info(
+                f"Predicted {len(instances)} instances in {len(batches)} batches on endpoint {endpoint_id} "
+                f"in {time.perf_counter() - start:.2f}s (batch latency max {latencies[-1]:.2f}s, "
+                f"median {latencies[len(latencies) // 2]:.2f}s)"
+            )
+            retried = [report for report in reports if report["attempts"] > 1]
+            if retried:
+                logging.warning(
+                    f"{len(retried)} of {len(batches)} batches on endpoint {endpoint_id} needed retries "
+                    f"({sum(report['attempts'] - 1 for report in retried)} failed attempts)"
+                )
+        return [prediction for predictions in results for prediction in predictions], reports
+
     async def create_dataset(
         self,
         display_name: str,
         metadata: Optional[Dict[str, Any]] = None,
         sync: bool = True
-    ) -> aiplatform.Dataset:
+    ) -> "aiplatform.Dataset":
         try:
             dataset = aiplatform.Dataset.create(
                 display_name=display_name,
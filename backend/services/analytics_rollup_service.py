@@ -0,0 +1,337 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, extract, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.analytics_rollup import CampaignInteractionRollup, CampaignLead, LeadInteractionRollup
+from ..models.user_item_interaction import UserItemInteraction
+
+
+class AnalyticsRollupService:
+    """Interaction counts pre-aggregated per (campaign, type, hour) and per (lead, type, day).
+
+    Interactions are added to their buckets in the transaction that writes them,
+    and every (campaign, lead) pair is kept with its first interaction so
+    distinct leads can be counted without scanning interactions. Reads sum the
+    buckets of closed periods and aggregate raw interactions only for the open
+    one: the current hour for campaigns, the current day for leads. Their cost
+    grows with the number of buckets rather than interactions. Interactions
+    written without ``record_interaction`` are picked up while their period is
+    open and by ``rebuild`` afterwards.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_interaction(self, interaction: UserItemInteraction):
+        """Add one interaction to its campaign and lead buckets. The caller commits."""
+        if interaction.interaction_type is None:
+            return
+
+        timestamp = interaction.timestamp
+        if interaction.campaign_id is not None:
+            self._upsert(
+                CampaignInteractionRollup,
+                {
+                    "campaign_id": interaction.campaign_id,
+                    "day": timestamp.date(),
+                    "hour": timestamp.hour,
+                    "interaction_type": interaction.interaction_type
+                },
+                {CampaignInteractionRollup.count: CampaignInteractionRollup.count + 1},
+                {"count": 1}
+            )
+
+        if interaction.lead_id is not None:
+            first = LeadInteractionRollup.first_interaction_at
+            last = LeadInteractionRollup.last_interaction_at
+            self._upsert(
+                LeadInteractionRollup,
+                {
+                    "lead_id": interaction.lead_id,
+                    "day": timestamp.date(),
+                    "interaction_type": interaction.interaction_type
+                },
+                {
+                    LeadInteractionRollup.count: LeadInteractionRollup.count + 1,
+                    first: case((first > timestamp, timestamp), else_=first),
+                    last: case((last < timestamp, timestamp), else_=last)
+                },
+                {"count": 1, "first_interaction_at": timestamp, "last_interaction_at": timestamp}
+            )
+
+        if interaction.campaign_id is not None and interaction.lead_id is not None:
+            first = CampaignLead.first_interaction_at
+            self._upsert(
+                CampaignLead,
+                {"campaign_id": interaction.campaign_id, "lead_id": interaction.lead_id},
+                {first: case((first > timestamp, timestamp), else_=first)},
+                {"first_interaction_at": timestamp}
+            )
+
+    def _upsert(self, model, key: Dict[str, Any], update: Dict[Any, Any], initial: Dict[str, Any]):
+        if self._update(model, key, update):
+            return
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(model(**key, **initial))
+        except IntegrityError:
+            # Another writer created the row first
+            self._update(model, key, update)
+
+    def _update(self, model, key: Dict[str, Any], update: Dict[Any, Any]) -> bool:
+        updated = (
+            self.db.query(model)
+            .filter(*(getattr(model, column) == value for column, value in key.items()))
+            .update(update, synchronize_session=False)
+        )
+        return updated > 0
+
+    def campaign_counts(self, campaign_id: int, now: Optional[datetime] = None) -> Tuple[Dict[str, int], int]:
+        """Interactions per type and number of distinct leads of a campaign."""
+        return self.bulk_campaign_counts([campaign_id], now)[campaign_id]
+
+    def bulk_campaign_counts(
+        self,
+        campaign_ids: List[int],
+        now: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> Dict[int, Tuple[Dict[str, int], int]]:
+        """Interactions per type and number of distinct leads of each campaign, in grouped queries."""
+        open_start = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        rollup = CampaignInteractionRollup
+        closed = or_(
+            rollup.day < open_start.date(),
+            and_(rollup.day == open_start.date(), rollup.hour < open_start.hour)
+        )
+        interaction_types = {campaign_id: defaultdict(int) for campaign_id in campaign_ids}
+        unique_leads = dict.fromkeys(campaign_ids, 0)
+
+        for start in range(0, len(campaign_ids), chunk_size):
+            chunk = campaign_ids[start:start + chunk_size]
+            open_rows = and_(
+                UserItemInteraction.campaign_id.in_(chunk),
+                UserItemInteraction.timestamp >= open_start,
+                UserItemInteraction.interaction_type.isnot(None)
+            )
+
+            rows = (
+                self.db.query(rollup.campaign_id, rollup.interaction_type, func.sum(rollup.count))
+                .filter(rollup.campaign_id.in_(chunk), closed)
+                .group_by(rollup.campaign_id, rollup.interaction_type)
+                .all()
+            )
+            rows += (
+                self.db.query(
+                    UserItemInteraction.campaign_id,
+                    UserItemInteraction.interaction_type,
+                    func.count(UserItemInteraction.id)
+                )
+                .filter(open_rows)
+                .group_by(UserItemInteraction.campaign_id, UserItemInteraction.interaction_type)
+                .all()
+            )
+            for campaign_id, interaction_type, count in rows:
+                interaction_types[campaign_id][interaction_type] += int(count)
+
+            # Leads seen before the open hour, plus leads first seen in it
+            seen_before = (
+                select(CampaignLead.lead_id)
+                .where(
+                    CampaignLead.campaign_id == UserItemInteraction.campaign_id,
+                    CampaignLead.lead_id == UserItemInteraction.lead_id,
+                    CampaignLead.first_interaction_at < open_start
+                )
+                .exists()
+            )
+            rows = (
+                self.db.query(CampaignLead.campaign_id, func.count(CampaignLead.lead_id))
+                .filter(CampaignLead.campaign_id.in_(chunk), CampaignLead.first_interaction_at < open_start)
+                .group_by(CampaignLead.campaign_id)
+                .all()
+            )
+            rows += (
+                self.db.query(UserItemInteraction.campaign_id, func.count(func.distinct(UserItemInteraction.lead_id)))
+                .filter(open_rows, ~seen_before)
+                .group_by(UserItemInteraction.campaign_id)
+                .all()
+            )
+            for campaign_id, count in rows:
+                unique_leads[campaign_id] += int(count)
+
+        return {
+            campaign_id: (dict(interaction_types[campaign_id]), unique_leads[campaign_id])
+            for campaign_id in campaign_ids
+        }
+
+    def interaction_counts(
+        self,
+        campaign_ids: List[int],
+        start: date,
+        end: date,
+        now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Interactions per type of several campaigns from ``start`` to ``end`` (inclusive days)."""
+        open_start = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        rollup = CampaignInteractionRollup
+        closed = or_(
+            rollup.day < open_start.date(),
+            and_(rollup.day == open_start.date(), rollup.hour < open_start.hour)
+        )
+
+        interaction_types = defaultdict(int)
+        rows = (
+            self.db.query(rollup.interaction_type, func.sum(rollup.count))
+            .filter(rollup.campaign_id.in_(campaign_ids), rollup.day >= start, rollup.day <= end, closed)
+            .group_by(rollup.interaction_type)
+            .all()
+        )
+        if end >= open_start.date():
+            rows += (
+                self.db.query(UserItemInteraction.interaction_type, func.count(UserItemInteraction.id))
+                .filter(
+                    UserItemInteraction.campaign_id.in_(campaign_ids),
+                    UserItemInteraction.timestamp >= max(open_start, datetime.combine(start, time.min)),
+                    UserItemInteraction.timestamp < datetime.combine(end + timedelta(days=1), time.min),
+                    UserItemInteraction.interaction_type.isnot(None)
+                )
+                .group_by(UserItemInteraction.interaction_type)
+                .all()
+            )
+        for interaction_type, count in rows:
+            interaction_types[interaction_type] += int(count)
+
+        return dict(interaction_types)
+
+    def lead_summary(self, lead_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Interactions per type, first and last interaction, and number of campaigns engaged of a lead."""
+        open_start = datetime.combine((now or datetime.utcnow()).date(), time.min)
+        rollup = LeadInteractionRollup
+        open_rows = and_(
+            UserItemInteraction.lead_id == lead_id,
+            UserItemInteraction.timestamp >= open_start,
+            UserItemInteraction.interaction_type.isnot(None)
+        )
+
+        rows = (
+            self.db.query(
+                rollup.interaction_type,
+                func.sum(rollup.count),
+                func.min(rollup.first_interaction_at),
+                func.max(rollup.last_interaction_at)
+            )
+            .filter(rollup.lead_id == lead_id, rollup.day < open_start.date())
+            .group_by(rollup.interaction_type)
+            .all()
+        )
+        rows += (
+            self.db.query(
+                UserItemInteraction.interaction_type,
+                func.count(UserItemInteraction.id),
+                func.min(UserItemInteraction.timestamp),
+                func.max(UserItemInteraction.timestamp)
+            )
+            .filter(open_rows)
+            .group_by(UserItemInteraction.interaction_type)
+            .all()
+        )
+
+        interaction_types = defaultdict(int)
+        first_interaction = None
+        last_interaction = None
+        for interaction_type, count, first, last in rows:
+            interaction_types[interaction_type] += int(count)
+            first_interaction = first if first_interaction is None else min(first_interaction, first)
+            last_interaction = last if last_interaction is None else max(last_interaction, last)
+
+        # Campaigns engaged before today, plus campaigns first engaged today
+        seen_before = (
+            select(CampaignLead.campaign_id)
+            .where(
+                CampaignLead.lead_id == lead_id,
+                CampaignLead.campaign_id == UserItemInteraction.campaign_id,
+                CampaignLead.first_interaction_at < open_start
+            )
+            .exists()
+        )
+        campaigns_engaged = (
+            self.db.query(func.count(CampaignLead.campaign_id))
+            .filter(CampaignLead.lead_id == lead_id, CampaignLead.first_interaction_at < open_start)
+            .scalar()
+        )
+        campaigns_engaged += (
+            self.db.query(func.count(func.distinct(UserItemInteraction.campaign_id)))
+            .filter(open_rows, ~seen_before)
+            .scalar()
+        )
+
+        return {
+            "interaction_types": dict(interaction_types),
+            "first_interaction": first_interaction,
+            "last_interaction": last_interaction,
+            "campaigns_engaged": campaigns_engaged
+        }
+
+    def rebuild(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """Regenerate the rollups from the interactions table, optionally only from ``since`` on.
+
+        ``since`` is rounded down to the start of its day. Campaign leads are
+        always regenerated in full, because a lead's first interaction with a
+        campaign may precede ``since``. Returns the number of rows written per table.
+        """
+        start = datetime.combine(since.date(), time.min) if since else None
+        for model in (CampaignInteractionRollup, LeadInteractionRollup):
+            delete_query = self.db.query(model)
+            if start:
+                delete_query = delete_query.filter(model.day >= start.date())
+            delete_query.delete(synchronize_session=False)
+        self.db.query(CampaignLead).delete(synchronize_session=False)
+
+        interaction = UserItemInteraction
+        typed = [interaction.interaction_type.isnot(None)]
+        recent = typed + ([interaction.timestamp >= start] if start else [])
+        day = func.date(interaction.timestamp)
+        hour = extract("hour", interaction.timestamp)
+
+        sources = [
+            (
+                CampaignInteractionRollup,
+                ["campaign_id", "day", "hour", "interaction_type", "count"],
+                select(interaction.campaign_id, day, hour, interaction.interaction_type, func.count(interaction.id))
+                .where(interaction.campaign_id.isnot(None), *recent)
+                .group_by(interaction.campaign_id, day, hour, interaction.interaction_type)
+            ),
+            (
+                LeadInteractionRollup,
+                ["lead_id", "day", "interaction_type", "count", "first_interaction_at", "last_interaction_at"],
+                select(
+                    interaction.lead_id,
+                    day,
+                    interaction.interaction_type,
+                    func.count(interaction.id),
+                    func.min(interaction.timestamp),
+                    func.max(interaction.timestamp)
+                )
+                .where(interaction.lead_id.isnot(None), *recent)
+                .group_by(interaction.lead_id, day, interaction.interaction_type)
+            ),
+            (
+                CampaignLead,
+                ["campaign_id", "lead_id", "first_interaction_at"],
+                select(interaction.campaign_id, interaction.lead_id, func.min(interaction.timestamp))
+                .where(interaction.campaign_id.isnot(None), interaction.lead_id.isnot(None), *typed)
+                .group_by(interaction.campaign_id, interaction.lead_id)
+            )
+        ]
+
+        written = {}
+        for model, columns, source in sources:
+            result = self.db.execute(insert(model).from_select(columns, source))
+            written[model.__tablename__] = result.rowcount
+        self.db.commit()
+
+        return written
@@ -1,12 +1,19 @@
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
+from .ab_test_monitor import VARIANTS, two_proportion_z_test
 from .ai_service import AIService
+from .analytics_rollup_service import AnalyticsRollupService
+from .analytics_sketch_service import AnalyticsSketchService
+from .campaign_forecast_service import CampaignForecastService
+from ..models.ab_test_stats import ABTestVariantStats
+from ..models.ai_data import ABTest
 from ..models.campaign import Campaign
 from ..models.lead import Lead
+from ..models.lead_segment import LeadSegment
 from ..models.user_item_interaction import UserItemInteraction
 from ..config.ai_config import MODEL_PARAMETERS, FEATURE_ENGINEERING
 
@@ -17,31 +24,20 @@ class AnalyticsService:
         self.config = MODEL_PARAMETERS["analytics"]
         self.feature_config = FEATURE_ENGINEERING
 
-    def _calculate_campaign_metrics(self, campaign: Campaign, db: Session) -> Dict[str, Any]:
-        """Calculate core metrics for a campaign"""
-        now = datetime.utcnow()
-        
-        # Get all interactions for the campaign
-        interactions = db.query(UserItemInteraction).filter(
-            UserItemInteraction.campaign_id == campaign.id
-        ).all()
-        
-        # Calculate metrics
-        total_interactions = len(interactions)
-        unique_leads = len(set(i.lead_id for i in interactions))
+    def _metrics_from_counts(
+        self,
+        interaction_types: Dict[str, int],
+        unique_leads: int,
+        now: datetime
+    ) -> Dict[str, Any]:
+        """Core metrics of a campaign from its interaction counts by type and distinct leads"""
+        total_interactions = sum(interaction_types.values())
         
-        # Group interactions by type
-        interaction_types = {}
-        for interaction in interactions:
-            if interaction.type not in interaction_types:
-                interaction_types[interaction.type] = 0
-            interaction_types[interaction.type] += 1
-            
         # Calculate engagement rate
         engagement_rate = total_interactions / unique_leads if unique_leads > 0 else 0
         
         # Calculate conversion rate
-        conversions = sum(1 for i in interactions if i.type == "conversion")
+        conversions = interaction_types.get(self.config["conversion_type"], 0)
         conversion_rate = conversions / unique_leads if unique_leads > 0 else 0
         
         return {
@@ -53,10 +49,50 @@ class AnalyticsService:
             "timestamp": now
         }
 
-    def _prepare_performance_features(self, campaign: Campaign, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    def _calculate_campaign_metrics(self, campaign: Campaign, db: Session, exact: bool = True) -> Dict[str, Any]:
+        """Calculate core metrics for a campaign"""
+        now = datetime.utcnow()
+        
+        # Closed hours are read from the rollups, only the current hour from raw interactions
+        interaction_types, unique_leads = AnalyticsRollupService(db).campaign_counts(campaign.id, now)
+        
+        # Approximate mode estimates distinct leads from the daily sketches instead
+        reach = None
+        if not exact:
+            reach = AnalyticsSketchService(db).reach([campaign.id], date.min, now.date())
+            unique_leads = reach["unique_leads"]
+            
+        metrics = self._metrics_from_counts(interaction_types, unique_leads, now)
+        if reach is not None:
+            metrics.update({
+                "approximate": True,
+                "unique_leads_interval": reach["unique_leads_interval"],
+                "lead_conversion_rate": reach["lead_conversion_rate"],
+                "lead_conversion_rate_interval": reach["lead_conversion_rate_interval"]
+            })
+            
+        return metrics
+
+    def _calculate_campaigns_metrics(self, campaigns: List[Campaign], db: Session) -> Dict[int, Dict[str, Any]]:
+        """Calculate core metrics for many campaigns with grouped queries"""
+        now = datetime.utcnow()
+        counts = AnalyticsRollupService(db).bulk_campaign_counts([campaign.id for campaign in campaigns], now)
+        
+        return {
+            campaign_id: self._metrics_from_counts(interaction_types, unique_leads, now)
+            for campaign_id, (interaction_types, unique_leads) in counts.items()
+        }
+
+    def _prepare_performance_features(
+        self,
+        campaign: Campaign,
+        metrics: Dict[str, Any],
+        days_ahead: Optional[int] = None
+    ) -> Dict[str, Any]:
         """Prepare features for performance prediction"""
         return {
             "campaign_id": campaign.id,
+            "days_ahead": days_ahead or self.config["prediction_horizon"],
             "campaign_type": campaign.type,
             "target_audience": campaign.target_audience,
             "budget": campaign.budget,
@@ -69,14 +105,14 @@ class AnalyticsService:
             "timestamp": datetime.utcnow().isoformat()
         }
 
-    async def get_campaign_performance(self, campaign_id: int, db: Session) -> Dict[str, Any]:
+    async def get_campaign_performance(self, campaign_id: int, db: Session, exact: bool = True) -> Dict[str, Any]:
         """Get performance metrics for a campaign"""
         try:
             campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
             if not campaign:
                 raise ValueError(f"Campaign {campaign_id} not found")
                 
-            metrics = self._calculate_campaign_metrics(campaign, db)
+            metrics = self._calculate_campaign_metrics(campaign, db, exact=exact)
             
             return {
                 "campaign_id": campaign_id,
@@ -91,44 +127,61 @@ class AnalyticsService:
             logging.error(f"Failed to get campaign performance: {str(e)}")
             raise
 
-    async def predict_campaign_performance(self, campaign_id: int, db: Session) -> Dict[str, Any]:
+    async def predict_campaign_performance(
+        self,
+        campaign_id: int,
+        db: Session,
+        refresh: bool = False,
+        days_ahead: Optional[int] = None
+    ) -> Dict[str, Any]:
         """Predict future performance of a campaign"""
+        forecasts = await self.predict_campaigns_performance([campaign_id], db, refresh=refresh, days_ahead=days_ahead)
+        return forecasts[0]
+
+    async def predict_campaigns_performance(
+        self,
+        campaign_ids: List[int],
+        db: Session,
+        refresh: bool = False,
+        days_ahead: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Predicted future performance of campaigns ``days_ahead`` days out.
+        
+        Stored forecasts, made for the ``prediction_horizon``, are served while
+        the campaign's metrics have not changed materially since they were
+        generated; the others, or all of them with ``refresh``, are regenerated
+        in batched prediction requests. Other horizons are always generated
+        and not stored.
+        """
+        days_ahead = days_ahead or self.config["prediction_horizon"]
         try:
-            campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-            if not campaign:
-                raise ValueError(f"Campaign {campaign_id} not found")
+            campaigns = db.query(Campaign).filter(Campaign.id.in_(campaign_ids)).all()
+            missing = set(campaign_ids) - {campaign.id for campaign in campaigns}
+            if missing:
+                raise ValueError(f"Campaigns {sorted(missing)} not found")
                 
-            # Get current metrics
-            current_metrics = self._calculate_campaign_metrics(campaign, db)
-            
-            # Prepare features for prediction
-            features = self._prepare_performance_features(campaign, current_metrics)
-            
-            # Get prediction
-            prediction = await self.ai_service.predict(
-                self.performance_endpoint_id,
-                instances=[features]
+            forecasts, regenerated = await CampaignForecastService(db, self).forecast(
+                campaigns,
+                force=refresh,
+                days_ahead=days_ahead
             )
             
-            result = prediction[0]
-            if result["confidence"] < self.config["prediction_threshold"]:
-                logging.warning(f"Low confidence performance prediction: {result['confidence']}")
-            
-            return {
-                "campaign_id": campaign_id,
-                "current_metrics": current_metrics,
-                "predicted_metrics": {
-                    "expected_interactions": result["expected_interactions"],
-                    "expected_conversions": result["expected_conversions"],
-                    "expected_engagement_rate": result["expected_engagement_rate"],
-                    "expected_conversion_rate": result["expected_conversion_rate"],
-                    "growth_trajectory": result["growth_trajectory"]
-                },
-                "confidence": result["confidence"],
-                "factors": result["contributing_factors"],
-                "recommendations": result["recommendations"],
-                "timestamp": datetime.utcnow()
-            }
+            results = []
+            for campaign_id in dict.fromkeys(campaign_ids):
+                forecast, current_metrics = forecasts[campaign_id]
+                results.append({
+                    "campaign_id": campaign_id,
+                    "days_ahead": days_ahead,
+                    "current_metrics": current_metrics,
+                    "predicted_metrics": forecast.predicted_metrics,
+                    "confidence": forecast.confidence,
+                    "factors": forecast.factors,
+                    "recommendations": forecast.recommendations,
+                    "generated_at": forecast.generated_at,
+                    "source": "generated" if campaign_id in regenerated else "stored",
+                    "timestamp": datetime.utcnow()
+                })
+            return results
             
         except Exception as e:
             logging.error(f"Failed to predict campaign performance: {str(e)}")
@@ -141,42 +194,33 @@ class AnalyticsService:
             if not lead:
                 raise ValueError(f"Lead {lead_id} not found")
                 
-            # Get all interactions for the lead
-            interactions = db.query(UserItemInteraction).filter(
-                UserItemInteraction.lead_id == lead_id
-            ).order_by(UserItemInteraction.timestamp.desc()).all()
+            # Closed days are read from the rollups, only today from raw interactions
+            summary = AnalyticsRollupService(db).lead_summary(lead_id)
             
             # Calculate engagement metrics
-            total_interactions = len(interactions)
-            interaction_types = {}
-            campaigns_engaged = set()
-            
-            for interaction in interactions:
-                if interaction.type not in interaction_types:
-                    interaction_types[interaction.type] = 0
-                interaction_types[interaction.type] += 1
-                
-                if interaction.campaign_id:
-                    campaigns_engaged.add(interaction.campaign_id)
+            interaction_types = summary["interaction_types"]
+            total_interactions = sum(interaction_types.values())
             
             # Calculate time-based metrics
-            if interactions:
-                first_interaction = min(i.timestamp for i in interactions)
-                last_interaction = max(i.timestamp for i in interactions)
+            first_interaction = summary["first_interaction"]
+            last_interaction = summary["last_interaction"]
+            if first_interaction is not None:
                 engagement_duration = (last_interaction - first_interaction).days
             else:
                 engagement_duration = 0
+                
+            segment = db.query(LeadSegment).filter(LeadSegment.lead_id == lead_id).first()
             
             return {
                 "lead_id": lead_id,
                 "total_interactions": total_interactions,
                 "interaction_types": interaction_types,
-                "campaigns_engaged": len(campaigns_engaged),
+                "campaigns_engaged": summary["campaigns_engaged"],
                 "engagement_duration": engagement_duration,
-                "first_interaction": first_interaction if interactions else None,
-                "last_interaction": last_interaction if interactions else None,
-                "current_score": lead.score,
-                "current_segment": lead.segment,
+                "first_interaction": first_interaction,
+                "last_interaction": last_interaction,
+                "current_score": lead.lead_score,
+                "current_segment": segment.segment if segment else None,
                 "timestamp": datetime.utcnow()
             }
             
@@ -184,8 +228,66 @@ class AnalyticsService:
             logging.error(f"Failed to get lead analytics: {str(e)}")
             raise
 
-    async def get_ab_test_results(self, campaign_a_id: int, campaign_b_id: int, db: Session) -> Dict[str, Any]:
-        """Get results of A/B test between two campaigns"""
+    async def get_campaign_reach(
+        self,
+        campaign_ids: List[int],
+        start_date: date,
+        end_date: date,
+        db: Session,
+        exact: bool = True
+    ) -> Dict[str, Any]:
+        """Get distinct leads and lead conversion rate of campaigns over a date range (inclusive days)"""
+        try:
+            interaction_types = AnalyticsRollupService(db).interaction_counts(campaign_ids, start_date, end_date)
+            
+            if exact:
+                conversion_type = self.config["conversion_type"]
+                unique_leads, converted_leads = db.query(
+                    func.count(func.distinct(UserItemInteraction.lead_id)),
+                    func.count(func.distinct(case(
+                        (UserItemInteraction.interaction_type == conversion_type, UserItemInteraction.lead_id)
+                    )))
+                ).filter(
+                    UserItemInteraction.campaign_id.in_(campaign_ids),
+                    UserItemInteraction.timestamp >= datetime.combine(start_date, datetime.min.time()),
+                    UserItemInteraction.timestamp < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+                ).one()
+                reach = {
+                    "unique_leads": unique_leads,
+                    "lead_conversion_rate": converted_leads / unique_leads if unique_leads > 0 else None,
+                    "approximate": False
+                }
+            else:
+                # Merged daily sketches: one row per campaign and day, no raw interactions
+                reach = AnalyticsSketchService(db).reach(campaign_ids, start_date, end_date)
+                
+            return {
+                "campaign_ids": campaign_ids,
+                "start_date": start_date,
+                "end_date": end_date,
+                "total_interactions": sum(interaction_types.values()),
+                "interaction_types": interaction_types,
+                **reach,
+                "timestamp": datetime.utcnow()
+            }
+            
+        except Exception as e:
+            logging.error(f"Failed to get campaign reach: {str(e)}")
+            raise
+
+    async def get_ab_test_results(
+        self,
+        campaign_a_id: int,
+        campaign_b_id: int,
+        db: Session,
+        exact: bool = True
+    ) -> Dict[str, Any]:
+        """Get results of A/B test between two campaigns
+        
+        The significance test uses converted and exposed leads: the exact
+        counters ABTestMonitor keeps when an A/B test of the two campaigns
+        exists, otherwise distinct leads counted from the interactions.
+        """
         try:
             # Get campaigns
             campaign_a = db.query(Campaign).filter(Campaign.id == campaign_a_id).first()
@@ -195,26 +297,25 @@ class AnalyticsService:
                 raise ValueError("One or both campaigns not found")
                 
             # Get metrics for both campaigns
-            metrics_a = self._calculate_campaign_metrics(campaign_a, db)
-            metrics_b = self._calculate_campaign_metrics(campaign_b, db)
+            metrics_a = self._calculate_campaign_metrics(campaign_a, db, exact=exact)
+            metrics_b = self._calculate_campaign_metrics(campaign_b, db, exact=exact)
             
             # Calculate statistical significance
-            confidence = self._calculate_significance(
-                metrics_a["conversion_rate"],
-                metrics_b["conversion_rate"],
-                metrics_a["unique_leads"],
-                metrics_b["unique_leads"]
-            )
+            ab_test_id, counts = self._ab_test_counts(campaign_a_id, campaign_b_id, db)
+            (conversions_a, leads_a), (conversions_b, leads_b) = counts
+            confidence = self._calculate_significance(conversions_a, leads_a, conversions_b, leads_b)
             
             # Determine winner
-            if metrics_a["conversion_rate"] > metrics_b["conversion_rate"]:
+            rate_a = conversions_a / leads_a if leads_a > 0 else 0
+            rate_b = conversions_b / leads_b if leads_b > 0 else 0
+            if rate_a > rate_b:
                 winner = "A"
-                improvement = ((metrics_a["conversion_rate"] - metrics_b["conversion_rate"]) 
-                             / metrics_b["conversion_rate"] * 100)
+                baseline = rate_b
             else:
                 winner = "B"
-                improvement = ((metrics_b["conversion_rate"] - metrics_a["conversion_rate"])
-                             / metrics_a["conversion_rate"] * 100)
+                baseline = rate_a
+            difference = abs(rate_a - rate_b)
+            improvement = difference / baseline * 100 if baseline > 0 else None
             
             return {
                 "campaign_a": {
@@ -225,10 +326,13 @@ class AnalyticsService:
                     "id": campaign_b_id,
                     "metrics": metrics_b
                 },
+                "ab_test_id": ab_test_id,
+                "converted_leads": {"A": conversions_a, "B": conversions_b},
+                "exposed_leads": {"A": leads_a, "B": leads_b},
                 "winner": winner,
                 "improvement_percentage": improvement,
                 "confidence_level": confidence,
-                "significant": confidence > self.config["significance_threshold"],
+                "significant": confidence > 1 - self.config["ab_test_significance"],
                 "timestamp": datetime.utcnow()
             }
             
@@ -236,30 +340,52 @@ class AnalyticsService:
             logging.error(f"Failed to get A/B test results: {str(e)}")
             raise
 
-    def _calculate_significance(self, rate_a: float, rate_b: float, 
-                              sample_a: int, sample_b: int) -> float:
-        """Calculate statistical significance between two conversion rates"""
-        try:
-            from scipy import stats
-            
-            # Calculate z-score
-            p1 = rate_a
-            p2 = rate_b
-            n1 = sample_a
-            n2 = sample_b
-            
-            # Pooled standard error
-            se = ((p1 * (1 - p1) / n1) + (p2 * (1 - p2) / n2)) ** 0.5
-            
-            # Z-score
-            z = (p1 - p2) / se
-            
-            # Convert to confidence level
-            confidence = stats.norm.cdf(abs(z))
-            
-            return confidence
+    def _ab_test_counts(
+        self,
+        campaign_a_id: int,
+        campaign_b_id: int,
+        db: Session
+    ) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        """(A/B test id, [(converted leads, exposed leads) of A, of B]) of two campaigns.
+        
+        Read from the variant statistics of the latest A/B test of the pair;
+        without one, counted from the campaigns' interactions.
+        """
+        test = (
+            db.query(ABTest.id)
+            .filter(ABTest.campaign_a_id == campaign_a_id, ABTest.campaign_b_id == campaign_b_id)
+            .order_by(ABTest.start_date.desc())
+            .first()
+        )
+        if test is not None:
+            stats = {
+                variant: (conversions, unique_leads)
+                for variant, conversions, unique_leads in db.query(
+                    ABTestVariantStats.variant,
+                    ABTestVariantStats.conversions,
+                    ABTestVariantStats.unique_leads
+                ).filter(ABTestVariantStats.ab_test_id == test.id)
+            }
+            return test.id, [stats.get(variant, (0, 0)) for variant in VARIANTS]
             
-        except ImportError:
-            logging.warning("scipy not installed, using simplified significance calculation")
-            # Simplified calculation if scipy not available
-            return 0.95 if abs(rate_a - rate_b) > 0.1 else 0.5 
\ No newline at end of file
+        converting = case(
+            (UserItemInteraction.interaction_type == self.config["conversion_type"], UserItemInteraction.lead_id)
+        )
+        counts = {
+            campaign_id: (converted, leads)
+            for campaign_id, converted, leads in db.query(
+                UserItemInteraction.campaign_id,
+                func.count(func.distinct(converting)),
+                func.count(func.distinct(UserItemInteraction.lead_id))
+            )
+            .filter(UserItemInteraction.campaign_id.in_([campaign_a_id, campaign_b_id]))
+            .group_by(UserItemInteraction.campaign_id)
+        }
+        return None, [counts.get(campaign_id, (0, 0)) for campaign_id in (campaign_a_id, campaign_b_id)]
+
+    def _calculate_significance(self, conversions_a: int, sample_a: int, conversions_b: int, sample_b: int) -> float:
+        """Calculate statistical significance between the conversion rates of two samples of leads"""
+        result = two_proportion_z_test([conversions_a], [sample_a], [conversions_b], [sample_b])
+        
+        # Confidence that the rates differ (two-sided)
+        return float(1.0 - result["p_value"][0])
@@ -0,0 +1,158 @@
+from datetime import date, datetime, time
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Date, case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .sketches import HyperLogLog, LeadSample, hash_ids, z_value
+from ..models.analytics_sketch import CampaignDailySketch
+from ..models.user_item_interaction import UserItemInteraction
+from ..config.ai_config import MODEL_PARAMETERS
+
+
+class AnalyticsSketchService:
+    """Approximate distinct-lead analytics from per campaign and day sketches.
+
+    Each (campaign, day) keeps a HyperLogLog sketch of its distinct leads and a
+    bottom-k sample of them flagged by conversion, updated in the transaction
+    that writes an interaction. Both merge exactly across days and campaigns,
+    so distinct leads and lead conversion rates of any campaigns and date range
+    are estimated, with error bars, from one row per campaign and day.
+    """
+
+    def __init__(self, db: Session, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = config or MODEL_PARAMETERS["analytics"]
+        self.sketch_config = self.config["sketches"]
+
+    def _empty(self) -> Tuple[HyperLogLog, LeadSample]:
+        return HyperLogLog(self.sketch_config["hll_precision"]), LeadSample(self.sketch_config["sample_size"])
+
+    def _load(self, leads_hll: bytes, lead_sample: bytes) -> Tuple[HyperLogLog, LeadSample]:
+        return HyperLogLog.from_bytes(leads_hll), LeadSample.from_bytes(lead_sample, self.sketch_config["sample_size"])
+
+    def record_interaction(self, interaction: UserItemInteraction):
+        """Add an interaction's lead to its campaign's sketches for the day. The caller commits."""
+        if interaction.campaign_id is None or interaction.lead_id is None:
+            return
+
+        day = interaction.timestamp.date()
+        hashes = hash_ids([interaction.lead_id])
+        converted = np.array([interaction.interaction_type == self.config["conversion_type"]])
+        query = self.db.query(CampaignDailySketch).filter(
+            CampaignDailySketch.campaign_id == interaction.campaign_id,
+            CampaignDailySketch.day == day
+        )
+
+        row = query.with_for_update().first()
+        if row is None:
+            hll, sample = self._empty()
+            hll.add_hashes(hashes)
+            sample.add_hashes(hashes, converted)
+            try:
+                with self.db.begin_nested():
+                    self.db.add(CampaignDailySketch(
+                        campaign_id=interaction.campaign_id,
+                        day=day,
+                        leads_hll=hll.to_bytes(),
+                        lead_sample=sample.to_bytes(),
+                        updated_at=datetime.utcnow()
+                    ))
+                return
+            except IntegrityError:
+                # Another writer created the row first
+                row = query.with_for_update().one()
+
+        hll, sample = self._load(row.leads_hll, row.lead_sample)
+        hll.add_hashes(hashes)
+        sample.add_hashes(hashes, converted)
+        leads_hll, lead_sample = hll.to_bytes(), sample.to_bytes()
+        # Most interactions come from leads already in the sketches of the day
+        if leads_hll != row.leads_hll or lead_sample != row.lead_sample:
+            row.leads_hll = leads_hll
+            row.lead_sample = lead_sample
+            row.updated_at = datetime.utcnow()
+
+    def merged(self, campaign_ids: List[int], start: date, end: date) -> Tuple[HyperLogLog, LeadSample]:
+        """Sketches of the distinct leads of the campaigns from ``start`` to ``end`` (inclusive days)."""
+        hll, sample = self._empty()
+        rows = (
+            self.db.query(CampaignDailySketch.leads_hll, CampaignDailySketch.lead_sample)
+            .filter(
+                CampaignDailySketch.campaign_id.in_(campaign_ids),
+                CampaignDailySketch.day >= start,
+                CampaignDailySketch.day <= end
+            )
+            .yield_per(1000)
+        )
+        for leads_hll, lead_sample in rows:
+            day_hll, day_sample = self._load(leads_hll, lead_sample)
+            hll.merge(day_hll)
+            sample.merge(day_sample)
+        return hll, sample
+
+    def reach(self, campaign_ids: List[int], start: date, end: date) -> Dict[str, Any]:
+        """Estimated distinct leads and lead conversion rate, with ``confidence_interval`` intervals."""
+        hll, sample = self.merged(campaign_ids, start, end)
+        confidence = self.config["confidence_interval"]
+        estimate = hll.estimate()
+        error = z_value(confidence) * hll.relative_error * estimate
+        rate, low, high = sample.rate(confidence)
+
+        return {
+            "unique_leads": int(round(estimate)),
+            "unique_leads_interval": [max(0.0, estimate - error), estimate + error],
+            "lead_conversion_rate": rate,
+            "lead_conversion_rate_interval": [low, high],
+            "sampled_leads": len(sample.hashes),
+            "confidence": confidence,
+            "approximate": True
+        }
+
+    def rebuild(self, since: Optional[datetime] = None) -> int:
+        """Regenerate the sketches from the interactions table, optionally only from ``since`` on.
+
+        ``since`` is rounded down to the start of its day. Returns the number of
+        sketches written.
+        """
+        start = datetime.combine(since.date(), time.min) if since else None
+        delete_query = self.db.query(CampaignDailySketch)
+        if start:
+            delete_query = delete_query.filter(CampaignDailySketch.day >= start.date())
+        delete_query.delete(synchronize_session=False)
+
+        day = func.date(UserItemInteraction.timestamp, type_=Date)
+        converted = func.max(case((UserItemInteraction.interaction_type == self.config["conversion_type"], 1), else_=0))
+        query = (
+            self.db.query(UserItemInteraction.campaign_id, day, UserItemInteraction.lead_id, converted)
+            .filter(UserItemInteraction.campaign_id.isnot(None), UserItemInteraction.lead_id.isnot(None))
+            .group_by(UserItemInteraction.campaign_id, day, UserItemInteraction.lead_id)
+            .order_by(UserItemInteraction.campaign_id, day)
+        )
+        if start:
+            query = query.filter(UserItemInteraction.timestamp >= start)
+
+        written = 0
+        now = datetime.utcnow()
+        for (campaign_id, bucket_day), rows in groupby(query.yield_per(100000), key=lambda row: (row[0], row[1])):
+            rows = list(rows)
+            hashes = hash_ids([row[2] for row in rows])
+            hll, sample = self._empty()
+            hll.add_hashes(hashes)
+            sample.add_hashes(hashes, np.array([row[3] for row in rows], dtype=bool))
+            self.db.add(CampaignDailySketch(
+                campaign_id=campaign_id,
+                day=bucket_day,
+                leads_hll=hll.to_bytes(),
+                lead_sample=sample.to_bytes(),
+                updated_at=now
+            ))
+            written += 1
+            if written % 1000 == 0:
+                self.db.flush()
+        self.db.commit()
+
+        return written
@@ -0,0 +1,61 @@
+import logging
+import os
+from typing import Any, Dict, IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from ..config.ai_config import BACKGROUND_JOBS
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobLeader:
+    """Elects the one API process on a host that runs the background loops.
+
+    Every uvicorn worker imports the app and runs its startup hook; the first
+    to take an exclusive lock on ``lock_path`` becomes the leader and holds the
+    lock until it exits, so a restarted worker can take over. Deployments with
+    several hosts set ``RUN_BACKGROUND_JOBS=false`` on all but one of them.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or BACKGROUND_JOBS
+        self._lock_file: Optional[IO] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def acquire(self) -> bool:
+        """Try to become the leader; returns whether this process is it."""
+        if self.is_leader:
+            return True
+        if not self.config["enabled"]:
+            return False
+        if fcntl is None:
+            logger.warning("File locks are not available; running background jobs in this process")
+            self._lock_file = open(os.devnull, "w")
+            return True
+
+        lock_file = open(self.config["lock_path"], "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        logger.info(f"Process {os.getpid()} runs the background jobs")
+        return True
+
+    def release(self):
+        """Give up leadership so another process can take it."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+background_job_leader = BackgroundJobLeader()
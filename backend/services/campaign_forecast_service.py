@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.campaign import Campaign
+from ..models.campaign_forecast import CampaignForecast
+from ..config.ai_config import MODEL_PARAMETERS
+
+if TYPE_CHECKING:
+    from .analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignForecastService:
+    """Stored performance forecasts of campaigns, generated in bulk.
+
+    Metrics of many campaigns come from grouped rollup queries and their
+    features are sent to the performance endpoint in concurrent batches. A
+    stored forecast is served until it is ``max_age`` hours old or one of the
+    campaign's tracked metrics has moved by more than ``change_threshold``
+    since it was generated.
+    """
+
+    def __init__(self, db: Session, analytics: "AnalyticsService", config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.analytics = analytics
+        self.config = config or MODEL_PARAMETERS["analytics"]["forecasts"]
+
+    def active_campaigns(self) -> List[Campaign]:
+        return (
+            self.db.query(Campaign)
+            .filter(Campaign.status.in_(self.config["active_statuses"]))
+            .order_by(Campaign.id)
+            .all()
+        )
+
+    def changed(self, previous: Dict[str, Any], current: Dict[str, Any]) -> bool:
+        """Whether a tracked metric moved by more than ``change_threshold``.
+
+        The change is taken relative to the larger of the two values.
+        """
+        for name in self.config["tracked_metrics"]:
+            old = float(previous.get(name) or 0)
+            new = float(current.get(name) or 0)
+            scale = max(abs(old), abs(new))
+            if scale > 0 and abs(new - old) / scale > self.config["change_threshold"]:
+                return True
+        return False
+
+    def is_current(self, forecast: CampaignForecast, metrics: Dict[str, Any], now: datetime) -> bool:
+        if forecast.generated_at < now - timedelta(hours=self.config["max_age"]):
+            return False
+        return not self.changed(forecast.current_metrics, metrics)
+
+    def _stored(self, campaign_ids: List[int]) -> Dict[int, CampaignForecast]:
+        return {
+            forecast.campaign_id: forecast
+            for forecast in self.db.query(CampaignForecast).filter(CampaignForecast.campaign_id.in_(campaign_ids))
+        }
+
+    async def forecast(
+        self,
+        campaigns: List[Campaign],
+        force: bool = False,
+        days_ahead: Optional[int] = None
+    ) -> Tuple[Dict[int, Tuple[CampaignForecast, Dict[str, Any]]], List[int]]:
+        """Forecasts of the campaigns, regenerating missing and stale ones in batched prediction requests.
+
+        Only forecasts for the analytics ``prediction_horizon`` are stored;
+        those for another ``days_ahead`` are all generated and returned
+        unsaved. Returns each campaign's forecast together with its live
+        metrics, and the ids of the campaigns whose forecast was regenerated.
+        """
+        now = datetime.utcnow()
+        horizon = self.analytics.config["prediction_horizon"]
+        days_ahead = days_ahead or horizon
+        store = days_ahead == horizon
+        campaign_ids = [campaign.id for campaign in campaigns]
+        metrics = self.analytics._calculate_campaigns_metrics(campaigns, self.db)
+        stored = self._stored(campaign_ids) if store else {}
+        stale = [
+            campaign for campaign in campaigns
+            if force or campaign.id not in stored or not self.is_current(stored[campaign.id], metrics[campaign.id], now)
+        ]
+
+        if stale:
+            features = [
+                self.analytics._prepare_performance_features(campaign, metrics[campaign.id], days_ahead)
+                for campaign in stale
+            ]
+            predictions, reports = await self.analytics.ai_service.predict_batches(
+                self.analytics.performance_endpoint_id,
+                features,
+                batch_size=self.config["batch_size"]
+            )
+            logger.info(f"Forecast {len(stale)} campaigns in {len(reports)} prediction requests")
+
+            for campaign, result in zip(stale, predictions):
+                if result["confidence"] < self.analytics.config["prediction_threshold"]:
+                    logger.warning(
+                        f"Low confidence performance prediction for campaign {campaign.id}: {result['confidence']}"
+                    )
+
+                forecast = stored.get(campaign.id)
+                if forecast is None:
+                    forecast = CampaignForecast(campaign_id=campaign.id)
+                    if store:
+                        self.db.add(forecast)
+                    stored[campaign.id] = forecast
+                forecast.current_metrics = {
+                    name: value for name, value in metrics[campaign.id].items() if name != "timestamp"
+                }
+                forecast.predicted_metrics = {
+                    "expected_interactions": result["expected_interactions"],
+                    "expected_conversions": result["expected_conversions"],
+                    "expected_engagement_rate": result["expected_engagement_rate"],
+                    "expected_conversion_rate": result["expected_conversion_rate"],
+                    "growth_trajectory": result["growth_trajectory"]
+                }
+                forecast.confidence = result["confidence"]
+                forecast.factors = result["contributing_factors"]
+                forecast.recommendations = result["recommendations"]
+                forecast.generated_at = now
+
+            try:
+                if store:
+                    self.db.commit()
+            except IntegrityError:
+                # Another process stored a first forecast of one of these campaigns meanwhile; serve its forecasts
+                self.db.rollback()
+                stored = self._stored(campaign_ids)
+
+        forecasts = {campaign.id: (stored[campaign.id], metrics[campaign.id]) for campaign in campaigns}
+        return forecasts, [campaign.id for campaign in stale]
+
+    async def forecast_portfolio(self, force: bool = False) -> Dict[str, Any]:
+        """Bring the forecasts of all active campaigns up to date."""
+        campaigns = self.active_campaigns()
+        if not campaigns:
+            return {"campaigns": 0, "regenerated": 0}
+
+        _, regenerated = await self.forecast(campaigns, force=force)
+        return {"campaigns": len(campaigns), "regenerated": len(regenerated)}
+
+
+class CampaignForecastScheduler:
+    """Background loop that keeps the forecasts of all active campaigns up to date."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or MODEL_PARAMETERS["analytics"]["forecasts"]
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "runs_total": 0,
+            "errors_total": 0,
+            "last_campaigns": 0,
+            "last_regenerated": 0,
+            "last_run_seconds": None,
+            "last_run_at": None
+        }
+
+    def _forecast(self) -> Dict[str, Any]:
+        # Imported here: the analytics service imports this module and pulls in the Vertex AI client
+        from .analytics_service import AnalyticsService
+
+        db = SessionLocal()
+        try:
+            # Own event loop in this worker thread, so database work stays off the server's loop
+            return asyncio.run(CampaignForecastService(db, AnalyticsService(), self.config).forecast_portfolio())
+        finally:
+            db.close()
+
+    async def run_once(self):
+        """Regenerate the forecasts of active campaigns that are missing or stale."""
+        start = time.perf_counter()
+        result = await asyncio.to_thread(self._forecast)
+
+        self.metrics["runs_total"] += 1
+        self.metrics["last_campaigns"] = result["campaigns"]
+        self.metrics["last_regenerated"] = result["regenerated"]
+        self.metrics["last_run_seconds"] = time.perf_counter() - start
+        self.metrics["last_run_at"] = datetime.utcnow()
+
+    async def run(self):
+        """Run the forecast loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.metrics["errors_total"] += 1
+                logger.error(f"Error in campaign forecast loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the forecast loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+
+campaign_forecast_scheduler = CampaignForecastScheduler()
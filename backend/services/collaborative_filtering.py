@@ -0,0 +1,187 @@
+import numpy as np
+from typing import Callable, Dict, Optional, Tuple
+from scipy import sparse
+
+
+class FactorModel:
+    """User and item factors of an implicit-feedback matrix factorization.
+
+    Row ``i`` of ``user_factors`` belongs to ``user_ids[i]`` and row ``j`` of
+    ``item_factors`` to ``item_ids[j]``; both id arrays are sorted. The items each
+    user interacted with are kept as CSR arrays (``seen_indptr``/``seen_indices``)
+    so they can be left out of that user's recommendations.
+    """
+
+    def __init__(
+        self,
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+        user_ids: np.ndarray,
+        item_ids: np.ndarray,
+        seen_indptr: np.ndarray,
+        seen_indices: np.ndarray
+    ):
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.seen_indptr = seen_indptr
+        self.seen_indices = seen_indices
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.to_arrays().values())
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "user_factors": self.user_factors,
+            "item_factors": self.item_factors,
+            "user_ids": self.user_ids,
+            "item_ids": self.item_ids,
+            "seen_indptr": self.seen_indptr,
+            "seen_indices": self.seen_indices
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "FactorModel":
+        return cls(
+            arrays["user_factors"],
+            arrays["item_factors"],
+            arrays["user_ids"],
+            arrays["item_ids"],
+            arrays["seen_indptr"],
+            arrays["seen_indices"]
+        )
+
+    def user_row(self, user_id: int) -> Optional[int]:
+        """Return the factor row of a user, or None if the user had no interactions."""
+        pos = int(np.searchsorted(self.user_ids, user_id))
+        if pos >= len(self.user_ids) or self.user_ids[pos] != user_id:
+            return None
+        return pos
+
+    def recommend(self, row: int, k: int, exclude_seen: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k item ids and scores for a user row, best first.
+
+        Scores every item with one matrix-vector product and selects the top k
+        with argpartition, so only k entries are sorted.
+        """
+        scores = self.item_factors @ self.user_factors[row]
+        if exclude_seen:
+            scores[self.seen_indices[self.seen_indptr[row]:self.seen_indptr[row + 1]]] = -np.inf
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        return np.asarray(self.item_ids[top]), scores[top]
+
+
+def _block_ends(indptr: np.ndarray, max_entries: int):
+    """Split rows into consecutive blocks of at most ``max_entries`` stored entries each."""
+    n_rows = len(indptr) - 1
+    start = 0
+    while start < n_rows:
+        end = int(np.searchsorted(indptr, indptr[start] + max_entries, side="right")) - 1
+        end = min(max(end, start + 1), n_rows)
+        yield start, end
+        start = end
+
+
+def _least_squares_cg(
+    confidence: sparse.csr_matrix,
+    X: np.ndarray,
+    Y: np.ndarray,
+    regularization: float,
+    cg_steps: int,
+    max_block_bytes: int
+):
+    """Update every row of X for fixed Y with a few conjugate gradient steps.
+
+    Row u solves (YᵀY + Yᵀ(C_u - I)Y + λI) x_u = Yᵀ C_u p_u with p_u = 1 on the
+    observed entries. The products are formed from the row's observed entries
+    only, one block of rows at a time, so memory is bounded by
+    ``max_block_bytes`` rather than by the number of users or items.
+    """
+    factors = X.shape[1]
+    YtY = (Y.T @ Y + regularization * np.eye(factors, dtype=np.float32)).astype(np.float32)
+    # Per stored entry: the gathered factor row and its weighted copy
+    max_entries = max(1, max_block_bytes // (factors * 4 * 2))
+
+    for start, end in _block_ends(confidence.indptr, max_entries):
+        lo, hi = confidence.indptr[start], confidence.indptr[end]
+        indptr = np.asarray(confidence.indptr[start:end + 1] - lo, dtype=np.int64)
+        conf = np.asarray(confidence.data[lo:hi], dtype=np.float32)
+        Yi = Y[confidence.indices[lo:hi]]
+        n_rows, n_entries = end - start, hi - lo
+        entries = np.arange(n_entries)
+        entry_rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+
+        def row_sums(weights: np.ndarray) -> np.ndarray:
+            # Σ over each row's entries of weight * y_i
+            return sparse.csr_matrix((weights, entries, indptr), shape=(n_rows, n_entries)) @ Yi
+
+        def apply_a(P: np.ndarray) -> np.ndarray:
+            dots = np.einsum("ij,ij->i", Yi, P[entry_rows]) * (conf - 1.0)
+            return P @ YtY + row_sums(dots)
+
+        x = X[start:end].copy()
+        r = row_sums(conf) - apply_a(x)
+        p = r.copy()
+        rs = np.einsum("ij,ij->i", r, r)
+        for _ in range(cg_steps):
+            Ap = apply_a(p)
+            denominator = np.einsum("ij,ij->i", p, Ap)
+            alpha = np.divide(rs, denominator, out=np.zeros_like(rs), where=denominator > 0)
+            x += alpha[:, None] * p
+            r -= alpha[:, None] * Ap
+            rs_new = np.einsum("ij,ij->i", r, r)
+            beta = np.divide(rs_new, rs, out=np.zeros_like(rs), where=rs > 0)
+            p = r + beta[:, None] * p
+            rs = rs_new
+
+        X[start:end] = x
+
+
+def implicit_als(
+    confidence: sparse.csr_matrix,
+    factors: int = 64,
+    regularization: float = 0.01,
+    iterations: int = 15,
+    cg_steps: int = 3,
+    max_block_bytes: int = 256 * 1024 ** 2,
+    seed: int = 42,
+    callback: Optional[Callable[[int], None]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Implicit-feedback alternating least squares (Hu, Koren & Volinsky).
+
+    ``confidence`` is the users x items matrix of confidences c_ui = 1 + α·r_ui
+    for observed interactions. Each half-step is solved approximately with
+    warm-started conjugate gradient, as in Takács et al., which needs only
+    sparse products and float32 BLAS calls. ``callback(iteration)`` runs after
+    each iteration and may raise to stop training.
+    """
+    rng = np.random.default_rng(seed)
+    confidence = sparse.csr_matrix(confidence, dtype=np.float32)
+    n_users, n_items = confidence.shape
+    user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+    by_item = confidence.T.tocsr()
+
+    for iteration in range(iterations):
+        _least_squares_cg(confidence, user_factors, item_factors, regularization, cg_steps, max_block_bytes)
+        _least_squares_cg(by_item, item_factors, user_factors, regularization, cg_steps, max_block_bytes)
+        if callback is not None:
+            callback(iteration)
+
+    return user_factors, item_factors
@@ -0,0 +1,187 @@
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from scipy import sparse
+import json
+import logging
+import time
+from itertools import islice
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .collaborative_filtering import FactorModel, implicit_als
+from .model_artifacts import new_artifact_path, save_artifact, load_artifact
+from .model_registry import model_registry
+from ..models.ai_model import AIModel
+from ..models.user_item_interaction import UserItemInteraction
+from ..config.ai_config import MODEL_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+
+def load_collaborative_filtering_artifact(path: str) -> FactorModel:
+    """Open a collaborative filtering artifact with memory-mapped factor matrices."""
+    arrays, _ = load_artifact(path)
+    return FactorModel.from_arrays(arrays)
+
+
+class CollaborativeFilteringService:
+    """Item recommendations for users from their UserItemInteraction history."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.model: Optional[FactorModel] = None
+        self.model_version = None
+        self.config = MODEL_PARAMETERS["collaborative_filtering"]
+        self._load_active_model()
+
+    def _load_active_model(self):
+        """Load the active collaborative filtering model from the shared model registry."""
+        self.model_version, self.model = model_registry.get_active(
+            self.db,
+            "collaborative_filtering",
+            loader=load_collaborative_filtering_artifact
+        )
+
+    def _interaction_matrix(self) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """Users x items confidence matrix from interactions weighted by type.
+
+        Weights are summed per (user, item) in SQL and read in chunks, so the
+        process holds aggregated pairs rather than raw interaction rows.
+        """
+        weight = case(
+            self.config["interaction_weights"],
+            value=UserItemInteraction.interaction_type,
+            else_=self.config["default_weight"]
+        )
+        query = (
+            self.db.query(UserItemInteraction.user_id, UserItemInteraction.item_id, func.sum(weight))
+            .filter(UserItemInteraction.user_id.isnot(None), UserItemInteraction.item_id.isnot(None))
+            .group_by(UserItemInteraction.user_id, UserItemInteraction.item_id)
+            .yield_per(self.config["query_chunk_size"])
+        )
+
+        users, items, weights = [], [], []
+        rows = iter(query)
+        while True:
+            chunk = list(islice(rows, self.config["query_chunk_size"]))
+            if not chunk:
+                break
+            block = np.array(chunk, dtype=np.float64)
+            users.append(block[:, 0].astype(np.int64))
+            items.append(block[:, 1].astype(np.int64))
+            weights.append(block[:, 2].astype(np.float32))
+
+        if not users:
+            return sparse.csr_matrix((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        user_ids, user_rows = np.unique(np.concatenate(users), return_inverse=True)
+        item_ids, item_cols = np.unique(np.concatenate(items), return_inverse=True)
+        # Confidence c_ui = 1 + alpha * weighted interaction count
+        confidence = 1.0 + self.config["alpha"] * np.maximum(np.concatenate(weights), 0.0)
+        matrix = sparse.csr_matrix(
+            (confidence.astype(np.float32), (user_rows, item_cols)),
+            shape=(len(user_ids), len(item_ids))
+        )
+        return matrix, user_ids, item_ids
+
+    def train_model(
+        self,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, Any]:
+        """Train an implicit-feedback ALS model on all user-item interactions."""
+        progress = progress or (lambda stage, fraction: None)
+        iterations = self.config["iterations"]
+        timings = {}
+
+        progress('load', 0.0)
+        stage_start = time.perf_counter()
+        matrix, user_ids, item_ids = self._interaction_matrix()
+        if matrix.nnz == 0:
+            raise ValueError("No interactions available for training")
+        timings['load'] = time.perf_counter() - stage_start
+
+        progress('fit', 0.2)
+        stage_start = time.perf_counter()
+        user_factors, item_factors = implicit_als(
+            matrix,
+            factors=self.config["factors"],
+            regularization=self.config["regularization"],
+            iterations=iterations,
+            cg_steps=self.config["cg_steps"],
+            max_block_bytes=self.config["max_block_bytes"],
+            callback=lambda iteration: progress('fit', 0.2 + 0.7 * (iteration + 1) / iterations)
+        )
+        timings['fit'] = time.perf_counter() - stage_start
+
+        progress('persist', 0.9)
+        stage_start = time.perf_counter()
+        self.model = FactorModel(
+            user_factors,
+            item_factors,
+            user_ids,
+            item_ids,
+            matrix.indptr.astype(np.int64),
+            matrix.indices.astype(np.int32)
+        )
+        metrics = {
+            "n_users": int(self.model.n_users),
+            "n_items": int(self.model.n_items),
+            "n_interactions": int(matrix.nnz),
+            "density": float(matrix.nnz / (self.model.n_users * self.model.n_items)),
+            "model_bytes": int(self.model.nbytes)
+        }
+
+        model_path = new_artifact_path("collaborative_filtering")
+        save_artifact(model_path, self.model.to_arrays())
+
+        new_model = AIModel(
+            name="collaborative_filtering",
+            version=self._get_next_version(),
+            description="Implicit-feedback ALS matrix factorization over user-item interactions",
+            model_type="implicit_als",
+            filepath=model_path,
+            parameters=json.dumps({
+                key: self.config[key]
+                for key in ("factors", "regularization", "iterations", "cg_steps", "alpha", "interaction_weights")
+            }),
+            metrics=json.dumps(metrics)
+        )
+        model_registry.activate(self.db, new_model, before_commit=before_activate)
+        timings['persist'] = time.perf_counter() - stage_start
+
+        logger.info(
+            f"Trained collaborative filtering model on {matrix.nnz} user-item pairs: "
+            + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+        )
+        return {**metrics, 'stage_seconds': timings}
+
+    def recommend_items(self, user_id: int, n_recommendations: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Top items for a user that the user has not interacted with yet.
+
+        Returns None without an active model and an empty list for users the
+        model has not seen.
+        """
+        if self.model is None:
+            return None
+
+        row = self.model.user_row(user_id)
+        if row is None:
+            return []
+
+        n_recommendations = min(n_recommendations, self.config["max_recommendations"])
+        item_ids, scores = self.model.recommend(row, n_recommendations)
+        return [
+            {"item_id": int(item_id), "score": float(score)}
+            for item_id, score in zip(item_ids, scores)
+        ]
+
+    def _get_next_version(self) -> int:
+        """Get the next version number for collaborative filtering models."""
+        latest_model = (
+            self.db.query(AIModel)
+            .filter(AIModel.name == "collaborative_filtering")
+            .order_by(AIModel.version.desc())
+            .first()
+        )
+        return (latest_model.version + 1) if latest_model else 1
@@ -0,0 +1,153 @@
+import numpy as np
+from typing import Any, Dict
+
+
+class CompiledForest:
+    """A fitted RandomForestClassifier and its StandardScaler flattened into arrays.
+
+    All trees share one set of node arrays; ``roots`` holds the first node of each
+    tree and ``children`` is an (n_nodes, 2) array of global [left, right] node ids.
+    Leaves point to themselves, so every tree can be walked for exactly
+    ``max_depth`` steps without checking for leaves. ``values`` holds each node's
+    class probabilities; the forest probability is their sum over trees, taken in
+    tree order, divided by the number of trees, which reproduces sklearn bit for bit.
+    """
+
+    ARRAY_FIELDS = (
+        "roots", "feature", "threshold", "children",
+        "values", "scaler_mean", "scaler_scale", "feature_importances", "classes"
+    )
+
+    def __init__(
+        self,
+        roots: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        values: np.ndarray,
+        scaler_mean: np.ndarray,
+        scaler_scale: np.ndarray,
+        feature_importances: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        chunk_size: int = 4096
+    ):
+        # Plain ndarray views of memory-mapped arrays share the same pages but skip
+        # np.memmap's per-indexing overhead; node ids are intp so fancy indexing
+        # does not cast them on every step
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold)
+        self.children = np.asarray(children, dtype=np.intp)
+        self._flat_children = self.children.reshape(-1)
+        self.values = np.asarray(values)
+        self.scaler_mean = np.asarray(scaler_mean)
+        self.scaler_scale = np.asarray(scaler_scale)
+        self.feature_importances = np.asarray(feature_importances)
+        self.classes = np.asarray(classes)
+        self.max_depth = max_depth
+        self.chunk_size = chunk_size
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.feature_importances
+
+    @classmethod
+    def from_sklearn(cls, forest, scaler) -> "CompiledForest":
+        """Flatten a fitted RandomForestClassifier and StandardScaler."""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+
+        feature = np.concatenate([tree.feature for tree in trees])
+        is_leaf = feature < 0
+        nodes = np.arange(len(feature))
+        children = np.stack([
+            np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)]),
+            np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+        ], axis=1)
+        children[is_leaf] = nodes[is_leaf, None]
+
+        values = np.concatenate([tree.value[:, 0, :] for tree in trees]).astype(np.float64)
+        totals = values.sum(axis=1, keepdims=True)
+        values = np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+
+        return cls(
+            roots=offsets.astype(np.intp),
+            feature=np.where(is_leaf, 0, feature).astype(np.intp),
+            threshold=np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+            children=children.astype(np.intp),
+            values=values,
+            scaler_mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+            feature_importances=np.asarray(forest.feature_importances_, dtype=np.float64),
+            classes=np.asarray(forest.classes_),
+            max_depth=int(max(tree.max_depth for tree in trees))
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    def to_objects(self) -> Dict[str, Any]:
+        return {"max_depth": self.max_depth}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], objects: Dict[str, Any]) -> "CompiledForest":
+        if "children" not in arrays:
+            arrays = cls._upgrade_arrays(arrays)
+        return cls(**{field: arrays[field] for field in cls.ARRAY_FIELDS}, max_depth=objects["max_depth"])
+
+    @staticmethod
+    def _upgrade_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Convert the earlier layout (separate child arrays, -1 for leaves) in memory."""
+        arrays = dict(arrays)
+        is_leaf = arrays["feature"] < 0
+        nodes = np.arange(len(is_leaf))
+        children = np.stack([arrays.pop("children_left"), arrays.pop("children_right")], axis=1)
+        children[is_leaf] = nodes[is_leaf, None]
+        arrays["children"] = children.astype(np.intp)
+        arrays["feature"] = np.where(is_leaf, 0, arrays["feature"]).astype(np.intp)
+        return arrays
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        # sklearn trees compare float32 features against float64 thresholds
+        return ((np.asarray(X, dtype=np.float64) - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+    def _leaves(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Walk every tree for every row in lockstep and return the reached leaf ids."""
+        n_rows, n_features = X_scaled.shape
+        flat_X = np.ascontiguousarray(X_scaled).reshape(-1)
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.tile(self.roots, (n_rows, 1))
+        for _ in range(self.max_depth):
+            go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self._flat_children[2 * nodes + go_right]
+        return nodes
+
+    def predict_proba_one(self, x: np.ndarray) -> np.ndarray:
+        """Class probabilities for a single raw feature row.
+
+        Walks all trees at once over 1-D node arrays, which keeps per-call
+        overhead to a few dozen small NumPy operations.
+        """
+        x_scaled = self._scale(x).reshape(-1)
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            go_right = x_scaled[self.feature[nodes]] > self.threshold[nodes]
+            nodes = self._flat_children[2 * nodes + go_right]
+        return np.cumsum(self.values[nodes], axis=0)[-1] / self.n_trees
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for raw (unscaled) feature rows."""
+        X_scaled = self._scale(np.atleast_2d(X))
+
+        probabilities = np.empty((X_scaled.shape[0], self.values.shape[1]), dtype=np.float64)
+        for start in range(0, X_scaled.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            leaf_values = self.values[self._leaves(X_scaled[start:end])]
+            probabilities[start:end] = np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+        return probabilities
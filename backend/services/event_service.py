@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+from .feature_store_service import FeatureStoreService
+from .lead_facet_service import LeadFacetService, lead_facet_cache
+from .rescoring_service import RescoringService
 from ..models.event import Event
 from ..models.lead import Lead
 
@@ -28,7 +31,17 @@ class EventService:
         )
         
         self.db.add(event)
+        
+        # Keep the per-lead feature buckets and facet summary in the same transaction
+        # as the event and queue the lead for background rescoring
+        if lead_id is not None:
+            FeatureStoreService(self.db).record_event(lead_id, event_type, event.timestamp)
+            LeadFacetService(self.db).record_event(lead_id, properties)
+            RescoringService(self.db).mark_dirty(lead_id, event.timestamp)
+            
         self.db.commit()
+        if lead_id is not None:
+            lead_facet_cache.invalidate([lead_id])
         self.db.refresh(event)
         
         return event
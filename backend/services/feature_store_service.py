@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import datetime, date
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.event import Event
+from ..models.lead_feature import LeadEventBucket
+
+
+class FeatureStoreService:
+    """Per-lead event counters bucketed by day and event type.
+
+    Window features such as "events in the last 30 days" are answered by summing a
+    handful of daily buckets instead of scanning the events table. Windows are
+    rounded to whole days: a window starting at ``since`` includes every bucket
+    from ``since.date()`` onwards.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_event(self, lead_id: int, event_type: str, timestamp: datetime):
+        """Add one event to its daily bucket. The caller commits."""
+        day = timestamp.date()
+        if self._increment(lead_id, day, event_type):
+            return
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(LeadEventBucket(lead_id=lead_id, day=day, event_type=event_type, count=1))
+        except IntegrityError:
+            # Another writer created the bucket first
+            self._increment(lead_id, day, event_type)
+
+    def _increment(self, lead_id: int, day: date, event_type: str) -> bool:
+        updated = (
+            self.db.query(LeadEventBucket)
+            .filter(
+                LeadEventBucket.lead_id == lead_id,
+                LeadEventBucket.day == day,
+                LeadEventBucket.event_type == event_type
+            )
+            .update({LeadEventBucket.count: LeadEventBucket.count + 1}, synchronize_session=False)
+        )
+        return updated > 0
+
+    def get_event_counts(
+        self,
+        lead_ids: List[int],
+        since: datetime,
+        chunk_size: int = 5000
+    ) -> Dict[int, Dict[str, int]]:
+        """Sum bucketed event counts per lead and event type from ``since`` onwards."""
+        counts = defaultdict(dict)
+
+        for start in range(0, len(lead_ids), chunk_size):
+            rows = (
+                self.db.query(
+                    LeadEventBucket.lead_id,
+                    LeadEventBucket.event_type,
+                    func.sum(LeadEventBucket.count)
+                )
+                .filter(
+                    LeadEventBucket.lead_id.in_(lead_ids[start:start + chunk_size]),
+                    LeadEventBucket.day >= since.date()
+                )
+                .group_by(LeadEventBucket.lead_id, LeadEventBucket.event_type)
+                .all()
+            )
+            for lead_id, event_type, count in rows:
+                counts[lead_id][event_type] = int(count)
+
+        return counts
+
+    def rebuild(self, since: Optional[datetime] = None) -> int:
+        """Regenerate buckets from the events table, optionally only from ``since`` on.
+
+        Returns the number of buckets written.
+        """
+        delete_query = self.db.query(LeadEventBucket)
+        if since:
+            delete_query = delete_query.filter(LeadEventBucket.day >= since.date())
+        delete_query.delete(synchronize_session=False)
+
+        day = func.date(Event.timestamp)
+        source = (
+            select(Event.lead_id, day, Event.event_type, func.count(Event.id))
+            .where(Event.lead_id.isnot(None))
+            .group_by(Event.lead_id, day, Event.event_type)
+        )
+        if since:
+            source = source.where(Event.timestamp >= datetime.combine(since.date(), datetime.min.time()))
+
+        result = self.db.execute(
+            insert(LeadEventBucket).from_select(
+                ["lead_id", "day", "event_type", "count"],
+                source
+            )
+        )
+        self.db.commit()
+
+        return result.rowcount
@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Dict, Optional
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Same tokens as the TF-IDF recommendation vectorizer: "kind:value" pairs
+PROFILE_TOKEN_PATTERN = r'[^:]+:[^:\s]+'
+
+
+def profile_hashing_vectorizer(n_features: int) -> HashingVectorizer:
+    """Stateless vectorizer mapping lead profiles to raw term counts in a hashed term space."""
+    return HashingVectorizer(
+        analyzer='word',
+        token_pattern=PROFILE_TOKEN_PATTERN,
+        n_features=n_features,
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32
+    )
+
+
+def document_frequencies(counts: sparse.csr_matrix, n_features: int) -> np.ndarray:
+    """Number of rows each hashed term occurs in."""
+    return np.bincount(counts.indices, minlength=n_features).astype(np.int64)
+
+
+def smooth_idf(df: np.ndarray, n_docs: int, min_df: int = 1) -> np.ndarray:
+    """Smoothed IDF as computed by TfidfVectorizer; terms below ``min_df`` get weight 0."""
+    idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+    idf[df < min_df] = 0.0
+    return idf
+
+
+class HashedTermRows:
+    """Raw term counts of many rows stored as (possibly memory-mapped) CSR arrays.
+
+    Rows are read on demand and weighted with a fixed IDF vector, so callers can
+    stream over a corpus much larger than memory.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        counts: np.ndarray,
+        n_features: int,
+        idf: Optional[np.ndarray] = None
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.n_features = n_features
+        self.idf = idf
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], n_features: int) -> "HashedTermRows":
+        return cls(
+            arrays["term_indptr"],
+            arrays["term_indices"],
+            arrays["term_counts"],
+            n_features,
+            arrays.get("idf")
+        )
+
+    def raw(self, rows: np.ndarray) -> sparse.csr_matrix:
+        """Unweighted term counts of the given rows, in the given order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(self.indptr[rows], dtype=np.int64)
+        lengths = np.asarray(self.indptr[rows + 1], dtype=np.int64) - starts
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        # Position of every stored entry of the selected rows
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+
+        return sparse.csr_matrix(
+            (np.asarray(self.counts[positions]), np.asarray(self.indices[positions]), indptr),
+            shape=(len(rows), self.n_features)
+        )
+
+    def weighted(self, rows: np.ndarray) -> sparse.csr_matrix:
+        """L2-normalized TF-IDF vectors of the given rows."""
+        matrix = self.raw(rows)
+        matrix.data *= self.idf[matrix.indices]
+        return normalize(matrix, norm='l2', copy=False)
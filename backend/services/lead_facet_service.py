@@ -0,0 +1,230 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.event import Event
+from ..models.lead import Lead
+from ..models.lead_facet import LeadFacetSummary
+from ..config.ai_config import MODEL_PARAMETERS
+
+# Facets of one lead: {"industry": str or None, "employee_bucket": int, "interests": frozenset}
+LeadFacets = Dict[str, Any]
+
+
+class LeadFacetCache:
+    """Process-wide LRU cache of lead facets.
+
+    Entries expire after ``ttl`` seconds so changes made by other processes are
+    picked up; writers in this process invalidate the leads they changed.
+    """
+
+    def __init__(self, max_size: int = 100000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # lead id -> (monotonic time cached, facets)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get_many(self, lead_ids: Iterable[int]) -> Dict[int, LeadFacets]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for lead_id in lead_ids:
+                entry = self._entries.get(lead_id)
+                if entry is None:
+                    continue
+                if now - entry[0] >= self.ttl:
+                    del self._entries[lead_id]
+                    continue
+                self._entries.move_to_end(lead_id)
+                found[lead_id] = entry[1]
+        return found
+
+    def put_many(self, facets: Dict[int, LeadFacets]):
+        now = time.monotonic()
+        with self._lock:
+            for lead_id, lead_facets in facets.items():
+                self._entries[lead_id] = (now, lead_facets)
+                self._entries.move_to_end(lead_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, lead_ids: Iterable[int]):
+        with self._lock:
+            for lead_id in lead_ids:
+                self._entries.pop(lead_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LeadFacetService:
+    """Precomputed industry, company size band and interests of each lead.
+
+    Summaries are created or updated in the transaction that tracks an event
+    or creates or changes a lead, so explaining a recommendation needs no
+    event scans. Leads without a summary yet, i.e. those last written before
+    summaries existed, are derived from their lead row and events on read.
+    Those derived facets are read-through only: they are cached in the
+    process but never written back, since reads run in sessions that do not
+    commit. ``rebuild`` (``rebuild-lead-facets`` on the CLI) persists them.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.config = MODEL_PARAMETERS["recommendation"]
+
+    def employee_bucket(self, employees: Any) -> int:
+        """Company size band of an employee count; unknown sizes fall in band 0."""
+        try:
+            return bisect_right(self.config["employee_buckets"], float(employees or 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _company_facets(self, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        company = (data or {}).get('company', {}) or {}
+        return {
+            "industry": company.get('industry'),
+            "employee_bucket": self.employee_bucket(company.get('employees', 0))
+        }
+
+    def _summaries_from_source(self, lead_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Build summary rows (column mappings) from lead rows and events with two queries."""
+        summaries = {}
+        for lead_id, data in self.db.query(Lead.id, Lead.data).filter(Lead.id.in_(lead_ids)):
+            summaries[lead_id] = {"lead_id": lead_id, **self._company_facets(data)}
+
+        interests = defaultdict(set)
+        for lead_id, properties in (
+            self.db.query(Event.lead_id, Event.properties)
+            .filter(Event.lead_id.in_(list(summaries)))
+        ):
+            if (properties or {}).get('interests'):
+                interests[lead_id].update(str(interest) for interest in properties['interests'])
+
+        for lead_id, summary in summaries.items():
+            summary["interests"] = sorted(interests[lead_id])
+            summary["updated_at"] = datetime.utcnow()
+        return summaries
+
+    def _get_row(self, lead_id: int) -> Optional[LeadFacetSummary]:
+        return self.db.query(LeadFacetSummary).filter(LeadFacetSummary.lead_id == lead_id).first()
+
+    def _create_row(self, lead_id: int) -> Optional[LeadFacetSummary]:
+        """Create a lead's summary from its lead row and events, or return the one another writer created."""
+        source = self._summaries_from_source([lead_id]).get(lead_id)
+        if source is None:
+            return None
+        summary = LeadFacetSummary(**source)
+        try:
+            with self.db.begin_nested():
+                self.db.add(summary)
+        except IntegrityError:
+            # Another writer created the summary first
+            summary = self._get_row(lead_id)
+        return summary
+
+    def record_event(self, lead_id: int, properties: Optional[Dict[str, Any]]):
+        """Merge an event's interests into the lead's summary. The caller commits and invalidates."""
+        interests = (properties or {}).get('interests')
+        if not interests:
+            return
+
+        summary = self._get_row(lead_id) or self._create_row(lead_id)
+        if summary is None:
+            return
+
+        merged = sorted(set(summary.interests or []) | {str(interest) for interest in interests})
+        if merged != summary.interests:
+            summary.interests = merged
+            summary.updated_at = datetime.utcnow()
+
+    def record_lead(self, lead: Lead):
+        """Refresh the company facets of a created or updated lead. The caller commits and invalidates."""
+        updated = self.db.query(LeadFacetSummary).filter(LeadFacetSummary.lead_id == lead.id).update(
+            {**self._company_facets(lead.data), "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        if not updated:
+            self.db.flush()
+            self._create_row(lead.id)
+
+    def get_facets(self, lead_ids: Iterable[int], chunk_size: int = 5000) -> Dict[int, LeadFacets]:
+        """Facets of many leads: cached ones, then one summary query for the rest.
+
+        Leads without a summary are derived from source and cached, not persisted.
+        """
+        lead_ids = list(set(lead_ids))
+        facets = lead_facet_cache.get_many(lead_ids)
+        missing = [lead_id for lead_id in lead_ids if lead_id not in facets]
+
+        loaded = {}
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            summaries = {
+                lead_id: {"industry": industry, "employee_bucket": employee_bucket, "interests": interests}
+                for lead_id, industry, employee_bucket, interests in (
+                    self.db.query(
+                        LeadFacetSummary.lead_id,
+                        LeadFacetSummary.industry,
+                        LeadFacetSummary.employee_bucket,
+                        LeadFacetSummary.interests
+                    )
+                    .filter(LeadFacetSummary.lead_id.in_(chunk))
+                )
+            }
+            unsummarized = [lead_id for lead_id in chunk if lead_id not in summaries]
+            if unsummarized:
+                summaries.update(self._summaries_from_source(unsummarized))
+
+            for lead_id, summary in summaries.items():
+                loaded[lead_id] = {
+                    "industry": summary["industry"],
+                    "employee_bucket": summary["employee_bucket"],
+                    "interests": frozenset(summary["interests"] or [])
+                }
+
+        lead_facet_cache.put_many(loaded)
+        facets.update(loaded)
+        return facets
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """Regenerate all summaries from lead rows and events. Returns the number written.
+
+        Rows are bulk-inserted a chunk at a time, so no summary objects accumulate in the session.
+        """
+        self.db.query(LeadFacetSummary).delete(synchronize_session=False)
+
+        written = 0
+        last_id = 0
+        while True:
+            lead_ids = [
+                lead_id for lead_id, in (
+                    self.db.query(Lead.id)
+                    .filter(Lead.id > last_id)
+                    .order_by(Lead.id)
+                    .limit(chunk_size)
+                )
+            ]
+            if not lead_ids:
+                break
+            self.db.bulk_insert_mappings(LeadFacetSummary, list(self._summaries_from_source(lead_ids).values()))
+            written += len(lead_ids)
+            last_id = lead_ids[-1]
+
+        self.db.commit()
+        lead_facet_cache.clear()
+        return written
+
+
+lead_facet_cache = LeadFacetCache(
+    max_size=MODEL_PARAMETERS["recommendation"]["facet_cache_size"],
+    ttl=MODEL_PARAMETERS["recommendation"]["facet_cache_ttl"]
+)
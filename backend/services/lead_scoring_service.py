@@ -1,121 +1,340 @@
 import numpy as np
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
+from concurrent.futures import ProcessPoolExecutor
 import joblib
 import json
-import os
+import logging
+import shutil
+import time
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
+from .compiled_forest import CompiledForest
+from .feature_store_service import FeatureStoreService
+from .model_artifacts import new_artifact_path, save_artifact, load_artifact, is_artifact_dir
+from .model_registry import model_registry
 from ..models.lead import Lead
-from ..models.event import Event
 from ..models.ai_model import AIModel
+from ..config.ai_config import MODEL_PARAMETERS
+
+FEATURE_NAMES = [
+    'has_company', 'has_phone', 'total_events', 'form_submissions',
+    'page_views', 'resource_downloads', 'company_size', 'days_since_creation'
+]
+
+logger = logging.getLogger(__name__)
+
+def build_feature_row(
+    company: Optional[str],
+    phone: Optional[str],
+    data: Optional[Dict[str, Any]],
+    created_at: datetime,
+    event_counts: Dict[str, int],
+    now: datetime
+) -> List[float]:
+    """Feature values of one lead in FEATURE_NAMES order from its 30-day event counts."""
+    return [
+        # Basic lead information
+        1.0 if company else 0.0,
+        1.0 if phone else 0.0,
+        
+        # Event counts
+        float(sum(event_counts.values())),
+        float(event_counts.get('form_submitted', 0)),
+        float(event_counts.get('page_viewed', 0)),
+        float(event_counts.get('resource_downloaded', 0)),
+        
+        # Enriched data features
+        float((data or {}).get('company', {}).get('employees', 0)),
+        float((now - created_at).days)
+    ]
+
+def build_feature_block(records: List[Tuple], now: datetime) -> np.ndarray:
+    """Feature matrix for (company, phone, data, created_at, event_counts) records."""
+    X = np.zeros((len(records), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, record in enumerate(records):
+        X[i] = build_feature_row(*record, now)
+    return X
+
+def training_lead_id(data: Dict[str, Any]) -> int:
+    """Lead id of a training example given as a lead id, a Lead or a lead dict."""
+    if 'lead_id' in data:
+        return int(data['lead_id'])
+    lead = data['lead']
+    return int(lead.id if isinstance(lead, Lead) else lead['id'])
+
+def save_training_data(training_data: List[Dict[str, Any]]) -> str:
+    """Write training examples as lead ids and labels for a training worker to load; returns the path.
+    
+    Raises KeyError, TypeError or ValueError for a malformed example.
+    """
+    arrays = {
+        'lead_ids': np.array([training_lead_id(data) for data in training_data], dtype=np.int64),
+        'converted': np.array([bool(data['converted']) for data in training_data], dtype=bool)
+    }
+    return save_artifact(new_artifact_path("lead_scoring", directory="training_data"), arrays)
+
+def load_training_data(path: str) -> List[Dict[str, Any]]:
+    """Training examples written by save_training_data."""
+    arrays, _ = load_artifact(path, mmap_mode=None)
+    return [
+        {'lead_id': int(lead_id), 'converted': bool(converted)}
+        for lead_id, converted in zip(arrays['lead_ids'], arrays['converted'])
+    ]
+
+def discard_training_data(path: str):
+    """Delete training examples once no job will read them."""
+    shutil.rmtree(path, ignore_errors=True)
+
+def extract_feature_chunk(
+    db: Session,
+    lead_ids: List[int],
+    now: datetime,
+    query_chunk_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Feature rows for a chunk of leads from two set-based reads.
+    
+    Returns the rows of the leads that exist, in input order, and a mask of
+    which of the lead ids were found.
+    """
+    # Only the columns the features need, not full ORM objects
+    leads = {
+        row.id: row
+        for row in db.query(
+            Lead.id, Lead.company, Lead.phone, Lead.data, Lead.created_at
+        ).filter(Lead.id.in_(lead_ids))
+    }
+    event_counts = FeatureStoreService(db).get_event_counts(
+        lead_ids,
+        now - timedelta(days=30),
+        chunk_size=query_chunk_size
+    )
+    
+    found = np.array([lead_id in leads for lead_id in lead_ids], dtype=bool)
+    records = [
+        (lead.company, lead.phone, lead.data, lead.created_at, event_counts.get(lead.id, {}))
+        for lead in (leads[lead_id] for lead_id in lead_ids if lead_id in leads)
+    ]
+    return build_feature_block(records, now), found
+
+# Per-process session of training feature workers
+_worker_db: Optional[Session] = None
+
+def _init_feature_worker(database_url: str):
+    global _worker_db
+    _worker_db = sessionmaker(bind=create_engine(database_url))()
+
+def _extract_feature_chunk_in_worker(lead_ids: List[int], now: datetime, query_chunk_size: int):
+    return extract_feature_chunk(_worker_db, lead_ids, now, query_chunk_size)
+
+def load_lead_scoring_artifact(path: str) -> CompiledForest:
+    """Open a lead scoring artifact, compiling legacy joblib files on load."""
+    if is_artifact_dir(path):
+        arrays, objects = load_artifact(path)
+        return CompiledForest.from_arrays(arrays, objects)
+        
+    model_data = joblib.load(path)
+    return CompiledForest.from_sklearn(model_data['model'], model_data['scaler'])
 
 class LeadScoringService:
     def __init__(self, db: Session):
         self.db = db
         self.model = None
-        self.scaler = None
+        self.model_version = None
+        self.config = MODEL_PARAMETERS["lead_scoring"]
         self._load_active_model()
 
     def _load_active_model(self):
-        """Load the active lead scoring model from storage."""
-        active_model = (
-            self.db.query(AIModel)
-            .filter(AIModel.name == "lead_scoring", AIModel.is_active == True)
-            .first()
+        """Load the active lead scoring model from the shared model registry."""
+        self.model_version, self.model = model_registry.get_active(
+            self.db,
+            "lead_scoring",
+            loader=load_lead_scoring_artifact
         )
-        
-        if active_model and os.path.exists(active_model.filepath):
-            model_data = joblib.load(active_model.filepath)
-            self.model = model_data['model']
-            self.scaler = model_data['scaler']
+
+    def _event_counts(self, lead_ids: List[int], since: datetime) -> Dict[int, Dict[str, int]]:
+        """Count events per lead and event type since a cutoff from the feature store."""
+        return FeatureStoreService(self.db).get_event_counts(
+            lead_ids,
+            since,
+            chunk_size=self.config["query_chunk_size"]
+        )
+
+    def _build_features(self, lead: Lead, event_counts: Dict[str, int], now: datetime) -> Dict[str, float]:
+        """Build the feature dict for a lead from its 30-day event counts."""
+        row = build_feature_row(lead.company, lead.phone, lead.data, lead.created_at, event_counts, now)
+        return dict(zip(FEATURE_NAMES, row))
 
     def _extract_features(self, lead: Lead) -> Dict[str, float]:
         """Extract features from lead data for scoring."""
-        # Get events in the last 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        events = (
-            self.db.query(Event)
-            .filter(
-                Event.lead_id == lead.id,
-                Event.timestamp >= thirty_days_ago
-            )
-            .all()
-        )
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        event_counts = self._event_counts([lead.id], thirty_days_ago)
+        
+        return self._build_features(lead, event_counts.get(lead.id, {}), now)
 
-        # Calculate features
-        features = {
-            # Basic lead information
-            'has_company': 1.0 if lead.company else 0.0,
-            'has_phone': 1.0 if lead.phone else 0.0,
-            
-            # Event counts
-            'total_events': len(events),
-            'form_submissions': sum(1 for e in events if e.event_type == 'form_submitted'),
-            'page_views': sum(1 for e in events if e.event_type == 'page_viewed'),
-            'resource_downloads': sum(1 for e in events if e.event_type == 'resource_downloaded'),
-            
-            # Enriched data features
-            'company_size': float(lead.data.get('company', {}).get('employees', 0)),
-            'days_since_creation': (datetime.utcnow() - lead.created_at).days
-        }
+    def _feature_matrix(self, leads: List[Lead]) -> np.ndarray:
+        """Extract features for many leads with one grouped event query per chunk."""
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        event_counts = self._event_counts([lead.id for lead in leads], thirty_days_ago)
         
-        return features
+        records = [
+            (lead.company, lead.phone, lead.data, lead.created_at, event_counts.get(lead.id, {}))
+            for lead in leads
+        ]
+        return build_feature_block(records, now)
 
     def score_lead(self, lead: Lead) -> Optional[float]:
         """Score a lead using the active model."""
-        if not self.model or not self.scaler:
+        if self.model is None:
             return None
 
         # Extract features
         features = self._extract_features(lead)
         
-        # Convert to array and scale
-        feature_array = np.array([list(features.values())])
-        scaled_features = self.scaler.transform(feature_array)
+        # Convert to array; the compiled forest applies the scaler itself
+        feature_array = np.array([features[name] for name in FEATURE_NAMES])
         
-        # Get prediction probability
-        score = self.model.predict_proba(scaled_features)[0][1]  # Probability of positive class
+        # Get prediction probability from the single-row evaluator
+        score = self.model.predict_proba_one(feature_array)[1]  # Probability of positive class
         
         return float(score)
 
-    def train_model(self, training_data: List[Dict[str, Any]]) -> Dict[str, float]:
-        """Train a new lead scoring model."""
-        # Prepare data
-        X = []  # Features
-        y = []  # Labels (converted/not converted)
-        
-        for data in training_data:
-            features = list(self._extract_features(data['lead']).values())
-            X.append(features)
-            y.append(data['converted'])
+    def score_leads(self, leads: List[Lead]) -> Optional[np.ndarray]:
+        """Score many leads with one feature query pass and one model call."""
+        if self.model is None:
+            return None
+        if not leads:
+            return np.zeros(0, dtype=np.float64)
             
-        X = np.array(X)
-        y = np.array(y)
+        X = self._feature_matrix(leads)
+        return self.model.predict_proba(X)[:, 1]
+
+    def batch_score_leads(self, leads: List[Lead]) -> Optional[List[Dict[str, Any]]]:
+        """Score a batch of leads and write the scores back in bulk."""
+        scores = self.score_leads(leads)
+        if scores is None:
+            return None
+            
+        updates = [
+            {"id": lead.id, "lead_score": float(score)}
+            for lead, score in zip(leads, scores)
+        ]
+        self.db.bulk_update_mappings(Lead, updates)
+        self.db.commit()
+        
+        return [{"lead_id": update["id"], "score": update["lead_score"]} for update in updates]
+
+    def _feature_worker_url(self) -> Optional[str]:
+        """Database URL worker processes can open, or None for in-memory databases."""
+        url = self.db.get_bind().url
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            return None
+        return url.render_as_string(hide_password=False)
+
+    def _training_matrix(self, training_data: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the training feature matrix and labels chunk by chunk.
+        
+        With more than one chunk, worker processes with their own database
+        sessions read and featurize chunks in parallel.
+        """
+        training_config = self.config["training"]
+        chunk_size = training_config["chunk_size"]
+        workers = training_config["feature_workers"]
+        query_chunk_size = self.config["query_chunk_size"]
+        now = datetime.utcnow()
+        
+        lead_ids = [training_lead_id(data) for data in training_data]
+        labels = np.array([data['converted'] for data in training_data])
+        chunks = [lead_ids[start:start + chunk_size] for start in range(0, len(lead_ids), chunk_size)]
+        
+        database_url = self._feature_worker_url()
+        if workers <= 1 or len(chunks) <= 1 or database_url is None:
+            results = [extract_feature_chunk(self.db, chunk, now, query_chunk_size) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)),
+                initializer=_init_feature_worker,
+                initargs=(database_url,)
+            ) as pool:
+                results = list(pool.map(
+                    _extract_feature_chunk_in_worker,
+                    chunks,
+                    [now] * len(chunks),
+                    [query_chunk_size] * len(chunks)
+                ))
+                
+        if not results:
+            return np.zeros((0, len(FEATURE_NAMES))), labels
+        X = np.concatenate([block for block, _ in results])
+        found = np.concatenate([mask for _, mask in results])
+        return X, labels[found]
+
+    def train_model(
+        self,
+        training_data: List[Dict[str, Any]],
+        n_jobs: Optional[int] = None,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, Any]:
+        """Train a new lead scoring model.
+        
+        Each training example is {'lead_id' or 'lead': ..., 'converted': bool}.
+        ``progress(stage, fraction)`` is called as each stage starts and may raise
+        to abort training before the model is activated; ``before_activate`` is
+        passed to ``model_registry.activate``.
+        Returns the model metrics plus wall-clock seconds per training stage.
+        """
+        if n_jobs is None:
+            n_jobs = self.config["training"]["n_jobs"]
+        progress = progress or (lambda stage, fraction: None)
+        timings = {}
+        
+        # Prepare data
+        progress('extract', 0.0)
+        stage_start = time.perf_counter()
+        X, y = self._training_matrix(training_data)
+        if len(X) == 0:
+            raise ValueError("None of the training leads exist")
+        timings['extract'] = time.perf_counter() - stage_start
         
         # Initialize and fit scaler
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        progress('scale', 0.4)
+        stage_start = time.perf_counter()
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        timings['scale'] = time.perf_counter() - stage_start
         
         # Train model
-        self.model = RandomForestClassifier(
+        progress('fit', 0.45)
+        stage_start = time.perf_counter()
+        forest = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            random_state=42
+            random_state=42,
+            n_jobs=n_jobs
         )
-        self.model.fit(X_scaled, y)
+        forest.fit(X_scaled, y)
+        timings['fit'] = time.perf_counter() - stage_start
         
-        # Save model
-        model_path = f"models/lead_scoring_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.joblib"
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        # The fitted forest predicts in parallel; the compiled copy gives identical results
+        progress('metrics', 0.85)
+        stage_start = time.perf_counter()
+        metrics = self._calculate_metrics(y, forest.predict(X_scaled))
+        timings['metrics'] = time.perf_counter() - stage_start
         
-        model_data = {
-            'model': self.model,
-            'scaler': self.scaler
-        }
-        joblib.dump(model_data, model_path)
+        # Flatten forest and scaler into arrays that serving processes can mmap
+        progress('persist', 0.9)
+        stage_start = time.perf_counter()
+        self.model = CompiledForest.from_sklearn(forest, scaler)
+        
+        # Save model
+        model_path = new_artifact_path("lead_scoring")
+        save_artifact(model_path, self.model.to_arrays(), self.model.to_objects())
         
         # Create model record
         new_model = AIModel(
@@ -124,22 +343,20 @@ class LeadScoringService:
             description="Lead scoring model using Random Forest",
             model_type="random_forest",
             filepath=model_path,
-            is_active=True,
-            parameters=json.dumps(self.model.get_params()),
-            metrics=json.dumps(self._calculate_metrics(X_scaled, y))
+            parameters=json.dumps(forest.get_params()),
+            metrics=json.dumps(metrics)
         )
         
-        # Deactivate other models
-        self.db.query(AIModel).filter(
-            AIModel.name == "lead_scoring",
-            AIModel.is_active == True
-        ).update({"is_active": False})
-        
-        # Save new model
-        self.db.add(new_model)
-        self.db.commit()
+        # Save new model and deactivate other versions in one transaction
+        model_registry.activate(self.db, new_model, before_commit=before_activate)
+        model_registry.prune_artifacts(self.db, "lead_scoring", self.config["training"]["keep_artifacts"])
+        timings['persist'] = time.perf_counter() - stage_start
         
-        return self._calculate_metrics(X_scaled, y)
+        logger.info(
+            f"Trained lead scoring model on {len(y)} leads: "
+            + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+        )
+        return {**metrics, 'stage_seconds': timings}
 
     def _get_next_version(self) -> int:
         """Get the next version number for lead scoring models."""
@@ -151,12 +368,10 @@ class LeadScoringService:
         )
         return (latest_model.version + 1) if latest_model else 1
 
-    def _calculate_metrics(self, X: np.ndarray, y: np.array) -> Dict[str, float]:
+    def _calculate_metrics(self, y: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
         """Calculate model performance metrics."""
         from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
         
-        y_pred = self.model.predict(X)
-        
         return {
             'accuracy': float(accuracy_score(y, y_pred)),
             'precision': float(precision_score(y, y_pred)),
@@ -166,13 +381,8 @@ class LeadScoringService:
 
     def get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance scores."""
-        if not self.model:
+        if self.model is None:
             return {}
             
-        feature_names = [
-            'has_company', 'has_phone', 'total_events', 'form_submissions',
-            'page_views', 'resource_downloads', 'company_size', 'days_since_creation'
-        ]
-        
         importance_scores = self.model.feature_importances_
-        return dict(zip(feature_names, importance_scores.tolist())) 
\ No newline at end of file
+        return dict(zip(FEATURE_NAMES, importance_scores.tolist()))
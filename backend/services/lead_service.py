@@ -2,7 +2,17 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, List
 
+from .lead_facet_service import LeadFacetService, lead_facet_cache
+from .recommendation_list_service import RecommendationListService
+from .recommendation_service import RecommendationService
+from ..models.ab_test_stats import ABTestLead
+from ..models.analytics_rollup import CampaignLead, LeadInteractionRollup
 from ..models.lead import Lead
+from ..models.lead_facet import LeadFacetSummary
+from ..models.lead_feature import LeadEventBucket
+from ..models.lead_rescore_queue import LeadRescoreQueue
+from ..models.lead_segment import LeadSegment
+from ..models.recommendation_update_queue import RecommendationUpdateQueue
 from ..schemas.lead import LeadCreate, LeadUpdate
 from ..utils.data_cleaning import clean_lead_data
 from ..integrations.clearbit import enrich_lead_data
@@ -31,7 +41,11 @@ class LeadService:
         enriched_data = enrich_lead_data(db_lead.email)
         if enriched_data:
             db_lead.data = enriched_data
-            self.db.commit()
+        LeadFacetService(self.db).record_lead(db_lead)
+        # Folded into the recommendation model by the next batched update
+        RecommendationService(self.db).queue_updates([db_lead.id])
+        self.db.commit()
+        lead_facet_cache.invalidate([db_lead.id])
             
         return db_lead
 
@@ -53,7 +67,11 @@ class LeadService:
             setattr(db_lead, field, value)
             
         db_lead.updated_at = datetime.utcnow()
+        if 'data' in cleaned_data:
+            LeadFacetService(self.db).record_lead(db_lead)
+        RecommendationService(self.db).queue_updates([lead_id])
         self.db.commit()
+        lead_facet_cache.invalidate([lead_id])
         self.db.refresh(db_lead)
         
         return db_lead
@@ -63,6 +81,20 @@ class LeadService:
         if not db_lead:
             return False
             
+        RecommendationListService(self.db).delete(lead_id)
+        # Lead ids can be reused, so derived per-lead rows must not outlive their lead
+        for model in (
+            LeadSegment,
+            LeadEventBucket,
+            LeadRescoreQueue,
+            RecommendationUpdateQueue,
+            LeadFacetSummary,
+            LeadInteractionRollup,
+            CampaignLead,
+            ABTestLead
+        ):
+            self.db.query(model).filter(model.lead_id == lead_id).delete(synchronize_session=False)
         self.db.delete(db_lead)
         self.db.commit()
+        lead_facet_cache.invalidate([lead_id])
         return True 
\ No newline at end of file
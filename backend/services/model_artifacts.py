@@ -0,0 +1,121 @@
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+OBJECTS_FILE = "objects.joblib"
+
+
+def new_artifact_path(name: str, directory: str = "models") -> str:
+    """Unique path for a new artifact of a model, e.g. ``models/lead_scoring_20240101_120000_1a2b3c4d``.
+
+    The random suffix keeps saves of the same model within one second (fold-ins,
+    concurrent training jobs) from colliding on the directory name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}")
+
+
+def save_artifact(path: str, arrays: Dict[str, np.ndarray], objects: Optional[Dict[str, Any]] = None) -> str:
+    """Write a model artifact directory.
+
+    Each array is stored as its own ``.npy`` file so it can later be opened with
+    ``mmap``; small Python objects go into a single joblib file. The directory is
+    assembled under a temporary name and renamed into place, so readers never see
+    a partially written artifact.
+    """
+    writer = ArtifactWriter(path)
+    for name, array in arrays.items():
+        writer.add(name, array)
+    return writer.close(objects)
+
+
+class ArtifactWriter:
+    """Incremental writer for the artifact directories of save_artifact.
+
+    Arrays can be added whole or appended chunk by chunk; appended chunks are
+    spooled to disk, so writing an artifact needs memory for one chunk rather
+    than for the whole array. Nothing is visible at ``path`` until close().
+    """
+
+    COPY_BLOCK = 1 << 22  # elements copied per step when finishing a spooled array
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+        # name -> [open spool file, dtype, number of elements]
+        self._spools: Dict[str, list] = {}
+
+    def _array_path(self, name: str) -> str:
+        return os.path.join(self.tmp_path, f"{name}.npy")
+
+    def add(self, name: str, array: np.ndarray):
+        """Write a whole array."""
+        np.save(self._array_path(name), np.ascontiguousarray(array), allow_pickle=False)
+
+    def append(self, name: str, chunk: np.ndarray):
+        """Append a 1-d chunk to an array; later chunks are cast to the first chunk's dtype."""
+        chunk = np.ascontiguousarray(chunk).ravel()
+        spool = self._spools.get(name)
+        if spool is None:
+            spool = [open(os.path.join(self.tmp_path, f"{name}.spool"), "wb"), chunk.dtype, 0]
+            self._spools[name] = spool
+        chunk.astype(spool[1], copy=False).tofile(spool[0])
+        spool[2] += len(chunk)
+
+    def finish(self, name: str) -> np.ndarray:
+        """Turn the appended chunks of an array into its ``.npy`` file and return it memory-mapped."""
+        spool_file, dtype, length = self._spools.pop(name)
+        spool_file.close()
+        spool_path = spool_file.name
+        array_path = self._array_path(name)
+
+        if length == 0:
+            np.save(array_path, np.zeros(0, dtype=dtype), allow_pickle=False)
+        else:
+            source = np.memmap(spool_path, dtype=dtype, mode="r", shape=(length,))
+            target = np.lib.format.open_memmap(array_path, mode="w+", dtype=dtype, shape=(length,))
+            for start in range(0, length, self.COPY_BLOCK):
+                target[start:start + self.COPY_BLOCK] = source[start:start + self.COPY_BLOCK]
+            target.flush()
+            del source, target
+        os.remove(spool_path)
+
+        return np.load(array_path, mmap_mode="r", allow_pickle=False)
+
+    def close(self, objects: Optional[Dict[str, Any]] = None) -> str:
+        """Finish all arrays, write the objects file and move the artifact into place."""
+        for name in list(self._spools):
+            self.finish(name)
+        joblib.dump(objects or {}, os.path.join(self.tmp_path, OBJECTS_FILE))
+
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+def load_artifact(path: str, mmap_mode: Optional[str] = "r") -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Open a model artifact directory written by save_artifact.
+
+    Arrays are memory-mapped read-only by default, so every process that opens the
+    same artifact shares one page-cache copy instead of holding a private one.
+    """
+    arrays = {}
+    for filename in os.listdir(path):
+        if filename.endswith(".npy"):
+            arrays[filename[:-4]] = np.load(os.path.join(path, filename), mmap_mode=mmap_mode, allow_pickle=False)
+
+    objects_path = os.path.join(path, OBJECTS_FILE)
+    objects = joblib.load(objects_path) if os.path.exists(objects_path) else {}
+    return arrays, objects
+
+
+def is_artifact_dir(path: str) -> bool:
+    """True for artifacts in the directory format, False for legacy single joblib files."""
+    return os.path.isdir(path)
@@ -0,0 +1,195 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import joblib
+from sqlalchemy.orm import Session
+
+from ..models.ai_model import AIModel
+from ..config.ai_config import MODEL_REGISTRY
+
+ModelKey = Tuple[str, int]
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded model artifacts keyed by (model name, version).
+
+    Each artifact is deserialized once per process. Callers re-check which version
+    is active through a generation counter that is bumped whenever a model is
+    trained or activated in this process; the database is only consulted again
+    when the generation changed or ``recheck_interval`` seconds have passed, which
+    is how activations made by other worker processes are picked up. Swapping to
+    a new version replaces a dict entry, so in-flight requests keep using the
+    artifact they already hold.
+    """
+
+    def __init__(self, recheck_interval: float = 30.0):
+        self.recheck_interval = recheck_interval
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._artifacts: Dict[ModelKey, Any] = {}
+        # name -> (generation seen, monotonic time checked, active key or None)
+        self._active: Dict[str, Tuple[int, float, Optional[ModelKey]]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self) -> int:
+        """Signal that the active version of some model may have changed."""
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def activate(
+        self,
+        db: Session,
+        model: AIModel,
+        before_commit: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> AIModel:
+        """Make ``model`` the only active version of its name in one transaction.
+
+        ``before_commit`` runs after the model row is flushed and before the
+        commit, so callers can record the new model id alongside the swap.
+        Readers see either the previous active version or the new one.
+        """
+        db.query(AIModel).filter(
+            AIModel.name == model.name,
+            AIModel.is_active.is_(True)
+        ).update({"is_active": False}, synchronize_session=False)
+
+        model.is_active = True
+        db.add(model)
+        db.flush()
+        if before_commit is not None:
+            before_commit(db, model)
+        db.commit()
+
+        self.bump_generation()
+        return model
+
+    def prune_artifacts(self, db: Session, name: str, keep: int) -> int:
+        """Delete the artifacts of all but the ``keep`` newest versions of a model.
+
+        The active version is always kept. Model rows stay as version history,
+        with their filepath cleared so they cannot be activated again. Processes
+        that still have a pruned artifact memory-mapped keep reading it until
+        they unmap it. Returns the number of artifacts deleted.
+        """
+        models = (
+            db.query(AIModel)
+            .filter(AIModel.name == name, AIModel.filepath.isnot(None))
+            .order_by(AIModel.version.desc())
+            .all()
+        )
+        pruned = 0
+        for model in models[keep:]:
+            if model.is_active:
+                continue
+            if os.path.isdir(model.filepath):
+                shutil.rmtree(model.filepath, ignore_errors=True)
+            elif os.path.exists(model.filepath):
+                os.remove(model.filepath)
+            model.filepath = None
+            pruned += 1
+        db.commit()
+
+        if pruned:
+            logging.info(f"Pruned {pruned} superseded {name} model artifacts")
+        return pruned
+
+    def get_active(
+        self,
+        db: Session,
+        name: str,
+        loader: Callable[[str], Any] = joblib.load
+    ) -> Tuple[Optional[int], Optional[Any]]:
+        """Return (version, artifact) of the active model, loading it at most once."""
+        cached = self._active.get(name)
+        if cached is not None:
+            generation, checked_at, key = cached
+            if generation == self._generation and time.monotonic() - checked_at < self.recheck_interval:
+                self._record(name, hits=1)
+                if key is None:
+                    return None, None
+                return key[1], self._artifacts.get(key)
+
+        # Read the generation before the lookup so a concurrent bump forces a re-check
+        generation = self._generation
+        active_model = (
+            db.query(AIModel)
+            .filter(AIModel.name == name, AIModel.is_active.is_(True))
+            .first()
+        )
+        self._record(name, lookups=1)
+
+        if not active_model or not active_model.filepath or not os.path.exists(active_model.filepath):
+            self._active[name] = (generation, time.monotonic(), None)
+            return None, None
+
+        key = (name, active_model.version)
+        artifact = self._artifacts.get(key)
+        if artifact is None:
+            artifact = self._load(key, active_model.filepath, loader)
+
+        self._active[name] = (generation, time.monotonic(), key)
+        self._evict(name, keep=key)
+        return key[1], artifact
+
+    def _load(self, key: ModelKey, filepath: str, loader: Callable[[str], Any]) -> Any:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another request may have finished loading while we waited
+            artifact = self._artifacts.get(key)
+            if artifact is not None:
+                return artifact
+
+            start = time.perf_counter()
+            artifact = loader(filepath)
+            elapsed = time.perf_counter() - start
+
+            self._artifacts[key] = artifact
+            self._record(key[0], loads=1, load_seconds=elapsed, last_load_seconds=elapsed, version=key[1])
+            logging.info(f"Loaded model {key[0]} v{key[1]} from {filepath} in {elapsed:.3f}s")
+            return artifact
+
+    def _evict(self, name: str, keep: ModelKey):
+        """Drop cached versions of a model other than the active one."""
+        for key in [k for k in list(self._artifacts) if k[0] == name and k != keep]:
+            self._artifacts.pop(key, None)
+            with self._lock:
+                self._load_locks.pop(key, None)
+
+    def _record(self, name: str, **values):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "hits": 0,
+                "lookups": 0,
+                "loads": 0,
+                "load_seconds": 0.0,
+                "last_load_seconds": None,
+                "version": None
+            })
+            for field, value in values.items():
+                if field in ("hits", "lookups", "loads", "load_seconds"):
+                    stats[field] += value
+                else:
+                    stats[field] = value
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model cache hits, active-version lookups, loads and load timing."""
+        with self._lock:
+            return {
+                "generation": self._generation,
+                "models": {name: dict(stats) for name, stats in self._stats.items()}
+            }
+
+
+model_registry = ModelRegistry(recheck_interval=MODEL_REGISTRY["recheck_interval"])
@@ -0,0 +1,318 @@
+import numpy as np
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from scipy import sparse
+
+
+class NeighborIndex:
+    """Top-k nearest neighbors of every row, stored as CSR arrays.
+
+    Row ``i`` owns ``indices[indptr[i]:indptr[i + 1]]`` (int32 row ids) and the
+    matching ``scores`` (float32 cosine similarities), sorted by descending score.
+    ``ids`` maps each row to the external id (e.g. lead id) it was built from.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        ids: Optional[np.ndarray] = None
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.ids = ids if ids is not None else np.arange(len(indptr) - 1, dtype=np.int64)
+
+        # Ids are looked up by binary search; indexes built from id-ordered rows need
+        # no extra arrays, which keeps memory-mapped indexes shareable between processes
+        if len(self.ids) > 1 and np.any(self.ids[1:] < self.ids[:-1]):
+            self._order = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = self.ids[self._order]
+        else:
+            self._order = None
+            self._sorted_ids = self.ids
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes + self.ids.nbytes
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"indptr": self.indptr, "indices": self.indices, "scores": self.scores, "ids": self.ids}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "NeighborIndex":
+        return cls(arrays["indptr"], arrays["indices"], arrays["scores"], arrays["ids"])
+
+    def row_of(self, external_id: int) -> Optional[int]:
+        """Return the row for an external id, or None if it was not indexed."""
+        pos = int(np.searchsorted(self._sorted_ids, external_id))
+        if pos >= len(self._sorted_ids) or self._sorted_ids[pos] != external_id:
+            return None
+        return int(self._order[pos]) if self._order is not None else pos
+
+    def neighbors(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the neighbor row ids and scores of a row, best first."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def top_n(self, rows: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The best ``n`` neighbors of many rows as one CSR row slice.
+
+        Returns ``(indptr, neighbor_rows, scores)`` for the given rows in order.
+        Lists are stored ranked, so this only gathers the leading entries of
+        each row and needs no per-row sorting or Python loop.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(self.indptr[rows], dtype=np.int64)
+        lengths = np.minimum(np.asarray(self.indptr[rows + 1], dtype=np.int64) - starts, max(n, 0))
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return indptr, np.asarray(self.indices[positions]), np.asarray(self.scores[positions])
+
+    def to_csr(self) -> sparse.csr_matrix:
+        """View the index as an n_rows x n_rows sparse similarity matrix."""
+        return sparse.csr_matrix(
+            (self.scores, self.indices, self.indptr),
+            shape=(self.n_rows, self.n_rows)
+        )
+
+
+def _chunk_rows(n_rows: int, n_features: int, chunk_rows: int, max_chunk_bytes: int) -> int:
+    """Number of query rows per chunk so the dense working set fits the budget."""
+    # Per query row: dense float32 query column, the float32 similarity row with its
+    # contiguous copy, and the int64 argpartition output
+    bytes_per_row = max(1, n_features * 4 + n_rows * 16)
+    return max(1, min(chunk_rows, max_chunk_bytes // bytes_per_row))
+
+
+def _top_k_block(block: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the k largest entries per row, sorted descending."""
+    if k < block.shape[1]:
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+    top_scores = np.take_along_axis(block, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def build_neighbor_index(
+    matrix,
+    ids: Optional[np.ndarray] = None,
+    k: int = 50,
+    chunk_rows: int = 1024,
+    max_chunk_bytes: int = 256 * 1024 ** 2
+) -> NeighborIndex:
+    """Build a top-k cosine neighbor index from an L2-normalized row matrix.
+
+    Similarities are computed one block of query rows at a time against the full
+    matrix, so peak memory is bounded by ``max_chunk_bytes`` plus the index itself
+    rather than growing with n_rows squared. Self matches and non-positive
+    similarities are dropped. ``ids`` gives the external id of each row.
+    """
+    matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+    n_rows = matrix.shape[0]
+    k = min(k, max(n_rows - 1, 0))
+    if ids is not None:
+        ids = np.asarray(ids, dtype=np.int64)
+
+    if n_rows == 0 or k == 0:
+        return NeighborIndex(
+            np.zeros(n_rows + 1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32),
+            ids
+        )
+
+    step = _chunk_rows(n_rows, matrix.shape[1], chunk_rows, max_chunk_bytes)
+
+    counts = np.zeros(n_rows, dtype=np.int64)
+    chunk_indices = []
+    chunk_scores = []
+
+    for start in range(0, n_rows, step):
+        end = min(start + step, n_rows)
+        # Sparse corpus times a dense query block avoids a sparse x sparse product
+        query = matrix[start:end].T.toarray()
+        block = np.ascontiguousarray((matrix @ query).T)
+        del query
+
+        # Never recommend a lead to itself
+        block[np.arange(end - start), np.arange(start, end)] = 0.0
+
+        top, top_scores = _top_k_block(block, k)
+        keep = top_scores > 0
+
+        counts[start:end] = keep.sum(axis=1)
+        chunk_indices.append(top[keep].astype(np.int32))
+        chunk_scores.append(top_scores[keep].astype(np.float32))
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    return NeighborIndex(
+        indptr,
+        np.concatenate(chunk_indices),
+        np.concatenate(chunk_scores),
+        ids
+    )
+
+
+# Returns the L2-normalized rows with the given row numbers as a sparse matrix
+RowReader = Callable[[np.ndarray], sparse.csr_matrix]
+
+
+def _merge_top_k(
+    top: np.ndarray,
+    top_scores: np.ndarray,
+    block: np.ndarray,
+    block_start: int,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge a block of candidate similarities into running top-k lists."""
+    candidates = np.concatenate(
+        [top, np.broadcast_to(np.arange(block_start, block_start + block.shape[1]), block.shape)],
+        axis=1
+    )
+    candidate_scores = np.concatenate([top_scores, block], axis=1)
+    picked, picked_scores = _top_k_block(candidate_scores, min(k, candidate_scores.shape[1]))
+    return np.take_along_axis(candidates, picked, axis=1), picked_scores
+
+
+def _similarity_block(query: sparse.csr_matrix, corpus: sparse.csr_matrix) -> np.ndarray:
+    """Dense query x corpus cosine similarities of two sparse row blocks."""
+    return np.asarray((query @ corpus.T).toarray(), dtype=np.float32)
+
+
+def iter_neighbor_blocks(
+    read_rows: RowReader,
+    n_rows: int,
+    k: int = 50,
+    query_rows: int = 1024,
+    max_chunk_bytes: int = 256 * 1024 ** 2
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Top-k cosine neighbors of a sparse corpus that is never held in memory at once.
+
+    Yields ``(counts, indices, scores)`` for consecutive blocks of query rows in
+    the CSR layout of NeighborIndex. Each query block is compared with the
+    corpus one block of rows at a time and the running top-k lists are merged,
+    so memory is bounded by ``max_chunk_bytes`` and the block sizes instead of
+    n_rows. Meant for high-dimensional (e.g. hashed) term spaces where
+    build_neighbor_index's dense query blocks would not fit.
+    """
+    k = min(k, max(n_rows - 1, 0))
+    # Per similarity cell: the float32 block plus the merged candidate scores and indices
+    corpus_rows = max(1, max_chunk_bytes // (max(query_rows, 1) * 16))
+
+    for query_start in range(0, n_rows, query_rows):
+        query_end = min(query_start + query_rows, n_rows)
+        n_query = query_end - query_start
+        if k == 0:
+            yield np.zeros(n_query, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+            continue
+
+        query = read_rows(np.arange(query_start, query_end))
+        top = np.zeros((n_query, 0), dtype=np.int64)
+        top_scores = np.zeros((n_query, 0), dtype=np.float32)
+
+        for corpus_start in range(0, n_rows, corpus_rows):
+            corpus_end = min(corpus_start + corpus_rows, n_rows)
+            block = _similarity_block(query, read_rows(np.arange(corpus_start, corpus_end)))
+
+            # Never recommend a lead to itself
+            overlap = np.arange(max(query_start, corpus_start), min(query_end, corpus_end))
+            block[overlap - query_start, overlap - corpus_start] = 0.0
+
+            top, top_scores = _merge_top_k(top, top_scores, block, corpus_start, k)
+
+        keep = top_scores > 0
+        yield keep.sum(axis=1), top[keep].astype(np.int32), top_scores[keep].astype(np.float32)
+
+
+def fold_in_neighbors(
+    index: NeighborIndex,
+    read_rows: RowReader,
+    n_rows: int,
+    rows: np.ndarray,
+    ids: np.ndarray,
+    k: int = 50,
+    max_chunk_bytes: int = 256 * 1024 ** 2
+) -> NeighborIndex:
+    """Update an index after the vectors of some rows changed or rows were appended.
+
+    ``rows`` are the changed and new row numbers, ``n_rows`` and ``ids`` describe
+    the corpus after the change (rows past ``index.n_rows`` are new). The lists
+    of changed rows are recomputed against the whole corpus, and every other
+    row gains a changed row where it now beats the row's current k-th neighbor.
+    Entries of other rows that pointed at a changed row are dropped rather than
+    re-ranked, so such lists may hold fewer than k neighbors until the index is
+    rebuilt.
+    """
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    k = min(k, max(n_rows - 1, 0))
+    changed = np.zeros(n_rows, dtype=bool)
+    changed[rows] = True
+
+    # Score a row's neighbor has to beat to enter its (full) list
+    old_counts = np.diff(index.indptr)
+    threshold = np.zeros(n_rows, dtype=np.float32)
+    full = np.flatnonzero(old_counts >= k) if k else np.zeros(0, dtype=np.int64)
+    threshold[full] = index.scores[index.indptr[full + 1] - 1]
+
+    query = read_rows(rows)
+    top = np.zeros((len(rows), 0), dtype=np.int64)
+    top_scores = np.zeros((len(rows), 0), dtype=np.float32)
+    reverse_rows, reverse_cols, reverse_scores = [], [], []
+
+    corpus_rows = max(1, max_chunk_bytes // (max(len(rows), 1) * 16))
+    for corpus_start in range(0, n_rows if k else 0, corpus_rows):
+        corpus_end = min(corpus_start + corpus_rows, n_rows)
+        block = _similarity_block(query, read_rows(np.arange(corpus_start, corpus_end)))
+
+        in_block = (rows >= corpus_start) & (rows < corpus_end)
+        block[np.flatnonzero(in_block), rows[in_block] - corpus_start] = 0.0
+
+        top, top_scores = _merge_top_k(top, top_scores, block, corpus_start, k)
+
+        # Unchanged rows for which a changed row is now a top-k neighbor
+        query_pos, corpus_pos = np.nonzero(
+            (block > threshold[corpus_start:corpus_end]) & ~changed[corpus_start:corpus_end]
+        )
+        reverse_rows.append(corpus_pos + corpus_start)
+        reverse_cols.append(rows[query_pos])
+        reverse_scores.append(block[query_pos, corpus_pos])
+
+    # Existing entries between unchanged rows
+    entry_rows = np.repeat(np.arange(index.n_rows, dtype=np.int64), old_counts)
+    keep = ~changed[entry_rows] & ~changed[index.indices]
+    forward = top_scores > 0
+
+    entry_rows = np.concatenate([entry_rows[keep], *reverse_rows, np.repeat(rows, forward.sum(axis=1))])
+    entry_cols = np.concatenate([np.asarray(index.indices[keep], dtype=np.int64), *reverse_cols, top[forward]])
+    entry_scores = np.concatenate([np.asarray(index.scores[keep]), *reverse_scores, top_scores[forward]])
+
+    # Rank entries within each row by descending score and keep the first k
+    order = np.lexsort((-entry_scores, entry_rows))
+    entry_rows, entry_cols, entry_scores = entry_rows[order], entry_cols[order], entry_scores[order]
+    row_starts = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_rows, minlength=n_rows), out=row_starts[1:])
+    keep = np.arange(len(entry_rows)) - row_starts[entry_rows] < k
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_rows[keep], minlength=n_rows), out=indptr[1:])
+    return NeighborIndex(
+        indptr,
+        entry_cols[keep].astype(np.int32),
+        entry_scores[keep].astype(np.float32),
+        np.asarray(ids, dtype=np.int64)
+    )
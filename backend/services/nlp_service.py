@@ -150,33 +150,29 @@ class NLPService:
             # Prepare features for all texts
             features = [self._prepare_text_features(text) for text in texts]
             
-            # Split into batches
-            batch_size = self.config["batch_size"]
-            batches = [features[i:i + batch_size] for i in range(0, len(features), batch_size)]
+            # Predict all batches concurrently, in text order; retried batches are logged and a failed one raises
+            predictions, _ = await self.ai_service.predict_batches(
+                self.sentiment_endpoint_id,
+                features,
+                batch_size=self.config["batch_size"]
+            )
             
-            # Process each batch
             all_results = []
-            for batch in batches:
-                predictions = await self.ai_service.predict(
-                    self.sentiment_endpoint_id,
-                    instances=batch
-                )
+            for prediction in predictions:
+                if prediction["confidence"] < self.config["sentiment_threshold"]:
+                    logging.warning(f"Low confidence sentiment prediction: {prediction['confidence']}")
                 
-                for prediction in predictions:
-                    if prediction["confidence"] < self.config["sentiment_threshold"]:
-                        logging.warning(f"Low confidence sentiment prediction: {prediction['confidence']}")
-                    
-                    result = {
-                        "sentiment": prediction["sentiment"],
-                        "confidence": prediction["confidence"],
-                        "scores": {
-                            "positive": prediction["positive_score"],
-                            "neutral": prediction["neutral_score"],
-                            "negative": prediction["negative_score"]
-                        },
-                        "timestamp": datetime.utcnow()
-                    }
-                    all_results.append(result)
+                result = {
+                    "sentiment": prediction["sentiment"],
+                    "confidence": prediction["confidence"],
+                    "scores": {
+                        "positive": prediction["positive_score"],
+                        "neutral": prediction["neutral_score"],
+                        "negative": prediction["negative_score"]
+                    },
+                    "timestamp": datetime.utcnow()
+                }
+                all_results.append(result)
             
             return all_results
             
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .model_registry import model_registry
+from .recommendation_service import RecommendationService, load_recommendation_artifact
+from ..database import SessionLocal
+from ..models.lead import Lead
+from ..models.recommendation_list import RecommendationList, RecommendationMaterialization
+from ..config.ai_config import MODEL_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationListService:
+    """Recommendation lists of every lead, precomputed per model version and read by lead id.
+
+    A lead's stored list is served whichever version it was computed with,
+    so after an activation the previous version's lists keep being served
+    until the refresh replaces them. Leads created after the last
+    materialization have no list and fall back to live computation. A
+    deleted lead's own list goes with it, but it stays in other leads'
+    lists until the next materialization. After a fold-in only the lists of
+    the leads it affected are recomputed; the others carry over from the
+    version it was built from.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.config = MODEL_PARAMETERS["recommendation"]["precomputed"]
+
+    def _active_version(self) -> Optional[int]:
+        version, _ = model_registry.get_active(self.db, "recommendation", loader=load_recommendation_artifact)
+        return version
+
+    def get(
+        self,
+        lead_id: int,
+        n_recommendations: int
+    ) -> Optional[Tuple[List[Dict[str, Any]], datetime, int]]:
+        """Stored (recommendations, computed_at, model_version) of a lead, or None if it must be computed live.
+
+        An empty stored list is returned as such: the lead has nothing to recommend.
+        """
+        if n_recommendations > self.config["list_size"]:
+            return None
+
+        stored = self.db.query(RecommendationList).filter(RecommendationList.lead_id == lead_id).first()
+        if stored is None:
+            return None
+        return stored.recommendations[:n_recommendations], stored.computed_at, stored.model_version
+
+    def delete(self, lead_id: int):
+        """Drop the stored list of a lead. The caller commits."""
+        self.db.query(RecommendationList).filter(
+            RecommendationList.lead_id == lead_id
+        ).delete(synchronize_session=False)
+
+    def latest_run(self) -> Optional[RecommendationMaterialization]:
+        return (
+            self.db.query(RecommendationMaterialization)
+            .order_by(RecommendationMaterialization.started_at.desc())
+            .first()
+        )
+
+    def _is_dead(self, run: RecommendationMaterialization) -> bool:
+        stale_before = datetime.utcnow() - timedelta(seconds=self.config["stale_run_seconds"])
+        return run.status == "running" and run.started_at < stale_before
+
+    def needs_refresh(self, model_version: int) -> bool:
+        """Whether the lists were last materialized for another version.
+
+        A failed run for the active version is not retried automatically;
+        ``refresh(force=True)`` retries it.
+        """
+        latest = self.latest_run()
+        return latest is None or latest.model_version != model_version or self._is_dead(latest)
+
+    def claim(self, model_version: int) -> Optional[RecommendationMaterialization]:
+        """Start a materialization of ``model_version`` unless another process is running one."""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.config["stale_run_seconds"])
+        restart = {
+            "status": "running",
+            "list_size": self.config["list_size"],
+            "n_leads": 0,
+            "max_lead_id": None,
+            "error": None,
+            "started_at": now,
+            "finished_at": None
+        }
+        # Conditional update so two processes cannot both restart a previous run
+        claimed = (
+            self.db.query(RecommendationMaterialization)
+            .filter(
+                RecommendationMaterialization.model_version == model_version,
+                or_(
+                    RecommendationMaterialization.status != "running",
+                    RecommendationMaterialization.started_at < stale_before
+                )
+            )
+            .update(restart, synchronize_session=False)
+        )
+        if not claimed:
+            try:
+                with self.db.begin_nested():
+                    self.db.add(RecommendationMaterialization(model_version=model_version, **restart))
+            except IntegrityError:
+                # A run for this version is in progress elsewhere
+                self.db.rollback()
+                return None
+
+        self.db.commit()
+        return (
+            self.db.query(RecommendationMaterialization)
+            .filter(RecommendationMaterialization.model_version == model_version)
+            .first()
+        )
+
+    def _write_lists(
+        self,
+        recommendation_service: RecommendationService,
+        run: RecommendationMaterialization,
+        lead_ids: List[int]
+    ):
+        """Replace the lists of a chunk of leads in one transaction."""
+        computed_at = datetime.utcnow()
+        lists = [
+            {
+                "lead_id": result["lead_id"],
+                "model_version": run.model_version,
+                "recommendations": result["recommendations"],
+                "computed_at": computed_at
+            }
+            for result in recommendation_service.iter_batch_recommendations(
+                lead_ids,
+                n_recommendations=run.list_size,
+                explain=True,
+                chunk_size=len(lead_ids)
+            )
+        ]
+        self.db.query(RecommendationList).filter(
+            RecommendationList.lead_id.in_(lead_ids)
+        ).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(RecommendationList, lists)
+        run.n_leads += len(lists)
+        self.db.commit()
+
+    def _write_all(self, recommendation_service: RecommendationService, run: RecommendationMaterialization):
+        run.max_lead_id = self.db.query(func.max(Lead.id)).scalar() or 0
+        self.db.commit()
+
+        last_id = 0
+        while True:
+            lead_ids = [
+                lead_id for lead_id, in (
+                    self.db.query(Lead.id)
+                    .filter(Lead.id > last_id, Lead.id <= run.max_lead_id)
+                    .order_by(Lead.id)
+                    .limit(self.config["chunk_size"])
+                )
+            ]
+            if not lead_ids:
+                break
+            self._write_lists(recommendation_service, run, lead_ids)
+            last_id = lead_ids[-1]
+
+    def _write_affected(
+        self,
+        recommendation_service: RecommendationService,
+        run: RecommendationMaterialization,
+        previous: RecommendationMaterialization
+    ):
+        """Rewrite the lists of the leads a fold-in affected, then carry the other lists over to the run's version."""
+        affected_ids = sorted(int(lead_id) for lead_id in recommendation_service.affected_ids)
+        run.max_lead_id = max([previous.max_lead_id or 0] + affected_ids[-1:])
+        self.db.commit()
+
+        chunk_size = self.config["chunk_size"]
+        for start in range(0, len(affected_ids), chunk_size):
+            chunk = affected_ids[start:start + chunk_size]
+            lead_ids = [lead_id for lead_id, in self.db.query(Lead.id).filter(Lead.id.in_(chunk)).order_by(Lead.id)]
+            if lead_ids:
+                self._write_lists(recommendation_service, run, lead_ids)
+
+        self.db.query(RecommendationList).filter(
+            RecommendationList.model_version == previous.model_version
+        ).update({RecommendationList.model_version: run.model_version}, synchronize_session=False)
+        run.n_leads = (
+            self.db.query(func.count(RecommendationList.lead_id))
+            .filter(RecommendationList.model_version == run.model_version)
+            .scalar()
+        )
+        self.db.commit()
+
+    def materialize(
+        self,
+        run: RecommendationMaterialization,
+        previous: Optional[RecommendationMaterialization] = None
+    ) -> RecommendationMaterialization:
+        """Write the lists of all leads that exist now for the run's model version.
+
+        Each chunk of leads is answered from one slice of the neighbor index and
+        replaced in its own transaction, so lists of the previous version keep
+        being replaced lead by lead rather than disappearing at once. If the
+        version is a fold-in into the version of the ``previous`` succeeded
+        run, only the lists of the leads it affected are recomputed.
+        """
+        recommendation_service = RecommendationService(self.db)
+        if recommendation_service.model is None or recommendation_service.model_version != run.model_version:
+            return self._finish(run, "failed", f"Model version {run.model_version} is no longer active")
+
+        incremental = (
+            previous is not None
+            and previous.status == "succeeded"
+            and recommendation_service.affected_ids is not None
+            and recommendation_service.base_version == previous.model_version
+        )
+        start = time.perf_counter()
+        try:
+            if incremental:
+                self._write_affected(recommendation_service, run, previous)
+            else:
+                self._write_all(recommendation_service, run)
+
+            # Lists of leads deleted since they were written; newer runs write after our start
+            self.db.query(RecommendationList).filter(
+                RecommendationList.model_version != run.model_version,
+                RecommendationList.computed_at < run.started_at
+            ).delete(synchronize_session=False)
+        except Exception as e:
+            self.db.rollback()
+            self._finish(run, "failed", str(e))
+            raise
+
+        logger.info(
+            f"Materialized recommendation lists of {run.n_leads} leads for model "
+            f"v{run.model_version} in {time.perf_counter() - start:.1f}s"
+            + (f" ({len(recommendation_service.affected_ids)} recomputed)" if incremental else "")
+        )
+        return self._finish(run, "succeeded", None)
+
+    def _finish(
+        self,
+        run: RecommendationMaterialization,
+        status: str,
+        error: Optional[str]
+    ) -> RecommendationMaterialization:
+        run.status = status
+        run.error = error
+        run.finished_at = datetime.utcnow()
+        self.db.commit()
+        return run
+
+    def refresh(self, force: bool = False) -> Optional[RecommendationMaterialization]:
+        """Materialize the lists of the active model version if they are out of date.
+
+        Returns the finished run, or None if there is no active model, the lists
+        are current or another process is already materializing them.
+        """
+        model_version = self._active_version()
+        if model_version is None:
+            return None
+        if not force and not self.needs_refresh(model_version):
+            return None
+
+        previous = self.latest_run()
+        run = self.claim(model_version)
+        if run is None:
+            return None
+        return self.materialize(run, previous=previous if previous is not run else None)
+
+    def status(self) -> Dict[str, Any]:
+        """Freshness of the stored lists relative to the active model version."""
+        model_version = self._active_version()
+        latest = self.latest_run()
+        return {
+            "active_model_version": model_version,
+            "fresh": bool(
+                latest is not None
+                and latest.model_version == model_version
+                and latest.status == "succeeded"
+            ),
+            "latest_run": None if latest is None else {
+                "model_version": latest.model_version,
+                "status": latest.status,
+                "list_size": latest.list_size,
+                "n_leads": latest.n_leads,
+                "max_lead_id": latest.max_lead_id,
+                "error": latest.error,
+                "started_at": latest.started_at,
+                "finished_at": latest.finished_at
+            }
+        }
+
+
+class RecommendationListRefresher:
+    """Background loop that materializes recommendation lists after each model activation.
+
+    Activations made in any process are noticed through the model registry
+    within its ``recheck_interval``; only one process materializes a version.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or MODEL_PARAMETERS["recommendation"]["precomputed"]
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "runs_total": 0,
+            "errors_total": 0,
+            "last_model_version": None,
+            "last_leads": 0,
+            "last_run_seconds": None,
+            "last_run_at": None
+        }
+
+    def _refresh(self) -> Optional[RecommendationMaterialization]:
+        db = SessionLocal()
+        try:
+            run = RecommendationListService(db).refresh()
+            if run is not None:
+                # Read the attributes before the session closes
+                self.metrics["last_model_version"] = run.model_version
+                self.metrics["last_leads"] = run.n_leads
+            return run
+        finally:
+            db.close()
+
+    async def run_once(self):
+        """Materialize the lists of the active model version if they are out of date."""
+        start = time.perf_counter()
+        run = await asyncio.to_thread(self._refresh)
+        if run is None:
+            return
+
+        self.metrics["runs_total"] += 1
+        self.metrics["last_run_seconds"] = time.perf_counter() - start
+        self.metrics["last_run_at"] = datetime.utcnow()
+
+    async def run(self):
+        """Run the refresh loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.metrics["errors_total"] += 1
+                logger.error(f"Error in recommendation list refresh loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the refresh loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+
+recommendation_list_refresher = RecommendationListRefresher()
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .recommendation_service import RecommendationService
+from .training_job_service import TrainingJobService
+from ..database import SessionLocal
+from ..models.ai_model import AIModel
+from ..config.ai_config import MODEL_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationMaintenanceScheduler:
+    """Background loop that queues fold-in and compaction jobs of the streaming-trained recommendation model.
+
+    Leads queued for an update are folded in as one job once
+    ``fold_in_batch_size`` of them are waiting or the oldest has waited
+    ``fold_in_interval`` seconds. A model with folded-in leads is compacted
+    once ``compaction_interval`` seconds have passed since its last full
+    rebuild. Only one recommendation job is queued at a time.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or MODEL_PARAMETERS["recommendation"]["maintenance"]
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "runs_total": 0,
+            "errors_total": 0,
+            "fold_ins_queued": 0,
+            "compactions_queued": 0,
+            "backlog": 0,
+            "oldest_queued_at": None,
+            "last_run_seconds": None,
+            "last_run_at": None
+        }
+
+    def _active_metrics(self, db: Session) -> Optional[Dict[str, Any]]:
+        """Metrics of the active recommendation model, if it was trained in streaming mode."""
+        model = (
+            db.query(AIModel)
+            .filter(AIModel.name == "recommendation", AIModel.is_active.is_(True))
+            .first()
+        )
+        if model is None or model.model_type != "content_based_hashed" or not model.metrics:
+            return None
+        return json.loads(model.metrics)
+
+    def _compaction_due(self, metrics: Dict[str, Any], now: datetime) -> bool:
+        if not metrics.get("updates_since_compaction"):
+            return False
+        compacted_at = metrics.get("compacted_at")
+        if compacted_at is None:
+            return True
+        return datetime.fromisoformat(compacted_at) <= now - timedelta(seconds=self.config["compaction_interval"])
+
+    def _fold_in_due(self, backlog: int, oldest: Optional[datetime], now: datetime) -> bool:
+        if not backlog:
+            return False
+        if backlog >= self.config["fold_in_batch_size"]:
+            return True
+        return oldest <= now - timedelta(seconds=self.config["fold_in_interval"])
+
+    def _schedule(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return self.schedule(db)
+        finally:
+            db.close()
+
+    def schedule(self, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Queue a compaction or fold-in job if one is due and no recommendation job is pending."""
+        now = now or datetime.utcnow()
+        backlog, oldest = RecommendationService(db).update_backlog()
+        result = {"backlog": backlog, "oldest_queued_at": oldest, "job": None}
+
+        metrics = self._active_metrics(db)
+        if metrics is None:
+            return result
+
+        jobs = TrainingJobService(db)
+        # Compaction first: folding more leads into a model due for a rebuild only adds to its drift
+        if self._compaction_due(metrics, now):
+            if jobs.submit_if_idle("recommendation", {"mode": "compact"}):
+                result["job"] = "compact"
+        elif self._fold_in_due(backlog, oldest, now):
+            if jobs.submit_if_idle("recommendation", {"mode": "update"}):
+                result["job"] = "update"
+        return result
+
+    async def run_once(self):
+        """Queue the recommendation maintenance job that is due, if any."""
+        start = time.perf_counter()
+        result = await asyncio.to_thread(self._schedule)
+
+        self.metrics["runs_total"] += 1
+        if result["job"] == "compact":
+            self.metrics["compactions_queued"] += 1
+        elif result["job"] == "update":
+            self.metrics["fold_ins_queued"] += 1
+        self.metrics["backlog"] = result["backlog"]
+        self.metrics["oldest_queued_at"] = result["oldest_queued_at"]
+        self.metrics["last_run_seconds"] = time.perf_counter() - start
+        self.metrics["last_run_at"] = datetime.utcnow()
+
+    async def run(self):
+        """Run the maintenance loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.metrics["errors_total"] += 1
+                logger.error(f"Error in recommendation maintenance loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the maintenance loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+
+recommendation_maintenance_scheduler = RecommendationMaintenanceScheduler()
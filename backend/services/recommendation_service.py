@@ -1,67 +1,167 @@
 import numpy as np
-from typing import List, Dict, Any, Optional
+from collections import defaultdict
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Set, Tuple
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import joblib
 import json
+import logging
 import os
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from .hashed_terms import (
+    HashedTermRows, document_frequencies, profile_hashing_vectorizer, smooth_idf
+)
+from .lead_facet_service import LeadFacetService
+from .model_artifacts import ArtifactWriter, new_artifact_path, save_artifact, load_artifact, is_artifact_dir
+from .model_registry import model_registry
+from .neighbor_index import NeighborIndex, build_neighbor_index, fold_in_neighbors, iter_neighbor_blocks
 from ..models.lead import Lead
 from ..models.event import Event
 from ..models.ai_model import AIModel
+from ..models.recommendation_update_queue import RecommendationUpdateQueue
+from ..config.ai_config import MODEL_PARAMETERS
+
+def load_recommendation_artifact(path: str) -> Dict[str, Any]:
+    """Open a recommendation artifact; index, vocabulary and idf arrays are memory-mapped."""
+    if not is_artifact_dir(path):
+        return joblib.load(path)
+        
+    arrays, objects = load_artifact(path)
+    if objects.get('term_space') == 'hashed':
+        # Streaming-trained model; term counts and IDF are only read when updating it
+        return {
+            'neighbor_index': NeighborIndex.from_arrays(arrays),
+            'term_space': 'hashed',
+            'base_version': objects.get('base_version'),
+            'affected_ids': arrays.get('affected_ids')
+        }
+        
+    return {
+        'neighbor_index': NeighborIndex.from_arrays(arrays),
+        'vocabulary': arrays['vocabulary'],
+        'idf': arrays['idf'],
+        'vectorizer_params': objects['vectorizer_params']
+    }
 
 class RecommendationService:
     def __init__(self, db: Session):
         self.db = db
         self.model = None
         self.vectorizer = None
+        self.model_version = None
+        # Set on fold-ins: the version they were built from and the leads whose neighbors may differ
+        self.base_version = None
+        self.affected_ids = None
+        self.config = MODEL_PARAMETERS["recommendation"]
         self._load_active_model()
 
     def _load_active_model(self):
-        """Load the active recommendation model from storage."""
-        active_model = (
-            self.db.query(AIModel)
-            .filter(AIModel.name == "recommendation", AIModel.is_active == True)
-            .first()
+        """Load the active recommendation model from the shared model registry."""
+        self.model_version, model_data = model_registry.get_active(
+            self.db,
+            "recommendation",
+            loader=load_recommendation_artifact
         )
         
-        if active_model and os.path.exists(active_model.filepath):
-            model_data = joblib.load(active_model.filepath)
-            self.vectorizer = model_data['vectorizer']
-            self.model = model_data['similarity_matrix']
+        if model_data:
+            self.vectorizer = model_data.get('vectorizer')
+            self.model = model_data.get('neighbor_index')
+            self.base_version = model_data.get('base_version')
+            self.affected_ids = model_data.get('affected_ids')
+            if self.model is None:
+                logging.warning(
+                    f"Recommendation model v{self.model_version} has no neighbor index, retrain it"
+                )
 
-    def _create_lead_profile(self, lead: Lead) -> str:
-        """Create a text profile of the lead based on their data and behavior."""
+    def _profile_text(
+        self,
+        company: Optional[str],
+        data: Optional[Dict[str, Any]],
+        events: List[Tuple[str, Optional[Dict[str, Any]]]]
+    ) -> str:
+        """Profile text from lead fields and (event_type, properties) pairs."""
         profile_parts = []
         
         # Add basic lead information
-        if lead.company:
-            profile_parts.append(f"company:{lead.company}")
-        if lead.data.get('company', {}).get('industry'):
-            profile_parts.append(f"industry:{lead.data['company']['industry']}")
+        if company:
+            profile_parts.append(f"company:{company}")
+        if (data or {}).get('company', {}).get('industry'):
+            profile_parts.append(f"industry:{data['company']['industry']}")
             
         # Add events
+        for event_type, properties in events:
+            profile_parts.append(f"event:{event_type}")
+            if (properties or {}).get('interests'):
+                profile_parts.extend([f"interest:{i}" for i in properties['interests']])
+                
+        return " ".join(profile_parts)
+
+    def _create_lead_profile(self, lead: Lead) -> str:
+        """Create a text profile of the lead based on their data and behavior."""
         events = (
             self.db.query(Event)
             .filter(Event.lead_id == lead.id)
             .all()
         )
-        
-        for event in events:
-            profile_parts.append(f"event:{event.event_type}")
-            if event.properties.get('interests'):
-                profile_parts.extend([f"interest:{i}" for i in event.properties['interests']])
-                
-        return " ".join(profile_parts)
+        return self._profile_text(
+            lead.company,
+            lead.data,
+            [(event.event_type, event.properties) for event in events]
+        )
+
+    def _create_lead_profiles(self, leads: List[Tuple[int, Optional[str], Optional[Dict[str, Any]]]]) -> List[str]:
+        """Profiles of (id, company, data) lead rows with one events query."""
+        events = defaultdict(list)
+        for lead_id, event_type, properties in (
+            self.db.query(Event.lead_id, Event.event_type, Event.properties)
+            .filter(Event.lead_id.in_([lead[0] for lead in leads]))
+            .order_by(Event.id)
+        ):
+            events[lead_id].append((event_type, properties))
+            
+        return [self._profile_text(company, data, events.get(lead_id, [])) for lead_id, company, data in leads]
+
+    def _iter_lead_rows(self, chunk_size: int) -> Iterator[List[Tuple[int, Optional[str], Optional[Dict[str, Any]]]]]:
+        """All leads as (id, company, data) rows in id order, one chunk at a time."""
+        # Plain column rows are not kept in the session's identity map
+        last_id = None
+        while True:
+            query = self.db.query(Lead.id, Lead.company, Lead.data).order_by(Lead.id)
+            if last_id is not None:
+                query = query.filter(Lead.id > last_id)
+            chunk = query.limit(chunk_size).all()
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
 
-    def train_model(self, leads: List[Lead]) -> Dict[str, float]:
-        """Train a new recommendation model using content-based filtering."""
+    def train_model(
+        self,
+        leads: List[Lead],
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, float]:
+        """Train a new recommendation model using content-based filtering.
+        
+        ``progress(stage, fraction)`` is called as each stage starts and may raise
+        to abort training before the model is activated; ``before_activate`` is
+        passed to ``model_registry.activate``.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        
+        # Index rows in lead id order so id lookups need no extra arrays
+        leads = sorted(leads, key=lambda lead: lead.id)
+        
         # Create lead profiles
+        progress('profiles', 0.0)
         lead_profiles = [self._create_lead_profile(lead) for lead in leads]
         
         # Initialize and fit vectorizer
+        progress('vectorize', 0.4)
         self.vectorizer = TfidfVectorizer(
             analyzer='word',
             token_pattern=r'[^:]+:[^:\s]+',
@@ -71,82 +171,540 @@ class RecommendationService:
         # Create TF-IDF matrix
         tfidf_matrix = self.vectorizer.fit_transform(lead_profiles)
         
-        # Calculate similarity matrix
-        self.model = cosine_similarity(tfidf_matrix)
+        # Keep only the top-k most similar leads per lead
+        progress('index', 0.5)
+        self.model = build_neighbor_index(
+            tfidf_matrix,
+            ids=np.array([lead.id for lead in leads], dtype=np.int64),
+            k=self.config["index_neighbors"],
+            chunk_rows=self.config["index_chunk_rows"],
+            max_chunk_bytes=self.config["index_max_chunk_bytes"]
+        )
         
         # Save model
-        model_path = f"models/recommendation_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.joblib"
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        progress('persist', 0.9)
+        model_path = new_artifact_path("recommendation")
         
-        model_data = {
-            'vectorizer': self.vectorizer,
-            'similarity_matrix': self.model
-        }
-        joblib.dump(model_data, model_path)
+        arrays = self.model.to_arrays()
+        arrays['vocabulary'] = self.vectorizer.get_feature_names_out().astype(str)
+        arrays['idf'] = self.vectorizer.idf_
+        save_artifact(model_path, arrays, {'vectorizer_params': self.vectorizer.get_params()})
         
         # Create model record
         new_model = AIModel(
             name="recommendation",
             version=self._get_next_version(),
-            description="Content-based recommendation model using TF-IDF and cosine similarity",
+            description="Content-based recommendation model using TF-IDF and top-k cosine neighbors",
             model_type="content_based",
             filepath=model_path,
-            is_active=True,
             parameters=json.dumps({
                 "vectorizer_params": self.vectorizer.get_params(),
+                "index_neighbors": self.config["index_neighbors"],
                 "n_features": len(self.vectorizer.get_feature_names_out())
-            }),
+            }, default=str),  # vectorizer params include the dtype class
             metrics=json.dumps(self._calculate_metrics())
         )
         
-        # Deactivate other models
-        self.db.query(AIModel).filter(
-            AIModel.name == "recommendation",
-            AIModel.is_active == True
-        ).update({"is_active": False})
-        
-        # Save new model
-        self.db.add(new_model)
-        self.db.commit()
+        # Save new model and deactivate other versions in one transaction
+        model_registry.activate(self.db, new_model, before_commit=before_activate)
+        model_registry.prune_artifacts(self.db, "recommendation", self.config["maintenance"]["keep_artifacts"])
         
         return self._calculate_metrics()
 
+    def _append_term_rows(self, writer: ArtifactWriter, counts: sparse.csr_matrix, ids, nnz: int) -> int:
+        """Spool a block of term count rows and their lead ids; returns the new entry count."""
+        writer.append("term_indptr", nnz + counts.indptr[1:].astype(np.int64))
+        writer.append("term_indices", counts.indices.astype(np.int32))
+        writer.append("term_counts", counts.data.astype(np.float32))
+        writer.append("ids", np.asarray(ids, dtype=np.int64))
+        return nnz + counts.nnz
+
+    def _finish_term_rows(self, writer: ArtifactWriter, n_features: int) -> Tuple[HashedTermRows, np.ndarray]:
+        """Finish the spooled term arrays and reopen them memory-mapped."""
+        arrays = {name: writer.finish(name) for name in ("term_indptr", "term_indices", "term_counts")}
+        return HashedTermRows.from_arrays(arrays, n_features), writer.finish("ids")
+
+    def _write_neighbor_blocks(
+        self,
+        writer: ArtifactWriter,
+        terms: HashedTermRows,
+        progress: Callable[[str, float], None],
+        start_fraction: float,
+        end_fraction: float
+    ):
+        """Build the neighbor index of all term rows block by block into the artifact."""
+        writer.append("indptr", np.zeros(1, dtype=np.int64))
+        nnz = 0
+        done = 0
+        for counts, indices, scores in iter_neighbor_blocks(
+            terms.weighted,
+            terms.n_rows,
+            k=self.config["index_neighbors"],
+            query_rows=self.config["index_chunk_rows"],
+            max_chunk_bytes=self.config["index_max_chunk_bytes"]
+        ):
+            writer.append("indptr", nnz + np.cumsum(counts))
+            writer.append("indices", indices)
+            writer.append("scores", scores)
+            nnz += int(counts.sum())
+            done += len(counts)
+            progress('index', start_fraction + (end_fraction - start_fraction) * done / terms.n_rows)
+
+    def _save_hashed_model(
+        self,
+        writer: ArtifactWriter,
+        terms: HashedTermRows,
+        df: np.ndarray,
+        n_docs: int,
+        updates_since_compaction: int,
+        compacted_at: datetime,
+        description: str,
+        before_activate: Optional[Callable[[Session, AIModel], None]],
+        base_version: Optional[int] = None
+    ) -> Dict[str, float]:
+        """Close a hashed-term artifact, record it as a new version, activate it and prune old artifacts.
+        
+        ``base_version`` is the version a fold-in was built from; its artifact
+        then lists the leads whose neighbor lists may have changed.
+        """
+        min_df = self.config["min_df"]
+        writer.add("df", df)
+        writer.add("idf", terms.idf)
+        writer.close({
+            "term_space": "hashed",
+            "n_features": terms.n_features,
+            "n_docs": n_docs,
+            "min_df": min_df,
+            "updates_since_compaction": updates_since_compaction,
+            "compacted_at": compacted_at,
+            "base_version": base_version
+        })
+        
+        self.vectorizer = None
+        self.model = load_recommendation_artifact(writer.path)['neighbor_index']
+        metrics = {
+            **self._index_metrics(int(np.count_nonzero(df >= min_df))),
+            "n_docs": n_docs,
+            "updates_since_compaction": updates_since_compaction,
+            "compacted_at": compacted_at.isoformat()
+        }
+        
+        new_model = AIModel(
+            name="recommendation",
+            version=self._get_next_version(),
+            description=description,
+            model_type="content_based_hashed",
+            filepath=writer.path,
+            parameters=json.dumps({
+                "hash_features": terms.n_features,
+                "min_df": min_df,
+                "index_neighbors": self.config["index_neighbors"]
+            }),
+            metrics=json.dumps(metrics)
+        )
+        model_registry.activate(self.db, new_model, before_commit=before_activate)
+        model_registry.prune_artifacts(self.db, "recommendation", self.config["maintenance"]["keep_artifacts"])
+        
+        return metrics
+
+    def _active_hashed_artifact(self) -> Tuple[AIModel, Dict[str, np.ndarray], Dict[str, Any]]:
+        """Row, arrays and objects of the active model, which must be streaming-trained."""
+        active_model = (
+            self.db.query(AIModel)
+            .filter(AIModel.name == "recommendation", AIModel.is_active.is_(True))
+            .first()
+        )
+        if not active_model or not active_model.filepath or not os.path.exists(active_model.filepath):
+            raise ValueError("No active recommendation model found")
+            
+        arrays, objects = load_artifact(active_model.filepath) if is_artifact_dir(active_model.filepath) else ({}, {})
+        if objects.get('term_space') != 'hashed':
+            raise ValueError("Active recommendation model was not trained in streaming mode")
+        return active_model, arrays, objects
+
+    def train_model_streaming(
+        self,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, float]:
+        """Train a recommendation model over all leads in a hashed term space.
+        
+        Lead profiles are read and hashed one chunk at a time and their term
+        counts spooled into the artifact while document frequencies are counted;
+        the neighbor index is then built from the spooled counts block by block.
+        Memory is bounded by the chunk and block sizes, not the number of leads.
+        The artifact keeps term counts and document frequencies so later leads
+        can be folded in with update_leads.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        chunk_size = chunk_size or self.config["training_chunk_size"]
+        n_features = self.config["hash_features"]
+        vectorizer = profile_hashing_vectorizer(n_features)
+        
+        total = self.db.query(func.count(Lead.id)).scalar()
+        if not total:
+            raise ValueError("No leads available for training")
+            
+        writer = ArtifactWriter(new_artifact_path("recommendation"))
+        writer.append("term_indptr", np.zeros(1, dtype=np.int64))
+        df = np.zeros(n_features, dtype=np.int64)
+        nnz = 0
+        n_docs = 0
+        
+        for leads in self._iter_lead_rows(chunk_size):
+            progress('profiles', 0.5 * min(n_docs / total, 1.0))
+            counts = vectorizer.transform(self._create_lead_profiles(leads))
+            df += document_frequencies(counts, n_features)
+            nnz = self._append_term_rows(writer, counts, [lead[0] for lead in leads], nnz)
+            n_docs += len(leads)
+            
+        terms, _ = self._finish_term_rows(writer, n_features)
+        terms.idf = smooth_idf(df, n_docs, self.config["min_df"])
+        self._write_neighbor_blocks(writer, terms, progress, 0.5, 0.9)
+        
+        progress('persist', 0.9)
+        return self._save_hashed_model(
+            writer, terms, df, n_docs, 0, datetime.utcnow(),
+            "Content-based recommendation model using hashed TF-IDF and top-k cosine neighbors",
+            before_activate
+        )
+
+    def update_leads(
+        self,
+        lead_ids: List[int],
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, float]:
+        """Fold new or changed leads into the active streaming-trained model.
+        
+        Their profiles are re-hashed, the term counts and document frequencies
+        updated and only their neighbor lists recomputed (see fold_in_neighbors).
+        IDF weights stay as they were until the next compact_model. The new
+        artifact records the leads whose neighbor lists may have changed, so
+        their precomputed recommendation lists alone are rewritten.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        progress('load', 0.0)
+        active_model, arrays, objects = self._active_hashed_artifact()
+        n_features = objects["n_features"]
+        chunk_size = self.config["training_chunk_size"]
+        old_terms = HashedTermRows.from_arrays(arrays, n_features)
+        index = NeighborIndex.from_arrays(arrays)
+        
+        lead_ids = sorted(set(lead_ids))
+        leads = [
+            row
+            for start in range(0, len(lead_ids), chunk_size)
+            for row in (
+                self.db.query(Lead.id, Lead.company, Lead.data)
+                .filter(Lead.id.in_(lead_ids[start:start + chunk_size]))
+                .order_by(Lead.id)
+            )
+        ]
+        if not leads:
+            raise ValueError("None of the leads exist")
+            
+        progress('profiles', 0.1)
+        counts = profile_hashing_vectorizer(n_features).transform(self._create_lead_profiles(leads))
+        rows = [index.row_of(lead[0]) for lead in leads]
+        # Index row -> position in counts, and positions of leads not yet indexed
+        replaced = {row: i for i, row in enumerate(rows) if row is not None}
+        added = [i for i, row in enumerate(rows) if row is None]
+        
+        df = np.array(arrays["df"], dtype=np.int64)
+        if replaced:
+            df -= document_frequencies(old_terms.raw(np.fromiter(replaced, dtype=np.int64)), n_features)
+        df += document_frequencies(counts, n_features)
+        n_docs = objects["n_docs"] + len(added)
+        
+        # Copy the term rows block by block, swapping in the changed rows
+        progress('rewrite', 0.2)
+        writer = ArtifactWriter(new_artifact_path("recommendation"))
+        writer.append("term_indptr", np.zeros(1, dtype=np.int64))
+        nnz = 0
+        for start in range(0, old_terms.n_rows, chunk_size):
+            end = min(start + chunk_size, old_terms.n_rows)
+            block = old_terms.raw(np.arange(start, end))
+            swaps = [(row - start, i) for row, i in replaced.items() if start <= row < end]
+            if swaps:
+                positions, sources = zip(*swaps)
+                order = np.arange(end - start)
+                order[list(positions)] = (end - start) + np.arange(len(swaps))
+                block = sparse.vstack([block, counts[list(sources)]], format='csr')[order]
+            nnz = self._append_term_rows(writer, block, arrays["ids"][start:end], nnz)
+        if added:
+            nnz = self._append_term_rows(writer, counts[added], [leads[i][0] for i in added], nnz)
+            
+        terms, ids = self._finish_term_rows(writer, n_features)
+        terms.idf = np.asarray(arrays["idf"])
+        
+        progress('index', 0.5)
+        changed_rows = np.concatenate([
+            np.fromiter(replaced, dtype=np.int64),
+            np.arange(old_terms.n_rows, terms.n_rows, dtype=np.int64)
+        ])
+        self.model = fold_in_neighbors(
+            index,
+            terms.weighted,
+            terms.n_rows,
+            changed_rows,
+            ids,
+            k=self.config["index_neighbors"],
+            max_chunk_bytes=self.config["index_max_chunk_bytes"]
+        )
+        for name in ("indptr", "indices", "scores"):
+            writer.add(name, getattr(self.model, name))
+            
+        # Changed rows, and rows that listed a changed row before or list one now
+        affected = np.zeros(terms.n_rows, dtype=bool)
+        affected[changed_rows] = True
+        changed = affected.copy()
+        for neighbor_index in (index, self.model):
+            positions = np.flatnonzero(changed[neighbor_index.indices])
+            affected[np.searchsorted(neighbor_index.indptr, positions, side="right") - 1] = True
+        writer.add("affected_ids", ids[affected])
+            
+        progress('persist', 0.9)
+        return self._save_hashed_model(
+            writer, terms, df, n_docs,
+            objects.get("updates_since_compaction", 0) + len(leads),
+            objects.get("compacted_at") or datetime.utcnow(),
+            f"Hashed TF-IDF recommendation model with {len(leads)} leads folded in",
+            before_activate,
+            base_version=active_model.version
+        )
+
+    def queue_updates(self, lead_ids: List[int], at: Optional[datetime] = None) -> int:
+        """Queue existing leads for the next batched fold-in. The caller commits.
+        
+        Returns the number of leads queued.
+        """
+        at = at or datetime.utcnow()
+        existing = sorted(self._existing_ids(lead_ids))
+        for lead_id in existing:
+            updated = (
+                self.db.query(RecommendationUpdateQueue)
+                .filter(RecommendationUpdateQueue.lead_id == lead_id)
+                .update({RecommendationUpdateQueue.last_queued_at: at}, synchronize_session=False)
+            )
+            if updated:
+                continue
+            try:
+                with self.db.begin_nested():
+                    self.db.add(RecommendationUpdateQueue(lead_id=lead_id, first_queued_at=at, last_queued_at=at))
+            except IntegrityError:
+                # Another writer queued the lead first
+                pass
+                
+        return len(existing)
+
+    def _existing_ids(self, lead_ids: Iterable[int]) -> Set[int]:
+        """Those of the lead ids that still exist, looked up ``batch_chunk_size`` ids per query."""
+        lead_ids = sorted(set(lead_ids))
+        chunk_size = self.config["batch_chunk_size"]
+        return {
+            lead_id
+            for start in range(0, len(lead_ids), chunk_size)
+            for lead_id, in self.db.query(Lead.id).filter(Lead.id.in_(lead_ids[start:start + chunk_size]))
+        }
+
+    def update_backlog(self) -> Tuple[int, Optional[datetime]]:
+        """Number of queued leads and when the oldest of them was first queued."""
+        size, oldest = self.db.query(
+            func.count(RecommendationUpdateQueue.lead_id),
+            func.min(RecommendationUpdateQueue.first_queued_at)
+        ).one()
+        return size, oldest
+
+    def update_queued_leads(
+        self,
+        max_leads: Optional[int] = None,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, float]:
+        """Fold the longest-waiting queued leads into the active model in one update_leads run.
+        
+        The leads leave the queue in the transaction that activates the new
+        version, except those queued again while it was being built.
+        """
+        max_leads = max_leads or self.config["maintenance"]["fold_in_batch_size"]
+        snapshot = datetime.utcnow()
+        lead_ids = [
+            lead_id for lead_id, in (
+                self.db.query(RecommendationUpdateQueue.lead_id)
+                .order_by(RecommendationUpdateQueue.first_queued_at)
+                .limit(max_leads)
+            )
+        ]
+        if not lead_ids:
+            raise ValueError("No leads are queued for a recommendation update")
+            
+        chunk_size = self.config["batch_chunk_size"]
+        
+        def dequeue(session: Session, model: AIModel):
+            for start in range(0, len(lead_ids), chunk_size):
+                session.query(RecommendationUpdateQueue).filter(
+                    RecommendationUpdateQueue.lead_id.in_(lead_ids[start:start + chunk_size]),
+                    RecommendationUpdateQueue.last_queued_at <= snapshot
+                ).delete(synchronize_session=False)
+            if before_activate is not None:
+                before_activate(session, model)
+                
+        return self.update_leads(lead_ids, progress=progress, before_activate=dequeue)
+
+    def compact_model(
+        self,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, float]:
+        """Re-normalize the active streaming-trained model.
+        
+        Drops leads deleted since they were indexed, restores id order,
+        recounts document frequencies, recomputes IDF and rebuilds every
+        neighbor list from the stored term counts. Profiles are not re-read.
+        Run by the recommendation maintenance scheduler every
+        ``compaction_interval`` after leads were folded in.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        progress('load', 0.0)
+        _, arrays, objects = self._active_hashed_artifact()
+        n_features = objects["n_features"]
+        chunk_size = self.config["training_chunk_size"]
+        old_terms = HashedTermRows.from_arrays(arrays, n_features)
+        ids = arrays["ids"]
+        
+        exists = np.zeros(len(ids), dtype=bool)
+        for start in range(0, len(ids), chunk_size):
+            block_ids = ids[start:start + chunk_size].tolist()
+            found = {lead_id for lead_id, in self.db.query(Lead.id).filter(Lead.id.in_(block_ids))}
+            exists[start:start + len(block_ids)] = [lead_id in found for lead_id in block_ids]
+        rows = np.flatnonzero(exists)
+        rows = rows[np.argsort(ids[rows], kind="stable")]
+        if not len(rows):
+            raise ValueError("No leads available for training")
+            
+        writer = ArtifactWriter(new_artifact_path("recommendation"))
+        writer.append("term_indptr", np.zeros(1, dtype=np.int64))
+        df = np.zeros(n_features, dtype=np.int64)
+        nnz = 0
+        for start in range(0, len(rows), chunk_size):
+            progress('rewrite', 0.1 + 0.3 * start / len(rows))
+            block_rows = rows[start:start + chunk_size]
+            block = old_terms.raw(block_rows)
+            df += document_frequencies(block, n_features)
+            nnz = self._append_term_rows(writer, block, ids[block_rows], nnz)
+            
+        terms, _ = self._finish_term_rows(writer, n_features)
+        terms.idf = smooth_idf(df, len(rows), self.config["min_df"])
+        self._write_neighbor_blocks(writer, terms, progress, 0.4, 0.9)
+        
+        progress('persist', 0.9)
+        return self._save_hashed_model(
+            writer, terms, df, len(rows), 0, datetime.utcnow(),
+            "Content-based recommendation model using hashed TF-IDF and top-k cosine neighbors (compacted)",
+            before_activate
+        )
+
     def get_recommendations(
         self,
         lead: Lead,
         n_recommendations: int = 5
     ) -> List[Dict[str, Any]]:
         """Get personalized recommendations for a lead."""
-        if not self.model or not self.vectorizer:
+        if self.model is None:
             return []
             
-        # Get all leads
-        all_leads = self.db.query(Lead).all()
-        lead_profiles = [self._create_lead_profile(l) for l in all_leads]
-        
-        # Get lead index
-        lead_idx = next((i for i, l in enumerate(all_leads) if l.id == lead.id), None)
+        # Look up the lead's row in the trained index
+        lead_idx = self.model.row_of(lead.id)
         if lead_idx is None:
             return []
             
-        # Get similar leads
-        similarities = self.model[lead_idx]
-        similar_indices = np.argsort(similarities)[::-1][1:n_recommendations+1]
+        # Get similar leads, already sorted by descending similarity
+        neighbor_rows, neighbor_scores = self.model.neighbors(lead_idx)
+        neighbor_ids = self.model.ids[neighbor_rows].tolist()
+        # Leads deleted after the model was trained are skipped before taking the top n; cached facets may outlive them
+        existing = self._existing_ids(neighbor_ids)
+        top = [
+            (lead_id, similarity_score)
+            for lead_id, similarity_score in zip(neighbor_ids, neighbor_scores.tolist())
+            if lead_id in existing
+        ][:n_recommendations]
+        facets = LeadFacetService(self.db).get_facets({lead.id} | {lead_id for lead_id, _ in top})
         
         recommendations = []
-        for idx in similar_indices:
-            similar_lead = all_leads[idx]
-            similarity_score = similarities[idx]
-            
+        for lead_id, similarity_score in top:
             recommendation = {
-                "lead_id": similar_lead.id,
+                "lead_id": lead_id,
                 "similarity_score": float(similarity_score),
-                "explanation": self._generate_explanation(lead, similar_lead)
+                "explanation": self._explain(facets.get(lead.id), facets[lead_id])
             }
             recommendations.append(recommendation)
             
         return recommendations
 
+    def iter_batch_recommendations(
+        self,
+        lead_ids: List[int],
+        n_recommendations: int = 5,
+        explain: bool = False,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Recommendations for many leads, yielded one lead at a time in request order.
+        
+        Each chunk of leads is answered from one row slice of the neighbor
+        index plus one query for the recommended leads (and, with ``explain``,
+        one bulk explanation lookup), so callers can stream the results
+        without holding them all. Leads that were not indexed get an empty list.
+        """
+        if self.model is None:
+            return
+            
+        chunk_size = chunk_size or self.config["batch_chunk_size"]
+        for start in range(0, len(lead_ids), chunk_size):
+            yield from self._batch_chunk(lead_ids[start:start + chunk_size], n_recommendations, explain)
+
+    def _batch_chunk(self, lead_ids: List[int], n_recommendations: int, explain: bool) -> Iterator[Dict[str, Any]]:
+        rows = [self.model.row_of(lead_id) for lead_id in lead_ids]
+        indexed = np.array([row for row in rows if row is not None], dtype=np.int64)
+        # Whole neighbor lists, so leads deleted after the model was trained can be skipped before taking the top n
+        indptr, neighbor_rows, scores = self.model.top_n(
+            indexed,
+            max(n_recommendations, self.config["index_neighbors"])
+        )
+        neighbor_ids = np.asarray(self.model.ids[neighbor_rows])
+        existing = self._existing_ids(np.unique(neighbor_ids).tolist())
+        
+        top = []
+        position = 0
+        for row in rows:
+            if row is None:
+                top.append([])
+                continue
+            start, end = indptr[position], indptr[position + 1]
+            position += 1
+            top.append([
+                (similar_id, similarity_score)
+                for similar_id, similarity_score in zip(neighbor_ids[start:end].tolist(), scores[start:end].tolist())
+                if similar_id in existing
+            ][:n_recommendations])
+            
+        facets = {}
+        if explain:
+            facets = LeadFacetService(self.db).get_facets(
+                set(lead_ids) | {similar_id for neighbors in top for similar_id, _ in neighbors}
+            )
+        
+        for lead_id, neighbors in zip(lead_ids, top):
+            recommendations = []
+            for similar_id, similarity_score in neighbors:
+                recommendation = {"lead_id": similar_id, "similarity_score": similarity_score}
+                if explain:
+                    recommendation["explanation"] = self._explain(facets.get(lead_id), facets.get(similar_id))
+                recommendations.append(recommendation)
+                
+            yield {"lead_id": lead_id, "recommendations": recommendations}
+
     def _get_next_version(self) -> int:
         """Get the next version number for recommendation models."""
         latest_model = (
@@ -159,45 +717,45 @@ class RecommendationService:
 
     def _calculate_metrics(self) -> Dict[str, float]:
         """Calculate model performance metrics."""
-        if not self.model or not self.vectorizer:
+        if self.model is None or self.vectorizer is None:
             return {}
             
+        return self._index_metrics(len(self.vectorizer.get_feature_names_out()))
+
+    def _index_metrics(self, n_features: int) -> Dict[str, float]:
+        """Size and similarity statistics of the current neighbor index."""
+        n_rows = max(self.model.n_rows, 1)
         return {
-            "n_features": len(self.vectorizer.get_feature_names_out()),
-            "sparsity": float(1.0 - np.count_nonzero(self.model) / self.model.size),
-            "avg_similarity": float(np.mean(self.model))
+            "n_features": n_features,
+            "avg_neighbors": float(self.model.nnz / n_rows),
+            "sparsity": float(1.0 - self.model.nnz / (n_rows * n_rows)),
+            "avg_neighbor_similarity": float(np.mean(self.model.scores)) if self.model.nnz else 0.0,
+            "index_bytes": int(self.model.nbytes)
         }
 
     def _generate_explanation(self, lead: Lead, similar_lead: Lead) -> str:
         """Generate a human-readable explanation for the recommendation."""
+        facets = LeadFacetService(self.db).get_facets([lead.id, similar_lead.id])
+        return self._explain(facets.get(lead.id), facets.get(similar_lead.id))
+
+    def _explain(self, lead_facets: Optional[Dict[str, Any]], similar_facets: Optional[Dict[str, Any]]) -> str:
+        """Explanation for a recommendation from the facets of both leads."""
+        if not lead_facets or not similar_facets:
+            return "Similar profile based on overall behavior"
+            
         reasons = []
         
         # Compare company data
-        if (lead.data.get('company', {}).get('industry') == 
-            similar_lead.data.get('company', {}).get('industry')):
+        if lead_facets["industry"] == similar_facets["industry"]:
             reasons.append("similar industry")
             
-        if abs(
-            lead.data.get('company', {}).get('employees', 0) -
-            similar_lead.data.get('company', {}).get('employees', 0)
-        ) < 100:
+        if lead_facets["employee_bucket"] == similar_facets["employee_bucket"]:
             reasons.append("similar company size")
             
         # Compare interests
-        lead_interests = set()
-        similar_lead_interests = set()
-        
-        for event in self.db.query(Event).filter(Event.lead_id == lead.id).all():
-            if event.properties.get('interests'):
-                lead_interests.update(event.properties['interests'])
-                
-        for event in self.db.query(Event).filter(Event.lead_id == similar_lead.id).all():
-            if event.properties.get('interests'):
-                similar_lead_interests.update(event.properties['interests'])
-                
-        common_interests = lead_interests & similar_lead_interests
+        common_interests = lead_facets["interests"] & similar_facets["interests"]
         if common_interests:
-            reasons.append(f"shared interests in {', '.join(common_interests)}")
+            reasons.append(f"shared interests in {', '.join(sorted(common_interests))}")
             
         if not reasons:
             return "Similar profile based on overall behavior"
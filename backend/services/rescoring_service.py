@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .lead_scoring_service import LeadScoringService
+from ..database import SessionLocal
+from ..models.lead import Lead
+from ..models.lead_rescore_queue import LeadRescoreQueue
+from ..config.ai_config import MODEL_PARAMETERS
+
+logger = logging.getLogger(__name__)
+
+
+class RescoringService:
+    """Dirty set of leads that received new events since their last score."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def mark_dirty(self, lead_id: int, at: Optional[datetime] = None):
+        """Queue a lead for rescoring. The caller commits."""
+        at = at or datetime.utcnow()
+        updated = (
+            self.db.query(LeadRescoreQueue)
+            .filter(LeadRescoreQueue.lead_id == lead_id)
+            .update({LeadRescoreQueue.last_marked_at: at}, synchronize_session=False)
+        )
+        if updated:
+            return
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(LeadRescoreQueue(lead_id=lead_id, first_marked_at=at, last_marked_at=at))
+        except IntegrityError:
+            # Another writer queued the lead first
+            pass
+
+    def backlog(self) -> Tuple[int, Optional[datetime]]:
+        """Number of queued leads and when the oldest of them was first marked."""
+        size, oldest = self.db.query(
+            func.count(LeadRescoreQueue.lead_id),
+            func.min(LeadRescoreQueue.first_marked_at)
+        ).one()
+        return size, oldest
+
+    def claim(self, batch_size: int, claim_timeout: float, now: Optional[datetime] = None) -> Tuple[str, List[int]]:
+        """Claim the longest-waiting unclaimed queued leads for one batch.
+
+        Schedulers on several hosts may share the queue; the conditional
+        UPDATE lets only one of them claim a given lead. Claims
+        older than ``claim_timeout`` seconds, left by a worker that died
+        mid-batch, are taken over. Returns the claim token and the lead ids.
+        """
+        now = now or datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = or_(
+            LeadRescoreQueue.claimed_at.is_(None),
+            LeadRescoreQueue.claimed_at < now - timedelta(seconds=claim_timeout)
+        )
+        candidates = (
+            select(LeadRescoreQueue.lead_id)
+            .where(claimable)
+            .order_by(LeadRescoreQueue.first_marked_at)
+            .limit(batch_size)
+        )
+        self.db.query(LeadRescoreQueue).filter(LeadRescoreQueue.lead_id.in_(candidates), claimable).update(
+            {LeadRescoreQueue.claim_token: token, LeadRescoreQueue.claimed_at: now},
+            synchronize_session=False
+        )
+        self.db.commit()
+
+        claimed = self.db.query(LeadRescoreQueue.lead_id).filter(LeadRescoreQueue.claim_token == token)
+        return token, [lead_id for lead_id, in claimed]
+
+    def release(self, token: str, snapshot: Optional[datetime] = None):
+        """Finish a claimed batch: drop its leads not marked again after ``snapshot`` and unclaim the rest."""
+        if snapshot is not None:
+            self.db.query(LeadRescoreQueue).filter(
+                LeadRescoreQueue.claim_token == token,
+                LeadRescoreQueue.last_marked_at <= snapshot
+            ).delete(synchronize_session=False)
+        self.db.query(LeadRescoreQueue).filter(LeadRescoreQueue.claim_token == token).update(
+            {LeadRescoreQueue.claim_token: None, LeadRescoreQueue.claimed_at: None},
+            synchronize_session=False
+        )
+        self.db.commit()
+
+    def rescore_batch(self, batch_size: int, claim_timeout: float) -> Optional[Tuple[int, int]]:
+        """Rescore the longest-waiting unclaimed queued leads in one batch.
+
+        Returns the number of leads claimed and the number rescored, which is
+        smaller when claimed leads were deleted meanwhile, or None if no
+        scoring model is active. Leads that receive new events while the
+        batch is scored stay queued.
+        """
+        scoring_service = LeadScoringService(self.db)
+        if scoring_service.model is None:
+            return None
+
+        snapshot = datetime.utcnow()
+        token, lead_ids = self.claim(batch_size, claim_timeout, snapshot)
+        if not lead_ids:
+            return 0, 0
+
+        try:
+            leads = self.db.query(Lead).filter(Lead.id.in_(lead_ids)).all()
+            scoring_service.batch_score_leads(leads)
+        except Exception:
+            # Leave the leads queued for the next batch
+            self.db.rollback()
+            self.release(token)
+            raise
+
+        self.release(token, snapshot)
+        return len(lead_ids), len(leads)
+
+
+class RescoringScheduler:
+    """Background loop that rescores dirty leads in batches.
+
+    A batch is started once the backlog reaches ``batch_size`` or the oldest
+    queued lead has waited ``max_staleness`` seconds, and the backlog is then
+    drained at no more than ``max_leads_per_second``. Only the background job
+    leader of a host runs one; schedulers of several hosts never overlap their
+    batches, since each claims its leads first, but the throughput cap applies
+    to each of them separately.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or MODEL_PARAMETERS["lead_scoring"]["rescoring"]
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Any] = {
+            "backlog": 0,
+            "lag_seconds": 0.0,
+            "rescored_total": 0,
+            "batches_total": 0,
+            "errors_total": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": None,
+            "last_run_at": None
+        }
+
+    def _check_backlog(self) -> Tuple[int, float]:
+        db = SessionLocal()
+        try:
+            size, oldest = RescoringService(db).backlog()
+        finally:
+            db.close()
+
+        lag = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        self.metrics["backlog"] = size
+        self.metrics["lag_seconds"] = lag
+        return size, lag
+
+    def _rescore_batch(self) -> Optional[Tuple[int, int]]:
+        db = SessionLocal()
+        try:
+            return RescoringService(db).rescore_batch(self.config["batch_size"], self.config["claim_timeout"])
+        finally:
+            db.close()
+
+    async def run_once(self):
+        """Drain the backlog if it is large or old enough."""
+        size, lag = await asyncio.to_thread(self._check_backlog)
+        if size == 0 or (size < self.config["batch_size"] and lag < self.config["max_staleness"]):
+            return
+
+        while size > 0:
+            start = time.perf_counter()
+            result = await asyncio.to_thread(self._rescore_batch)
+            elapsed = time.perf_counter() - start
+
+            if result is None:
+                logger.warning(f"Skipping rescoring of {size} leads: no active lead scoring model")
+                return
+            claimed, rescored = result
+            if claimed == 0:
+                # The rest of the backlog is claimed by other workers
+                break
+
+            self.metrics["rescored_total"] += rescored
+            self.metrics["batches_total"] += 1
+            self.metrics["last_batch_size"] = rescored
+            self.metrics["last_batch_seconds"] = elapsed
+            self.metrics["last_run_at"] = datetime.utcnow()
+
+            # Throughput cap: a batch of n leads takes at least n / max_leads_per_second
+            await asyncio.sleep(max(0.0, rescored / self.config["max_leads_per_second"] - elapsed))
+            size, lag = await asyncio.to_thread(self._check_backlog)
+
+    async def run(self):
+        """Run the rescoring loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.metrics["errors_total"] += 1
+                logger.error(f"Error in rescoring loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the rescoring loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+
+rescoring_scheduler = RescoringScheduler()
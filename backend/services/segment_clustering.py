@@ -0,0 +1,144 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+from sklearn.cluster import MiniBatchKMeans
+
+
+def feature_matrix(features: Sequence[Dict[str, Any]], feature_names: Sequence[str]) -> np.ndarray:
+    """Numeric feature rows of segmentation feature dicts; missing or non-numeric values become 0."""
+    def number(value: Any) -> float:
+        if isinstance(value, (int, float)) and value == value:
+            return float(value)
+        return 0.0
+
+    return np.array(
+        [[number(row.get(name)) for name in feature_names] for row in features],
+        dtype=np.float32
+    ).reshape(len(features), len(feature_names))
+
+
+class SegmentCentroids:
+    """K-means centroids over standardized segmentation features, each labeled with a segment id.
+
+    Several clusters may carry the same segment. A row is assigned the segment
+    of its nearest centroid; its confidence is the posterior weight of that
+    segment's clusters under equal-weight unit-variance Gaussians around the
+    centroids.
+    """
+
+    def __init__(
+        self,
+        feature_names: List[str],
+        mean: np.ndarray,
+        scale: np.ndarray,
+        centroids: np.ndarray,
+        cluster_segments: np.ndarray
+    ):
+        self.feature_names = feature_names
+        self.mean = mean
+        self.scale = scale
+        self.centroids = centroids
+        self.cluster_segments = cluster_segments
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centroids)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "mean": self.mean,
+            "scale": self.scale,
+            "centroids": self.centroids,
+            "cluster_segments": self.cluster_segments
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], feature_names: List[str]) -> "SegmentCentroids":
+        return cls(
+            feature_names,
+            np.asarray(arrays["mean"]),
+            np.asarray(arrays["scale"]),
+            np.asarray(arrays["centroids"]),
+            np.asarray(arrays["cluster_segments"])
+        )
+
+    def standardize(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+
+    def assign(self, X: np.ndarray, chunk_rows: int = 262144) -> Tuple[np.ndarray, np.ndarray]:
+        """Segment ids and confidences of raw feature rows, computed in chunks of rows."""
+        n_rows = len(X)
+        segments = np.empty(n_rows, dtype=np.int64)
+        confidence = np.empty(n_rows, dtype=np.float32)
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        # Cluster -> segment indicator, to sum cluster weights per segment
+        n_segments = int(self.cluster_segments.max()) + 1
+        by_segment = np.zeros((self.n_clusters, n_segments), dtype=np.float32)
+        by_segment[np.arange(self.n_clusters), self.cluster_segments] = 1.0
+
+        for start in range(0, n_rows, chunk_rows):
+            Z = self.standardize(X[start:start + chunk_rows])
+            # ||z - c||^2 up to the per-row constant ||z||^2
+            distances = centroid_norms - 2.0 * (Z @ self.centroids.T)
+            nearest = distances.argmin(axis=1)
+            weights = np.exp(-0.5 * (distances - distances[np.arange(len(Z)), nearest][:, None]))
+            weights /= weights.sum(axis=1, keepdims=True)
+
+            chunk_segments = self.cluster_segments[nearest]
+            segment_weights = weights @ by_segment
+            segments[start:start + len(Z)] = chunk_segments
+            confidence[start:start + len(Z)] = segment_weights[np.arange(len(Z)), chunk_segments]
+
+        return segments, confidence
+
+
+def fit_centroids(
+    X: np.ndarray,
+    n_clusters: int,
+    batch_size: int = 4096,
+    max_iter: int = 100,
+    seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Standardize ``X`` and cluster it with mini-batch k-means.
+
+    Returns (mean, scale, centroids in standardized space, cluster of each row).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    kmeans = MiniBatchKMeans(
+        n_clusters=min(n_clusters, len(X)),
+        batch_size=batch_size,
+        max_iter=max_iter,
+        n_init=3,
+        random_state=seed
+    )
+    clusters = kmeans.fit_predict((X - mean) / scale)
+    return mean, scale.astype(np.float32), kmeans.cluster_centers_.astype(np.float32), clusters
+
+
+def majority_segments(clusters: np.ndarray, labels: np.ndarray, n_clusters: int, default: int = 0) -> np.ndarray:
+    """Most frequent label of each cluster's rows; clusters without rows get ``default``."""
+    n_labels = int(labels.max()) + 1 if len(labels) else 1
+    votes = np.zeros((n_clusters, n_labels), dtype=np.int64)
+    np.add.at(votes, (clusters, labels), 1)
+    return np.where(votes.sum(axis=1) > 0, votes.argmax(axis=1), default).astype(np.int64)
+
+
+def agreement(local: np.ndarray, remote: np.ndarray, n_segments: int) -> Dict[str, Any]:
+    """Share of rows where two segmentations agree, overall and per remote segment, plus the confusion matrix."""
+    confusion = np.zeros((n_segments, n_segments), dtype=np.int64)
+    np.add.at(confusion, (remote, local), 1)
+    per_segment = confusion.sum(axis=1)
+    return {
+        "n": int(len(local)),
+        "agreement": float(np.trace(confusion) / max(len(local), 1)),
+        "per_segment": {
+            int(segment): float(confusion[segment, segment] / per_segment[segment])
+            for segment in range(n_segments)
+            if per_segment[segment]
+        },
+        # rows: remote segment, columns: local segment
+        "confusion": confusion.tolist()
+    }
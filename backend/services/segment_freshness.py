@@ -0,0 +1,115 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.lead_segment import LeadSegment
+from ..models.user_item_interaction import UserItemInteraction
+from ..config.ai_config import MODEL_PARAMETERS
+
+
+class SegmentFreshness:
+    """Decides which stored lead segments can be reused instead of calling a segmentation model.
+
+    A stored segment is fresh while the lead has no interaction newer than the
+    one it was computed from (its interaction watermark) and it is younger than
+    ``update_frequency`` hours, which bounds drift of time-based features such
+    as recency. Hit and miss counts are kept per process.
+    """
+
+    def __init__(self, update_frequency_hours: float, chunk_size: int = 5000):
+        self.max_age = timedelta(hours=update_frequency_hours)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "missing": 0, "changed": 0, "expired": 0, "forced": 0}
+
+    def watermarks(self, db: Session, lead_ids: Iterable[int]) -> Dict[int, int]:
+        """Highest interaction id of each lead, 0 for leads without interactions.
+
+        Read before features are prepared, so an interaction recorded meanwhile
+        makes the stored segment stale rather than being missed.
+        """
+        lead_ids = list(set(lead_ids))
+        watermarks = dict.fromkeys(lead_ids, 0)
+        for start in range(0, len(lead_ids), self.chunk_size):
+            watermarks.update(
+                db.query(UserItemInteraction.lead_id, func.max(UserItemInteraction.id))
+                .filter(UserItemInteraction.lead_id.in_(lead_ids[start:start + self.chunk_size]))
+                .group_by(UserItemInteraction.lead_id)
+                .all()
+            )
+        return watermarks
+
+    def lookup(self, db: Session, watermarks: Dict[int, int]) -> Dict[int, LeadSegment]:
+        """Stored segments that are still fresh, keyed by lead id."""
+        lead_ids = list(watermarks)
+        stored = {}
+        for start in range(0, len(lead_ids), self.chunk_size):
+            for row in db.query(LeadSegment).filter(LeadSegment.lead_id.in_(lead_ids[start:start + self.chunk_size])):
+                stored[row.lead_id] = row
+
+        expires_before = datetime.utcnow() - self.max_age
+        fresh = {}
+        counts = {"hits": 0, "missing": 0, "changed": 0, "expired": 0}
+        for lead_id, watermark in watermarks.items():
+            row = stored.get(lead_id)
+            if row is None:
+                counts["missing"] += 1
+            elif row.interaction_watermark != watermark:
+                counts["changed"] += 1
+            elif row.segmented_at < expires_before:
+                counts["expired"] += 1
+            else:
+                counts["hits"] += 1
+                fresh[lead_id] = row
+        self._record(**counts)
+        return fresh
+
+    def skip(self, n_leads: int):
+        """Count leads re-segmented on request without looking at stored segments."""
+        self._record(forced=n_leads)
+
+    def store(self, db: Session, results: List[Dict[str, Any]], watermarks: Dict[int, int]):
+        """Replace the stored segments of freshly segmented leads. The caller commits."""
+        lead_ids = [result["lead_id"] for result in results]
+        for start in range(0, len(lead_ids), self.chunk_size):
+            db.query(LeadSegment).filter(
+                LeadSegment.lead_id.in_(lead_ids[start:start + self.chunk_size])
+            ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(LeadSegment, [
+            {
+                "lead_id": result["lead_id"],
+                "segment_id": result["segment_id"],
+                "segment": result["segment"],
+                "confidence": result["confidence"],
+                "interaction_watermark": watermarks.get(result["lead_id"], 0),
+                "segmented_at": result["timestamp"]
+            }
+            for result in results
+        ])
+
+    def _record(self, **counts):
+        with self._lock:
+            for field, value in counts.items():
+                self._counts[field] += value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses by reason (missing, changed, expired) and forced refreshes since process start."""
+        with self._lock:
+            counts = dict(self._counts)
+        misses = counts["missing"] + counts["changed"] + counts["expired"]
+        looked_up = counts["hits"] + misses
+        return {
+            **counts,
+            "misses": misses,
+            "hit_rate": counts["hits"] / looked_up if looked_up else None,
+            "update_frequency_hours": self.max_age.total_seconds() / 3600
+        }
+
+
+segment_freshness = SegmentFreshness(
+    MODEL_PARAMETERS["segmentation"]["update_frequency"],
+    chunk_size=MODEL_PARAMETERS["segmentation"]["feature_chunk_size"]
+)
@@ -1,21 +1,48 @@
+import json
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime, timedelta
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 import numpy as np
 
 from .ai_service import AIService
+from .model_artifacts import new_artifact_path, save_artifact, load_artifact
+from .model_registry import model_registry
+from .segment_clustering import SegmentCentroids, agreement, feature_matrix, fit_centroids, majority_segments
+from .segment_freshness import segment_freshness
+from ..models.ai_model import AIModel
 from ..models.lead import Lead
+from ..models.lead_segment import LeadSegment
+from ..models.segmentation_run import SegmentationRun
 from ..models.user_item_interaction import UserItemInteraction
 from ..config.ai_config import MODEL_PARAMETERS, FEATURE_ENGINEERING
 
+def load_segment_centroids(path: str) -> SegmentCentroids:
+    """Open a local segmentation artifact."""
+    arrays, objects = load_artifact(path)
+    return SegmentCentroids.from_arrays(arrays, objects["feature_names"])
+
 class SegmentationService:
     def __init__(self):
-        self.ai_service = AIService()
-        self.endpoint_id = self.ai_service.get_endpoint_id("segmentation")
         self.config = MODEL_PARAMETERS["segmentation"]
+        self.local_config = self.config["local_model"]
         self.feature_config = FEATURE_ENGINEERING
         
+        # "remote": Vertex only, "local": in-process centroids only, "auto": remote, falling back to local
+        self.backend = self.config["backend"]
+        self.ai_service = None
+        self.endpoint_id = None
+        if self.backend != "local":
+            try:
+                self.ai_service = AIService()
+                self.endpoint_id = self.ai_service.get_endpoint_id("segmentation")
+            except Exception as e:
+                if self.backend == "remote":
+                    raise
+                logging.warning(f"Remote segmentation model unavailable, using the local model: {str(e)}")
+                self.ai_service = None
+        
         # Define segment mappings
         self.segment_mapping = {
             0: "Cold Prospects",
@@ -32,12 +59,14 @@ class SegmentationService:
                 "engagement_rate": 0.0,
                 "recency_score": 0.0,
                 "frequency_score": 0.0,
-                "conversion_rate": 0.0
+                "conversion_rate": 0.0,
+                # High number for no interaction
+                "days_since_last_interaction": 999
             }
             
         now = datetime.utcnow()
         total = len(interactions)
-        conversions = len([i for i in interactions if i.type == "conversion"])
+        conversions = len([i for i in interactions if i.interaction_type == "conversion"])
         
         # Calculate recency score
         if interactions:
@@ -57,20 +86,36 @@ class SegmentationService:
             "engagement_rate": total / self.feature_config["expected_interactions"] if total > 0 else 0.0,
             "recency_score": recency_score,
             "frequency_score": frequency_score,
-            "conversion_rate": conversions / total if total > 0 else 0.0
+            "conversion_rate": conversions / total if total > 0 else 0.0,
+            "days_since_last_interaction": days_since_latest
         }
 
+    def _number(self, value: Any) -> float:
+        try:
+            return float(value or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _lead_features(self, lead: Lead) -> Dict[str, Any]:
+        """Features from the lead row: its current score and the enriched company data."""
+        data = lead.data or {}
+        company = data.get('company') or {}
+        return {
+            "lead_id": lead.id,
+            "industry": company.get('industry'),
+            "company_size": self._number(company.get('employees')),
+            "score": float(lead.lead_score or 0.0),
+            "budget": self._number(data.get('budget'))
+        }
+
+    def _time_features(self, lead: Lead, now: datetime) -> Dict[str, Any]:
+        return {"days_since_creation": (now - lead.created_at).days}
+
     def prepare_segmentation_features(self, lead: Lead, db: Session) -> Dict[str, Any]:
         features = {}
         
         # Basic lead information
-        features.update({
-            "lead_id": lead.id,
-            "industry": lead.industry,
-            "company_size": lead.company_size,
-            "score": lead.score or 0.0,
-            "budget": lead.budget
-        })
+        features.update(self._lead_features(lead))
         
         # Get interactions from the database
         interactions = db.query(UserItemInteraction).filter(
@@ -81,93 +126,390 @@ class SegmentationService:
         metrics = self._calculate_engagement_metrics(interactions)
         features.update(metrics)
         
-        # Calculate interaction type distributions
-        interaction_types = set(i.type for i in interactions)
+        # Calculate interaction type distributions in one pass
+        type_counts = {}
+        for interaction in interactions:
+            type_counts[interaction.interaction_type] = type_counts.get(interaction.interaction_type, 0) + 1
         for itype in self.feature_config["interaction_types"]:
-            type_count = len([i for i in interactions if i.type == itype])
-            features[f"{itype}_ratio"] = type_count / len(interactions) if interactions else 0.0
+            features[f"{itype}_ratio"] = type_counts.get(itype, 0) / len(interactions) if interactions else 0.0
         
         # Time-based features
-        features["days_since_creation"] = (datetime.utcnow() - lead.created_at).days
-        if lead.last_interaction:
-            features["days_since_last_interaction"] = (datetime.utcnow() - lead.last_interaction).days
-        else:
-            features["days_since_last_interaction"] = 999  # High number for no interaction
+        features.update(self._time_features(lead, datetime.utcnow()))
             
         return features
 
-    async def get_lead_segment(self, lead: Lead, db: Session) -> Dict[str, Any]:
+    def _interaction_feature_columns(self, lead_ids: List[int], db: Session, now: datetime) -> Dict[str, np.ndarray]:
+        """Engagement metrics, type ratios and interaction age of many leads as arrays aligned with ``lead_ids``.
+        
+        Interactions are aggregated per (lead, type) in SQL, one grouped query
+        per chunk of leads, so no interaction rows are loaded. Values equal
+        those of ``prepare_segmentation_features``.
+        """
+        types = list(dict.fromkeys(self.feature_config["interaction_types"] + ["conversion"]))
+        type_index = {itype: column for column, itype in enumerate(types)}
+        unique_ids, inverse = np.unique(np.asarray(lead_ids, dtype=np.int64), return_inverse=True)
+        
+        # Per lead: interactions of each type (last column: other types), recent ones, latest timestamp in us
+        counts = np.zeros((len(unique_ids), len(types) + 1), dtype=np.int64)
+        recent = np.zeros(len(unique_ids), dtype=np.int64)
+        latest = np.full(len(unique_ids), np.iinfo(np.int64).min, dtype=np.int64)
+        
+        window_start = now - timedelta(days=self.feature_config["frequency_window"])
+        recent_count = func.sum(case((UserItemInteraction.timestamp >= window_start, 1), else_=0))
+        chunk_size = self.config["feature_chunk_size"]
+        for start in range(0, len(unique_ids), chunk_size):
+            rows = (
+                db.query(
+                    UserItemInteraction.lead_id,
+                    UserItemInteraction.interaction_type,
+                    func.count(UserItemInteraction.id),
+                    recent_count,
+                    func.max(UserItemInteraction.timestamp)
+                )
+                .filter(UserItemInteraction.lead_id.in_(unique_ids[start:start + chunk_size].tolist()))
+                .group_by(UserItemInteraction.lead_id, UserItemInteraction.interaction_type)
+                .all()
+            )
+            if not rows:
+                continue
+                
+            lead_col, type_col, count_col, recent_col, latest_col = zip(*rows)
+            positions = np.searchsorted(unique_ids, np.array(lead_col, dtype=np.int64))
+            columns = np.array([type_index.get(itype, len(types)) for itype in type_col], dtype=np.int64)
+            np.add.at(counts, (positions, columns), np.array(count_col, dtype=np.int64))
+            np.add.at(recent, positions, np.array([value or 0 for value in recent_col], dtype=np.int64))
+            # Missing timestamps become NaT, which is the int64 minimum
+            np.maximum.at(latest, positions, np.array(latest_col, dtype="datetime64[us]").astype(np.int64))
+        
+        total = counts.sum(axis=1)
+        has_any = total > 0
+        safe_total = np.maximum(total, 1)
+        
+        # Whole days since the latest interaction, floored like timedelta.days
+        now_us = np.datetime64(now, "us").astype(np.int64)
+        days_since_latest = (now_us - np.where(has_any, latest, now_us)) // (86400 * 10 ** 6)
+        recency_score = np.where(has_any, np.exp(-days_since_latest / self.feature_config["recency_decay"]), 0.0)
+        
+        columns = {
+            "total_interactions": total,
+            "engagement_rate": np.where(has_any, total / self.feature_config["expected_interactions"], 0.0),
+            "recency_score": recency_score,
+            "frequency_score": np.where(has_any, recent / self.feature_config["frequency_window"], 0.0),
+            "conversion_rate": np.where(has_any, counts[:, type_index["conversion"]] / safe_total, 0.0),
+            # High number for no interaction
+            "days_since_last_interaction": np.where(has_any, days_since_latest, 999)
+        }
+        for itype in self.feature_config["interaction_types"]:
+            columns[f"{itype}_ratio"] = np.where(has_any, counts[:, type_index[itype]] / safe_total, 0.0)
+        return {name: values[inverse] for name, values in columns.items()}
+
+    def prepare_batch_segmentation_features(self, leads: List[Lead], db: Session) -> List[Dict[str, Any]]:
+        """Segmentation features of many leads with a few grouped queries instead of one query per lead."""
+        now = datetime.utcnow()
+        columns = self._interaction_feature_columns([lead.id for lead in leads], db, now)
+        # Plain Python numbers, as the per-lead path returns
+        columns = {name: values.tolist() for name, values in columns.items()}
+        
+        all_features = []
+        for position, lead in enumerate(leads):
+            features = self._lead_features(lead)
+            features.update({name: values[position] for name, values in columns.items()})
+            features.update(self._time_features(lead, now))
+            all_features.append(features)
+        return all_features
+
+    def _local_model(self, db: Session) -> Optional[SegmentCentroids]:
+        _, model = model_registry.get_active(db, "segmentation", loader=load_segment_centroids)
+        return model
+
+    def predict_local(self, all_features: List[Dict[str, Any]], db: Session) -> List[Dict[str, Any]]:
+        """Segments from the active in-process centroid model, shaped like remote predictions."""
+        model = self._local_model(db)
+        if model is None:
+            raise ValueError("No active local segmentation model found")
+            
+        segments, confidence = model.assign(feature_matrix(all_features, model.feature_names))
+        return [
+            {"segment": segment_id, "confidence": segment_confidence}
+            for segment_id, segment_confidence in zip(segments.tolist(), confidence.tolist())
+        ]
+
+    async def _predict(self, all_features: List[Dict[str, Any]], db: Session) -> List[Dict[str, Any]]:
+        """Predictions from the remote model, or from the local one when selected or when the remote call fails."""
+        if self.ai_service is not None:
+            try:
+                # Retried batches are logged by predict_batches; one that still fails raises
+                predictions, _ = await self.ai_service.predict_batches(
+                    self.endpoint_id,
+                    all_features,
+                    batch_size=self.config["batch_size"]
+                )
+                return predictions
+            except Exception as e:
+                if self.backend == "remote":
+                    raise
+                logging.warning(f"Remote segmentation failed, using the local model: {str(e)}")
+                
+        return self.predict_local(all_features, db)
+
+    def _sample_features(self, db: Session, sample_size: int) -> List[Dict[str, Any]]:
+        """Segmentation features of up to ``sample_size`` random leads."""
+        lead_ids = [lead_id for lead_id, in db.query(Lead.id).order_by(func.random()).limit(sample_size)]
+        chunk_size = self.config["feature_chunk_size"]
+        
+        all_features = []
+        for start in range(0, len(lead_ids), chunk_size):
+            leads = db.query(Lead).filter(Lead.id.in_(lead_ids[start:start + chunk_size])).all()
+            all_features.extend(self.prepare_batch_segmentation_features(leads, db))
+            db.expunge_all()
+        return all_features
+
+    def _heuristic_segments(self, X: np.ndarray, clusters: np.ndarray, n_clusters: int) -> np.ndarray:
+        """Label clusters without remote labels from engagement, recency and conversion.
+        
+        Each cluster's mean engagement is ranked against all training rows and
+        the rank is cut at ``segment_thresholds``; engaged clusters whose
+        recency has decayed are At Risk.
+        """
+        names = self.local_config["features"]
+        engagement = np.minimum(X[:, names.index("engagement_rate")], 1.0)
+        recency = X[:, names.index("recency_score")]
+        composite = (engagement + recency + X[:, names.index("conversion_rate")]) / 3.0
+        ranked = np.sort(composite)
+        thresholds = self.config["segment_thresholds"]
+        
+        segments = np.zeros(n_clusters, dtype=np.int64)
+        for cluster in range(n_clusters):
+            rows = clusters == cluster
+            if not rows.any():
+                continue
+            percentile = np.searchsorted(ranked, composite[rows].mean(), side="right") / len(ranked)
+            if engagement[rows].mean() >= thresholds["warm"] and recency[rows].mean() < thresholds["cold"]:
+                segments[cluster] = 4
+            elif percentile >= thresholds["champion"]:
+                segments[cluster] = 3
+            elif percentile >= thresholds["hot"]:
+                segments[cluster] = 2
+            elif percentile >= thresholds["warm"]:
+                segments[cluster] = 1
+        return segments
+
+    async def train_local_model(
+        self,
+        db: Session,
+        progress: Optional[Callable[[str, float], None]] = None,
+        before_activate: Optional[Callable[[Session, AIModel], None]] = None
+    ) -> Dict[str, Any]:
+        """Fit mini-batch k-means centroids on a sample of leads and activate them as the local model.
+        
+        Clusters are labeled with the remote model's majority segment on a
+        labeled subsample when the remote model is reachable, and from
+        engagement heuristics otherwise.
+        """
+        progress = progress or (lambda stage, fraction: None)
+        feature_names = self.local_config["features"]
+        
+        progress('load', 0.0)
+        all_features = self._sample_features(db, self.local_config["training_sample"])
+        if not all_features:
+            raise ValueError("No leads available for training")
+        X = feature_matrix(all_features, feature_names)
+        
+        progress('fit', 0.4)
+        mean, scale, centroids, clusters = fit_centroids(
+            X,
+            n_clusters=self.local_config["n_clusters"],
+            batch_size=self.local_config["kmeans_batch_size"],
+            max_iter=self.local_config["max_iter"]
+        )
+        n_clusters = len(centroids)
+        cluster_segments = self._heuristic_segments(X, clusters, n_clusters)
+        
+        progress('label', 0.7)
+        metrics = {"n_samples": len(X), "n_clusters": n_clusters, "labels": "heuristic"}
+        if self.ai_service is not None:
+            labeled = np.random.default_rng(42).permutation(len(X))[:self.local_config["label_sample"]]
+            try:
+                remote, reports = await self.ai_service.predict_batches(
+                    self.endpoint_id,
+                    [all_features[row] for row in labeled],
+                    batch_size=self.config["batch_size"]
+                )
+                metrics["label_retried_batches"] = sum(report["attempts"] > 1 for report in reports)
+                labels = np.array([prediction["segment"] for prediction in remote], dtype=np.int64)
+                labeled_clusters = np.bincount(clusters[labeled], minlength=n_clusters) > 0
+                cluster_segments = np.where(
+                    labeled_clusters,
+                    majority_segments(clusters[labeled], labels, n_clusters),
+                    cluster_segments
+                )
+                local = cluster_segments[clusters[labeled]]
+                metrics["labels"] = "remote"
+                metrics["label_agreement"] = agreement(local, labels, len(self.segment_mapping))["agreement"]
+            except Exception as e:
+                logging.warning(f"Labeling local segmentation clusters from engagement, remote model failed: {str(e)}")
+                
+        progress('persist', 0.9)
+        model = SegmentCentroids(feature_names, mean, scale, centroids, cluster_segments)
+        model_path = new_artifact_path("segmentation")
+        save_artifact(model_path, model.to_arrays(), {"feature_names": feature_names})
+        
+        metrics["segment_clusters"] = {
+            self.segment_mapping[segment]: int((cluster_segments == segment).sum())
+            for segment in self.segment_mapping
+        }
+        new_model = AIModel(
+            name="segmentation",
+            version=self._get_next_version(db),
+            description="In-process mini-batch k-means segmentation over lead engagement features",
+            model_type="minibatch_kmeans",
+            filepath=model_path,
+            parameters=json.dumps({
+                key: self.local_config[key]
+                for key in ("n_clusters", "training_sample", "kmeans_batch_size", "max_iter", "features")
+            }),
+            metrics=json.dumps(metrics)
+        )
+        model_registry.activate(db, new_model, before_commit=before_activate)
+        return metrics
+
+    async def compare_with_remote(self, db: Session, sample_size: Optional[int] = None) -> Dict[str, Any]:
+        """Agreement between the local and the remote model on a fresh sample of leads."""
+        if self.ai_service is None:
+            raise ValueError("Remote segmentation model is not configured")
+            
+        all_features = self._sample_features(db, sample_size or self.local_config["agreement_sample"])
+        local = np.array([prediction["segment"] for prediction in self.predict_local(all_features, db)], dtype=np.int64)
+        remote, reports = await self.ai_service.predict_batches(
+            self.endpoint_id,
+            all_features,
+            batch_size=self.config["batch_size"]
+        )
+        report = agreement(
+            local,
+            np.array([prediction["segment"] for prediction in remote], dtype=np.int64),
+            len(self.segment_mapping)
+        )
+        report["per_segment"] = {
+            self.segment_mapping[segment]: share for segment, share in report["per_segment"].items()
+        }
+        report["retried_batches"] = sum(batch["attempts"] > 1 for batch in reports)
+        return report
+
+    def _get_next_version(self, db: Session) -> int:
+        """Get the next version number for local segmentation models."""
+        latest_model = (
+            db.query(AIModel)
+            .filter(AIModel.name == "segmentation")
+            .order_by(AIModel.version.desc())
+            .first()
+        )
+        return (latest_model.version + 1) if latest_model else 1
+
+    def _cached_result(self, lead: Lead, stored: LeadSegment) -> Dict[str, Any]:
+        if stored.confidence >= self.config["min_confidence"]:
+            lead.segment = stored.segment
+            lead.last_segmented = stored.segmented_at
+        return {
+            "lead_id": lead.id,
+            "segment": stored.segment,
+            "segment_id": stored.segment_id,
+            "confidence": stored.confidence,
+            "timestamp": stored.segmented_at,
+            "cached": True
+        }
+
+    async def get_lead_segment(self, lead: Lead, db: Session, force: bool = False) -> Dict[str, Any]:
+        """Segment of a lead, reusing its stored segment while it is fresh unless ``force`` is set."""
         try:
+            # Read before the features so a concurrent interaction marks the result stale
+            watermarks = segment_freshness.watermarks(db, [lead.id])
+            if force:
+                segment_freshness.skip(1)
+            else:
+                stored = segment_freshness.lookup(db, watermarks).get(lead.id)
+                if stored is not None:
+                    # Features are not recomputed for a stored segment
+                    return {**self._cached_result(lead, stored), "features": None}
+                    
             # Prepare features
             features = self.prepare_segmentation_features(lead, db)
             
             # Make prediction
-            prediction = await self.ai_service.predict(
-                self.endpoint_id,
-                instances=[features]
-            )
+            prediction = await self._predict([features], db)
             
             # Extract segment and confidence
             segment_id = prediction[0]["segment"]
             confidence = prediction[0].get("confidence", 1.0)
             
             # Update lead if confidence meets threshold
-            if confidence >= self.config["threshold"]:
+            if confidence >= self.config["min_confidence"]:
                 lead.segment = self.segment_mapping[segment_id]
                 lead.last_segmented = datetime.utcnow()
-                db.commit()
-            
-            return {
+                
+            result = {
                 "lead_id": lead.id,
                 "segment": self.segment_mapping[segment_id],
                 "segment_id": segment_id,
                 "confidence": confidence,
-                "features": features,
-                "timestamp": datetime.utcnow()
+                "timestamp": datetime.utcnow(),
+                "cached": False
             }
+            segment_freshness.store(db, [result], watermarks)
+            db.commit()
+            
+            return {**result, "features": features}
             
         except Exception as e:
             logging.error(f"Failed to get segment for lead {lead.id}: {str(e)}")
             raise
 
-    async def batch_segment_leads(self, leads: List[Lead], db: Session) -> List[Dict[str, Any]]:
-        try:
-            # Prepare features for all leads
-            all_features = []
-            for lead in leads:
-                features = self.prepare_segmentation_features(lead, db)
-                all_features.append(features)
-            
-            # Split into batches
-            batch_size = self.config["batch_size"]
-            batches = [all_features[i:i + batch_size] for i in range(0, len(all_features), batch_size)]
-            
-            # Process each batch
-            all_predictions = []
-            for batch in batches:
-                predictions = await self.ai_service.predict(
-                    self.endpoint_id,
-                    instances=batch
-                )
-                all_predictions.extend(predictions)
+    async def _segment_leads(self, leads: List[Lead], db: Session, force: bool) -> List[Dict[str, Any]]:
+        """Segment leads and stage their stored segments; the caller commits."""
+        # Read before the features so a concurrent interaction marks the result stale
+        watermarks = segment_freshness.watermarks(db, [lead.id for lead in leads])
+        if force:
+            segment_freshness.skip(len(watermarks))
+            fresh = {}
+        else:
+            fresh = segment_freshness.lookup(db, watermarks)
+        stale_leads = [lead for lead in leads if lead.id not in fresh]
+        
+        # Prepare features for the leads that need segmenting
+        all_features = self.prepare_batch_segmentation_features(stale_leads, db)
+        
+        # Predict all batches concurrently (or locally), in lead order
+        all_predictions = await self._predict(all_features, db) if all_features else []
+        
+        # Update leads and prepare response
+        computed = {}
+        for lead, prediction in zip(stale_leads, all_predictions):
+            segment_id = prediction["segment"]
+            confidence = prediction.get("confidence", 1.0)
             
-            # Update leads and prepare response
-            results = []
-            for lead, prediction in zip(leads, all_predictions):
-                segment_id = prediction["segment"]
-                confidence = prediction.get("confidence", 1.0)
-                
-                if confidence >= self.config["threshold"]:
-                    lead.segment = self.segment_mapping[segment_id]
-                    lead.last_segmented = datetime.utcnow()
-                
-                results.append({
-                    "lead_id": lead.id,
-                    "segment": self.segment_mapping[segment_id],
-                    "segment_id": segment_id,
-                    "confidence": confidence,
-                    "timestamp": datetime.utcnow()
-                })
+            if confidence >= self.config["min_confidence"]:
+                lead.segment = self.segment_mapping[segment_id]
+                lead.last_segmented = datetime.utcnow()
+            
+            computed[lead.id] = {
+                "lead_id": lead.id,
+                "segment": self.segment_mapping[segment_id],
+                "segment_id": segment_id,
+                "confidence": confidence,
+                "timestamp": datetime.utcnow(),
+                "cached": False
+            }
+            
+        segment_freshness.store(db, list(computed.values()), watermarks)
+        return [
+            computed[lead.id] if lead.id in computed else self._cached_result(lead, fresh[lead.id])
+            for lead in leads
+        ]
+
+    async def batch_segment_leads(self, leads: List[Lead], db: Session, force: bool = False) -> List[Dict[str, Any]]:
+        """Segments of many leads; only leads without a fresh stored segment reach the model."""
+        try:
+            results = await self._segment_leads(leads, db, force)
             
             # Commit all updates
             db.commit()
@@ -176,4 +518,89 @@ class SegmentationService:
             
         except Exception as e:
             logging.error(f"Failed to batch segment leads: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+    def start_run(self, db: Session, force: bool = False, restart: bool = False) -> SegmentationRun:
+        """Resume the latest unfinished whole-table run, or start a new one.
+        
+        Only one run should be active at a time; ``restart`` abandons an
+        unfinished run instead of resuming it.
+        """
+        unfinished = (
+            db.query(SegmentationRun)
+            .filter(SegmentationRun.status != "succeeded")
+            .order_by(SegmentationRun.id.desc())
+            .first()
+        )
+        if unfinished is not None and restart:
+            unfinished.status = "failed"
+            unfinished.error = unfinished.error or "Abandoned by a restart"
+            unfinished.finished_at = unfinished.finished_at or datetime.utcnow()
+            unfinished = None
+            
+        if unfinished is not None:
+            run = unfinished
+            run.status = "running"
+            run.error = None
+            run.finished_at = None
+        else:
+            run = SegmentationRun(
+                force=force,
+                chunk_size=self.config["sweep_chunk_size"],
+                max_lead_id=db.query(func.max(Lead.id)).scalar() or 0
+            )
+            db.add(run)
+        run.updated_at = datetime.utcnow()
+        db.commit()
+        return run
+
+    async def segment_all_leads(
+        self,
+        db: Session,
+        run: SegmentationRun,
+        progress: Optional[Callable[[SegmentationRun], None]] = None
+    ) -> SegmentationRun:
+        """Segment every lead up to the run's ``max_lead_id`` in keyset-ordered chunks.
+        
+        Each chunk's segments and the run's checkpoint are committed together,
+        so after a crash the run resumes after the last committed chunk. Only
+        one chunk of leads and features is held at a time.
+        """
+        try:
+            while True:
+                leads = (
+                    db.query(Lead)
+                    .filter(Lead.id > run.last_lead_id, Lead.id <= run.max_lead_id)
+                    .order_by(Lead.id)
+                    .limit(run.chunk_size)
+                    .all()
+                )
+                if not leads:
+                    break
+                    
+                results = await self._segment_leads(leads, db, run.force)
+                run.last_lead_id = leads[-1].id
+                run.processed += len(results)
+                run.predicted += sum(not result["cached"] for result in results)
+                run.updated_at = datetime.utcnow()
+                db.commit()
+                
+                if progress is not None:
+                    progress(run)
+                # Committed leads need not stay in the session
+                db.expunge_all()
+                db.add(run)
+                
+            run.status = "succeeded"
+            run.finished_at = datetime.utcnow()
+            db.commit()
+            return run
+            
+        except Exception as e:
+            db.rollback()
+            run.status = "failed"
+            run.error = str(e)
+            run.finished_at = datetime.utcnow()
+            db.commit()
+            logging.error(f"Segmentation run {run.id} failed after lead {run.last_lead_id}: {str(e)}")
+            raise
@@ -0,0 +1,132 @@
+import numpy as np
+from scipy.special import ndtri
+from typing import Optional, Tuple
+
+
+def hash_ids(ids) -> np.ndarray:
+    """Well-mixed 64-bit hashes (splitmix64) of non-negative integer ids."""
+    x = np.asarray(ids, dtype=np.uint64).reshape(-1) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact bit length of each uint64 (float log2 rounds above 2**53)."""
+    values = values.copy()
+    length = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= (np.uint64(1) << np.uint64(shift))
+        length[wide] += shift
+        values[wide] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+def z_value(confidence: float) -> float:
+    """Two-sided standard normal quantile of a confidence level, e.g. 1.96 for 0.95."""
+    return float(ndtri(0.5 + confidence / 2.0))
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes.
+
+    Sketches of the same precision merge by taking the register-wise maximum,
+    so the sketch of a union is exactly the merge of the parts' sketches. The
+    relative standard error of the estimate is about 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def n_registers(self) -> int:
+        return len(self.registers)
+
+    def add_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Position of the leftmost 1 bit in the remaining bits, counted from 1
+        rank = (width - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = self.n_registers
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return float(m * np.log(m / zeros))
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(self.n_registers)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+        return cls(int(len(registers)).bit_length() - 1, registers)
+
+
+class LeadSample:
+    """Uniform sample of distinct leads, each flagged when it converted.
+
+    The sample keeps the ``size`` leads with the smallest hashes, a reservoir
+    sample that merges exactly: a lead among the smallest hashes of a union is
+    among the smallest of every part it occurs in, so merging samples of days
+    or campaigns yields the sample of their union with each lead's flags OR-ed.
+    """
+
+    def __init__(self, size: int, hashes: Optional[np.ndarray] = None, converted: Optional[np.ndarray] = None):
+        self.size = size
+        self.hashes = hashes if hashes is not None else np.zeros(0, dtype=np.uint64)
+        self.converted = converted if converted is not None else np.zeros(0, dtype=bool)
+
+    def add_hashes(self, hashes: np.ndarray, converted: np.ndarray):
+        hashes = np.concatenate([self.hashes, np.asarray(hashes, dtype=np.uint64)])
+        converted = np.concatenate([self.converted, np.asarray(converted, dtype=bool)])
+        unique, inverse = np.unique(hashes, return_inverse=True)
+        flags = np.zeros(len(unique), dtype=bool)
+        np.logical_or.at(flags, inverse, converted)
+        self.hashes = unique[:self.size]
+        self.converted = flags[:self.size]
+
+    def merge(self, other: "LeadSample") -> "LeadSample":
+        self.add_hashes(other.hashes, other.converted)
+        return self
+
+    def rate(self, confidence: float = 0.95) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """Share of sampled leads that converted, with its Wilson score interval."""
+        n = len(self.hashes)
+        if not n:
+            return None, None, None
+        p = float(np.count_nonzero(self.converted)) / n
+        z = z_value(confidence)
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half_width = z / (1 + z * z / n) * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+        return p, float(max(0.0, center - half_width)), float(min(1.0, center + half_width))
+
+    def to_bytes(self) -> bytes:
+        return self.hashes.astype(np.uint64).tobytes() + self.converted.astype(np.uint8).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, size: int) -> "LeadSample":
+        n = len(data) // 9
+        hashes = np.frombuffer(data[:8 * n], dtype=np.uint64).copy()
+        converted = np.frombuffer(data[8 * n:], dtype=np.uint8).astype(bool)
+        return cls(size, hashes, converted)
@@ -0,0 +1,549 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, create_engine, exists, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from .collaborative_filtering_service import CollaborativeFilteringService
+from .lead_scoring_service import LeadScoringService, discard_training_data, load_training_data
+from .model_registry import model_registry
+from .recommendation_service import RecommendationService
+from ..database import SessionLocal, engine
+from ..models.ai_model import AIModel
+from ..models.lead import Lead
+from ..models.training_job import TrainingJob
+from ..config.ai_config import TRAINING_JOBS
+
+logger = logging.getLogger(__name__)
+
+TRAINABLE_MODELS = ("lead_scoring", "recommendation", "collaborative_filtering", "segmentation")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class TrainingCancelled(Exception):
+    """Raised inside a training worker when its job was cancelled."""
+
+
+class TrainingJobService:
+    """Submission, lookup and cancellation of background training jobs."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def submit(self, model_name: str, params: Optional[Dict[str, Any]] = None) -> TrainingJob:
+        """Queue a training job for the runner to pick up."""
+        if model_name not in TRAINABLE_MODELS:
+            raise ValueError(f"Unknown model: {model_name}")
+
+        job = TrainingJob(model_name=model_name, status="queued", params=json.dumps(params or {}))
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def submit_if_idle(self, model_name: str, params: Optional[Dict[str, Any]] = None) -> Optional[TrainingJob]:
+        """Queue a training job unless one for the same model is already queued or running.
+
+        Used by schedulers, which may run on several hosts. Returns the new
+        job, or None if another job was pending.
+        """
+        if model_name not in TRAINABLE_MODELS:
+            raise ValueError(f"Unknown model: {model_name}")
+
+        now = datetime.utcnow()
+        pending = exists().where(
+            TrainingJob.model_name == model_name,
+            TrainingJob.status.in_(("queued", "running"))
+        )
+        # Checked and inserted in one statement, so processes do not queue the job twice
+        result = self.db.execute(
+            insert(TrainingJob)
+            .from_select(
+                ["model_name", "status", "progress", "cancel_requested", "params", "created_at"],
+                select(
+                    literal(model_name),
+                    literal("queued"),
+                    literal(0.0),
+                    literal(False),
+                    literal(json.dumps(params or {})),
+                    literal(now)
+                ).where(~pending)
+            )
+        )
+        self.db.commit()
+        if not result.rowcount:
+            return None
+        return (
+            self.db.query(TrainingJob)
+            .filter(TrainingJob.model_name == model_name, TrainingJob.created_at == now)
+            .order_by(TrainingJob.id.desc())
+            .first()
+        )
+
+    def get(self, job_id: int) -> Optional[TrainingJob]:
+        return self.db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+
+    def recent(self, limit: int = 50) -> List[TrainingJob]:
+        """Most recently submitted jobs first."""
+        return self.db.query(TrainingJob).order_by(TrainingJob.id.desc()).limit(limit).all()
+
+    def request_cancel(self, job: TrainingJob) -> TrainingJob:
+        """Cancel a queued job now, or ask a running job's worker to stop.
+
+        A running job stops at its next stage boundary; the runner terminates
+        workers that do not stop within ``cancel_grace_seconds``.
+        """
+        now = datetime.utcnow()
+        # Conditional updates so a job the runner claims concurrently is not lost
+        cancelled = (
+            self.db.query(TrainingJob)
+            .filter(TrainingJob.id == job.id, TrainingJob.status == "queued")
+            .update({"status": "cancelled", "cancel_requested": True, "finished_at": now}, synchronize_session=False)
+        )
+        if cancelled:
+            _discard_inputs(job.params)
+        else:
+            self.db.query(TrainingJob).filter(
+                TrainingJob.id == job.id,
+                TrainingJob.status == "running"
+            ).update({"cancel_requested": True}, synchronize_session=False)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def claim(self, max_jobs: int) -> List[int]:
+        """Mark the oldest queued jobs as running, up to ``max_jobs`` running in total, and return their ids.
+
+        Each running job holds one of ``max_jobs`` slots, and a slot is unique
+        among running jobs, so runners in several API processes cannot exceed
+        the limit between them.
+        """
+        taken = {
+            slot for slot, in self.db.query(TrainingJob.slot).filter(TrainingJob.status == "running")
+        }
+        free_slots = [slot for slot in range(max_jobs) if slot not in taken]
+        if not free_slots:
+            return []
+
+        candidates = [
+            job_id for job_id, in (
+                self.db.query(TrainingJob.id)
+                .filter(TrainingJob.status == "queued")
+                .order_by(TrainingJob.id)
+                .limit(len(free_slots))
+                .all()
+            )
+        ]
+        claimed = []
+        for job_id in candidates:
+            while free_slots:
+                slot = free_slots.pop(0)
+                try:
+                    # Another API process may claim the same job or slot; only one update wins
+                    with self.db.begin_nested():
+                        updated = (
+                            self.db.query(TrainingJob)
+                            .filter(TrainingJob.id == job_id, TrainingJob.status == "queued")
+                            .update({
+                                "status": "running",
+                                "slot": slot,
+                                "started_at": datetime.utcnow(),
+                                "heartbeat_at": datetime.utcnow()
+                            }, synchronize_session=False)
+                        )
+                except IntegrityError:
+                    continue
+                if updated:
+                    claimed.append(job_id)
+                else:
+                    free_slots.insert(0, slot)
+                break
+        self.db.commit()
+        return claimed
+
+    def heartbeat(self, job_ids: List[int]):
+        """Record that the workers of these running jobs are alive."""
+        if not job_ids:
+            return
+
+        self.db.query(TrainingJob).filter(
+            TrainingJob.id.in_(job_ids),
+            TrainingJob.status == "running"
+        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+
+    def reclaim_stale(self, stale_after: float, now: Optional[datetime] = None) -> int:
+        """Close running jobs that no runner has heartbeated for ``stale_after`` seconds.
+
+        Their runner went away, e.g. the API process restarted, so no one will
+        reap their worker. Such jobs are marked failed, or cancelled if that was
+        requested. A worker orphaned by its runner can no longer activate its
+        model, since activation requires the job to be running. Returns the
+        number of jobs closed.
+        """
+        now = now or datetime.utcnow()
+        stale = and_(
+            TrainingJob.status == "running",
+            func.coalesce(TrainingJob.heartbeat_at, TrainingJob.started_at) < now - timedelta(seconds=stale_after)
+        )
+        closed = (
+            self.db.query(TrainingJob)
+            .filter(stale, TrainingJob.cancel_requested.is_(True))
+            .update({"status": "cancelled", "finished_at": now}, synchronize_session=False)
+        )
+        closed += (
+            self.db.query(TrainingJob)
+            .filter(stale)
+            .update({
+                "status": "failed",
+                "error": "Training worker lost: its API process stopped",
+                "finished_at": now
+            }, synchronize_session=False)
+        )
+        self.db.commit()
+        return closed
+
+    def finish(self, job_id: int, exitcode: Optional[int]) -> Optional[str]:
+        """Record the outcome of a worker that exited and return the job's final status.
+
+        Workers write their own final status; a job still marked running here
+        was terminated or crashed.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        if job.status == "running":
+            job.status = "cancelled" if job.cancel_requested else "failed"
+            job.error = job.error or f"Training worker exited with code {exitcode}"
+            job.finished_at = datetime.utcnow()
+            self.db.commit()
+        return job.status
+
+
+def _discard_inputs(params: Optional[str]):
+    """Delete the input files of a job that will not run again."""
+    path = json.loads(params).get("training_data_path") if params else None
+    if path:
+        discard_training_data(path)
+
+
+def _train(db: Session, job: TrainingJob, progress, before_activate, n_jobs: int) -> Dict[str, Any]:
+    """Run the training of one job in the worker's session."""
+    params = json.loads(job.params) if job.params else {}
+    if job.model_name == "lead_scoring":
+        # Examples are stored as a file the job refers to; older jobs carry them inline
+        if "training_data_path" in params:
+            training_data = load_training_data(params["training_data_path"])
+        else:
+            training_data = params.get("training_data", [])
+        return LeadScoringService(db).train_model(
+            training_data,
+            n_jobs=n_jobs,
+            progress=progress,
+            before_activate=before_activate
+        )
+
+    if job.model_name == "recommendation":
+        mode = params.get("mode", "full")
+        if mode == "streaming":
+            return RecommendationService(db).train_model_streaming(
+                progress=progress,
+                before_activate=before_activate
+            )
+        if mode == "update":
+            if "lead_ids" not in params:
+                # Scheduled fold-in of the leads queued since the last one
+                return RecommendationService(db).update_queued_leads(
+                    progress=progress,
+                    before_activate=before_activate
+                )
+            return RecommendationService(db).update_leads(
+                params["lead_ids"],
+                progress=progress,
+                before_activate=before_activate
+            )
+        if mode == "compact":
+            return RecommendationService(db).compact_model(
+                progress=progress,
+                before_activate=before_activate
+            )
+
+        progress("load", 0.0)
+        leads = db.query(Lead).all()
+        if not leads:
+            raise ValueError("No leads available for training")
+        return RecommendationService(db).train_model(
+            leads,
+            progress=progress,
+            before_activate=before_activate
+        )
+
+    if job.model_name == "collaborative_filtering":
+        return CollaborativeFilteringService(db).train_model(
+            progress=progress,
+            before_activate=before_activate
+        )
+
+    if job.model_name == "segmentation":
+        # Imported here: the segmentation service pulls in the Vertex AI client
+        from .segmentation_service import SegmentationService
+        # Labels clusters through the async remote client when it is reachable
+        return asyncio.run(SegmentationService().train_local_model(
+            db,
+            progress=progress,
+            before_activate=before_activate
+        ))
+
+    raise ValueError(f"Unknown model: {job.model_name}")
+
+
+def _limit_cpu(config: Dict[str, Any]) -> int:
+    """Lower this process's priority and pin it to at most ``max_cpus`` CPUs.
+
+    Returns the number of CPUs training may use. Child processes inherit both
+    limits, so parallel feature extraction and forest fitting stay within them.
+    """
+    if config["niceness"]:
+        os.nice(config["niceness"])
+
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        # Take the highest-numbered CPUs; serving workers are not pinned
+        os.sched_setaffinity(0, cpus[-config["max_cpus"]:])
+        return len(os.sched_getaffinity(0))
+
+    return config["max_cpus"]
+
+
+def run_training_job(job_id: int, database_url: str, config: Dict[str, Any]):
+    """Entry point of a training worker process.
+
+    Progress and cancellation go through a session of their own so that the
+    training session never commits mid-run. The job is marked succeeded in the
+    same transaction that activates the new model.
+    """
+    logging.basicConfig(level=logging.INFO)
+    n_jobs = _limit_cpu(config)
+
+    worker_engine = create_engine(database_url)
+    WorkerSession = sessionmaker(bind=worker_engine)
+    db = WorkerSession()
+    job_db = WorkerSession()
+    params = None
+    try:
+        job = job_db.query(TrainingJob).filter(TrainingJob.id == job_id).one()
+        params = job.params
+        job.worker_pid = os.getpid()
+        job_db.commit()
+
+        def progress(stage: str, fraction: float):
+            job_db.refresh(job)
+            if job.cancel_requested:
+                raise TrainingCancelled()
+            job.stage = stage
+            job.progress = fraction
+            job_db.commit()
+
+        def before_activate(session: Session, model: AIModel):
+            # Fails if cancellation was requested after the last stage boundary
+            updated = (
+                session.query(TrainingJob)
+                .filter(
+                    TrainingJob.id == job_id,
+                    TrainingJob.status == "running",
+                    TrainingJob.cancel_requested.is_(False)
+                )
+                .update({
+                    "status": "succeeded",
+                    "stage": "done",
+                    "progress": 1.0,
+                    "model_id": model.id,
+                    "metrics": model.metrics,
+                    "finished_at": datetime.utcnow()
+                }, synchronize_session=False)
+            )
+            if not updated:
+                raise TrainingCancelled()
+
+        start = time.perf_counter()
+        metrics = _train(db, job, progress, before_activate, n_jobs)
+
+        job_db.refresh(job)
+        job.metrics = json.dumps(metrics)
+        job_db.commit()
+        logger.info(f"Training job {job_id} ({job.model_name}) finished in {time.perf_counter() - start:.1f}s")
+    except TrainingCancelled:
+        db.rollback()
+        _record_failure(job_db, job_id, "cancelled", None)
+        logger.info(f"Training job {job_id} cancelled")
+    except Exception as e:
+        db.rollback()
+        _record_failure(job_db, job_id, "failed", str(e))
+        logger.exception(f"Training job {job_id} failed")
+    finally:
+        db.close()
+        job_db.close()
+        worker_engine.dispose()
+        _discard_inputs(params)
+
+
+def _record_failure(job_db: Session, job_id: int, status: str, error: Optional[str]):
+    job_db.rollback()
+    job_db.query(TrainingJob).filter(
+        TrainingJob.id == job_id,
+        TrainingJob.status == "running"
+    ).update({"status": status, "error": error, "finished_at": datetime.utcnow()}, synchronize_session=False)
+    job_db.commit()
+
+
+class TrainingJobRunner:
+    """Background loop that runs queued training jobs in worker processes.
+
+    At most ``max_concurrent_jobs`` workers run across all API processes:
+    each claimed job takes a slot in the database. Workers are
+    started with the ``spawn`` method so they share no connections or event
+    loop state with the server, and run with lowered priority on a capped set
+    of CPUs so request handling on the same host is not starved.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or TRAINING_JOBS
+        self._task: Optional[asyncio.Task] = None
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, multiprocessing.process.BaseProcess] = {}
+        # job id -> monotonic time cancellation was first seen
+        self._cancel_seen: Dict[int, float] = {}
+
+    def _database_url(self) -> str:
+        return engine.url.render_as_string(hide_password=False)
+
+    def _claim(self, max_jobs: int) -> List[int]:
+        db = SessionLocal()
+        try:
+            return TrainingJobService(db).claim(max_jobs)
+        finally:
+            db.close()
+
+    def _heartbeat_and_reclaim(self, job_ids: List[int]) -> int:
+        db = SessionLocal()
+        try:
+            service = TrainingJobService(db)
+            service.heartbeat(job_ids)
+            return service.reclaim_stale(self.config["stale_after_seconds"])
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, exitcode: Optional[int]) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            return TrainingJobService(db).finish(job_id, exitcode)
+        finally:
+            db.close()
+
+    def _cancel_requested(self, job_ids: List[int]) -> List[int]:
+        db = SessionLocal()
+        try:
+            return [
+                job_id for job_id, in db.query(TrainingJob.id).filter(
+                    TrainingJob.id.in_(job_ids),
+                    TrainingJob.cancel_requested.is_(True)
+                )
+            ]
+        finally:
+            db.close()
+
+    async def _reap(self):
+        """Record the outcome of workers that have exited."""
+        for job_id, worker in list(self._workers.items()):
+            if worker.is_alive():
+                continue
+
+            worker.join()
+            del self._workers[job_id]
+            self._cancel_seen.pop(job_id, None)
+            status = await asyncio.to_thread(self._finish, job_id, worker.exitcode)
+            logger.info(f"Training job {job_id} worker exited with code {worker.exitcode}: {status}")
+            if status == "succeeded":
+                # Pick up the new version here without waiting for the recheck interval
+                model_registry.bump_generation()
+
+    async def _enforce_cancellation(self):
+        """Terminate workers that ignored a cancellation for longer than the grace period."""
+        if not self._workers:
+            return
+
+        cancelled = await asyncio.to_thread(self._cancel_requested, list(self._workers))
+        now = time.monotonic()
+        for job_id in cancelled:
+            seen_at = self._cancel_seen.setdefault(job_id, now)
+            worker = self._workers[job_id]
+            if now - seen_at >= self.config["cancel_grace_seconds"] and worker.is_alive():
+                logger.warning(f"Terminating training job {job_id} after cancellation")
+                worker.terminate()
+
+    def _start_worker(self, job_id: int):
+        worker = self._context.Process(
+            target=run_training_job,
+            args=(job_id, self._database_url(), dict(self.config)),
+            name=f"training-job-{job_id}",
+            # Not a daemon: training may start its own feature worker processes
+            daemon=False
+        )
+        worker.start()
+        self._workers[job_id] = worker
+        logger.info(f"Started training job {job_id} in worker process {worker.pid}")
+
+    async def run_once(self):
+        """Reap finished workers, close jobs of lost runners, enforce cancellations and start queued jobs."""
+        await self._reap()
+        # Jobs of a runner that stopped, e.g. before an API restart, are closed once their heartbeat is stale
+        reclaimed = await asyncio.to_thread(self._heartbeat_and_reclaim, list(self._workers))
+        if reclaimed:
+            logger.warning(f"Closed {reclaimed} training jobs whose worker was lost")
+        await self._enforce_cancellation()
+
+        for job_id in await asyncio.to_thread(self._claim, self.config["max_concurrent_jobs"]):
+            try:
+                self._start_worker(job_id)
+            except Exception as e:
+                logger.error(f"Could not start training job {job_id}: {str(e)}")
+                await asyncio.to_thread(self._finish, job_id, None)
+
+    async def run(self):
+        """Run the job loop continuously."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error in training job loop: {str(e)}")
+
+            await asyncio.sleep(self.config["poll_interval"])
+
+    def start(self):
+        """Start the job loop on the running event loop."""
+        if self._task is None and self.config["enabled"]:
+            self._task = asyncio.get_event_loop().create_task(self.run())
+
+    def stop(self):
+        """Stop the loop and terminate running workers; their jobs are marked failed."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        for job_id, worker in list(self._workers.items()):
+            worker.terminate()
+            worker.join()
+            self._finish(job_id, worker.exitcode)
+        self._workers.clear()
+        self._cancel_seen.clear()
+
+
+training_job_runner = TrainingJobRunner()
@@ -0,0 +1,102 @@
+import asyncio
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.config.ai_config import ENDPOINTS
+from backend.models.ab_test_stats import ABTestVariantStats
+from backend.models.ai_data import ABTest
+from backend.models.campaign import Campaign
+from backend.models.lead import Lead
+from backend.models.user import User
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.ab_test_monitor import ABTestMonitor, two_proportion_z_test
+from backend.services.analytics_service import AnalyticsService
+
+
+def test_z_test_matches_the_pooled_formula():
+    result = two_proportion_z_test([30, 0], [200, 0], [18, 5], [210, 50])
+
+    pooled = 48 / 410
+    z = (30 / 200 - 18 / 210) / math.sqrt(pooled * (1 - pooled) * (1 / 200 + 1 / 210))
+    assert result["z"][0] == pytest.approx(z)
+    assert result["p_value"][0] == pytest.approx(math.erfc(abs(z) / math.sqrt(2)))
+    # A variant without leads gives no evidence either way
+    assert (result["z"][1], result["p_value"][1]) == (0.0, 1.0)
+
+
+@pytest.fixture
+def ab_test(db):
+    user = User("owner@example.com", "hash", "Owner", "Test", "Example")
+    db.add(user)
+    db.flush()
+    campaigns = [Campaign(name=name, type="email", created_by=user.id) for name in ("A", "B")]
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(12)]
+    db.add_all(campaigns + leads)
+    db.flush()
+    test = ABTest(
+        campaign_a_id=campaigns[0].id,
+        campaign_b_id=campaigns[1].id,
+        start_date=datetime.utcnow() - timedelta(days=1)
+    )
+    db.add(test)
+    db.commit()
+
+    monitor = ABTestMonitor(db)
+    for i, lead in enumerate(leads):
+        campaign = campaigns[i % 2]
+        # Repeat exposures and conversions of a lead must count once
+        types = ["viewed", "viewed"] + (["conversion", "conversion"] if i % 3 == 0 else [])
+        for interaction_type in types:
+            interaction = UserItemInteraction(1, 1, interaction_type, lead_id=lead.id, campaign_id=campaign.id)
+            db.add(interaction)
+            monitor.record_interaction(interaction)
+    db.commit()
+    return test
+
+
+def variant_stats(db, test):
+    return {
+        row.variant: (row.exposures, row.unique_leads, row.conversions)
+        for row in db.query(ABTestVariantStats).filter(ABTestVariantStats.ab_test_id == test.id)
+    }
+
+
+def test_counters_match_a_rebuild_from_interactions(db, ab_test):
+    recorded = variant_stats(db, ab_test)
+    # Leads 0, 6 convert on A and 3, 9 on B
+    assert recorded == {"A": (16, 6, 2), "B": (16, 6, 2)}
+
+    ABTestMonitor(db).rebuild([ab_test.id])
+    assert variant_stats(db, ab_test) == recorded
+
+
+def test_results_read_the_exact_counters(db, ab_test, monkeypatch):
+    monkeypatch.setitem(ENDPOINTS, "performance", "test-endpoint")
+    db.query(ABTestVariantStats).filter(ABTestVariantStats.variant == "B").update({"conversions": 5})
+    db.commit()
+
+    results = asyncio.run(
+        AnalyticsService().get_ab_test_results(ab_test.campaign_a_id, ab_test.campaign_b_id, db)
+    )
+
+    assert results["ab_test_id"] == ab_test.id
+    assert results["converted_leads"] == {"A": 2, "B": 5}
+    assert results["exposed_leads"] == {"A": 6, "B": 6}
+    assert results["winner"] == "B"
+    expected = 1.0 - two_proportion_z_test([2], [6], [5], [6])["p_value"][0]
+    assert results["confidence_level"] == pytest.approx(expected)
+
+
+def test_results_without_an_ab_test_count_distinct_leads(db, ab_test, monkeypatch):
+    monkeypatch.setitem(ENDPOINTS, "performance", "test-endpoint")
+
+    # No A/B test runs the campaigns in this order
+    results = asyncio.run(
+        AnalyticsService().get_ab_test_results(ab_test.campaign_b_id, ab_test.campaign_a_id, db)
+    )
+
+    assert results["ab_test_id"] is None
+    assert results["converted_leads"] == {"A": 2, "B": 2}
+    assert results["exposed_leads"] == {"A": 6, "B": 6}
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+import pytest
+
+from backend.services.ai_service import AIService, BatchPredictionError
+
+
+class FakeEndpointService(AIService):
+    """Batches echo their instances; the batch starting with ``flaky`` needs a retry, ``failing`` never succeeds."""
+
+    def __init__(self, flaky=None, failing=None):
+        self.flaky = flaky
+        self.failing = failing
+
+    async def _predict_with_retries(self, endpoint_id, instances, timeout=None):
+        if instances[0] == self.failing:
+            raise RuntimeError("endpoint unavailable")
+        return [{"value": instance} for instance in instances], 2 if instances[0] == self.flaky else 1
+
+
+def test_predictions_keep_instance_order_and_retries_are_logged(caplog):
+    service = FakeEndpointService(flaky=4)
+
+    with caplog.at_level(logging.WARNING):
+        predictions, reports = asyncio.run(service.predict_batches("endpoint", list(range(10)), batch_size=2))
+
+    assert [prediction["value"] for prediction in predictions] == list(range(10))
+    assert [report["attempts"] for report in reports] == [1, 1, 2, 1, 1]
+    assert "1 of 5 batches on endpoint endpoint needed retries" in caplog.text
+
+
+def test_failed_batch_raises_with_its_position():
+    service = FakeEndpointService(failing=6)
+
+    with pytest.raises(BatchPredictionError) as error:
+        asyncio.run(service.predict_batches("endpoint", list(range(10)), batch_size=2))
+
+    assert (error.value.batch, error.value.n_batches) == (3, 5)
@@ -0,0 +1,102 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models.campaign import Campaign
+from backend.models.lead import Lead
+from backend.models.user import User
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.analytics_rollup_service import AnalyticsRollupService
+
+TYPES = ["viewed", "clicked", "conversion"]
+NOW = datetime(2024, 3, 10, 14, 25)
+
+
+@pytest.fixture
+def interactions(db):
+    """Interactions over the last few days, the current hour included, some without a lead."""
+    user = User("owner@example.com", "hash", "Owner", "Test", "Example")
+    db.add(user)
+    db.flush()
+    campaigns = [Campaign(name=f"Campaign {i}", type="email", created_by=user.id) for i in range(3)]
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(6)]
+    db.add_all(campaigns + leads)
+    db.flush()
+
+    interactions = [
+        UserItemInteraction(
+            1,
+            n % 4,
+            TYPES[n % 3],
+            lead_id=leads[n % 7].id if n % 7 < 6 else None,
+            campaign_id=campaigns[n % 2 + (n % 5 == 0)].id,
+            timestamp=NOW - timedelta(hours=(n * 5) % 80, minutes=n % 20),
+        )
+        for n in range(60)
+    ]
+    db.add_all(interactions)
+    db.commit()
+    return campaigns, leads, interactions
+
+
+def raw_campaign_counts(interactions, campaign_id):
+    rows = [row for row in interactions if row.campaign_id == campaign_id]
+    return dict(Counter(row.interaction_type for row in rows)), len({row.lead_id for row in rows} - {None})
+
+
+def raw_lead_summary(interactions, lead_id):
+    rows = [row for row in interactions if row.lead_id == lead_id]
+    return {
+        "interaction_types": dict(Counter(row.interaction_type for row in rows)),
+        "first_interaction": min(row.timestamp for row in rows),
+        "last_interaction": max(row.timestamp for row in rows),
+        "campaigns_engaged": len({row.campaign_id for row in rows})
+    }
+
+
+def test_rebuilt_rollups_match_raw_aggregation(db, interactions):
+    campaigns, leads, rows = interactions
+    service = AnalyticsRollupService(db)
+    service.rebuild()
+
+    counts = service.bulk_campaign_counts([campaign.id for campaign in campaigns], now=NOW, chunk_size=2)
+    for campaign in campaigns:
+        assert counts[campaign.id] == raw_campaign_counts(rows, campaign.id)
+    for lead in leads:
+        assert service.lead_summary(lead.id, now=NOW) == raw_lead_summary(rows, lead.id)
+
+    start = (NOW - timedelta(days=1)).date()
+    in_range = [row for row in rows if row.campaign_id != campaigns[2].id and row.timestamp.date() >= start]
+    assert service.interaction_counts([campaigns[0].id, campaigns[1].id], start, NOW.date(), now=NOW) == dict(
+        Counter(row.interaction_type for row in in_range)
+    )
+
+
+def test_recorded_interactions_match_a_partial_rebuild(db, interactions):
+    campaigns, leads, rows = interactions
+    service = AnalyticsRollupService(db)
+    service.rebuild()
+    # Interactions written after the rebuild, in the open hour and in closed ones
+    for n in range(10):
+        interaction = UserItemInteraction(
+            1,
+            n,
+            TYPES[n % 3],
+            lead_id=leads[n % 3].id,
+            campaign_id=campaigns[n % 3].id,
+            timestamp=NOW - timedelta(hours=n % 3),
+        )
+        db.add(interaction)
+        service.record_interaction(interaction)
+        rows.append(interaction)
+    db.commit()
+
+    campaign_ids = [campaign.id for campaign in campaigns]
+    recorded = service.bulk_campaign_counts(campaign_ids, now=NOW)
+    summaries = [service.lead_summary(lead.id, now=NOW) for lead in leads]
+    service.rebuild(since=NOW - timedelta(days=1))
+
+    assert recorded == service.bulk_campaign_counts(campaign_ids, now=NOW)
+    assert summaries == [service.lead_summary(lead.id, now=NOW) for lead in leads]
+    assert recorded == {campaign_id: raw_campaign_counts(rows, campaign_id) for campaign_id in campaign_ids}
@@ -0,0 +1,66 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.config.ai_config import ENDPOINTS
+from backend.models.campaign import Campaign
+from backend.models.lead import Lead
+from backend.models.user import User
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.analytics_rollup_service import AnalyticsRollupService
+from backend.services.analytics_service import AnalyticsService
+
+TYPES = ["viewed", "clicked", "viewed", "conversion"]
+
+
+@pytest.fixture
+def analytics(monkeypatch):
+    monkeypatch.setitem(ENDPOINTS, "performance", "test-endpoint")
+    return AnalyticsService()
+
+
+def test_campaign_metrics_match_a_python_aggregation(db, analytics):
+    user = User("owner@example.com", "hash", "Owner", "Test", "Example")
+    db.add(user)
+    db.flush()
+    campaigns = [Campaign(name=f"Campaign {i}", type="email", created_by=user.id) for i in range(3)]
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(5)]
+    db.add_all(campaigns + leads)
+    db.flush()
+
+    now = datetime.utcnow()
+    rollups = AnalyticsRollupService(db)
+    interactions = []
+    for n in range(40):
+        interaction = UserItemInteraction(
+            1,
+            n % 6,
+            TYPES[n % 4],
+            # Interactions without a lead count towards totals but not towards distinct leads
+            lead_id=leads[n % 6].id if n % 6 < 5 else None,
+            campaign_id=campaigns[n % 2].id,
+            timestamp=now - timedelta(hours=n * 3),
+        )
+        db.add(interaction)
+        rollups.record_interaction(interaction)
+        interactions.append(interaction)
+    db.commit()
+
+    bulk = analytics._calculate_campaigns_metrics(campaigns, db)
+    for campaign in campaigns:
+        rows = [row for row in interactions if row.campaign_id == campaign.id]
+        types = dict(Counter(row.interaction_type for row in rows))
+        unique_leads = len({row.lead_id for row in rows} - {None})
+        metrics = analytics._calculate_campaign_metrics(campaign, db)
+
+        assert metrics["interaction_types"] == types
+        assert metrics["total_interactions"] == len(rows)
+        assert metrics["unique_leads"] == unique_leads
+        assert metrics["engagement_rate"] == (len(rows) / unique_leads if unique_leads else 0)
+        assert metrics["conversion_rate"] == (types.get("conversion", 0) / unique_leads if unique_leads else 0)
+        assert {key: value for key, value in bulk[campaign.id].items() if key != "timestamp"} == {
+            key: value for key, value in metrics.items() if key != "timestamp"
+        }
+
+    assert bulk[campaigns[2].id]["total_interactions"] == 0
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.analytics_sketch_service import AnalyticsSketchService
+from backend.services.sketches import HyperLogLog, LeadSample, hash_ids
+
+DAY = datetime(2024, 3, 10, 9)
+
+
+@pytest.mark.parametrize("n", [50, 1000, 20000, 200000])
+def test_hyperloglog_estimates_within_three_standard_errors(n):
+    hll = HyperLogLog(12)
+    hll.add_hashes(hash_ids(np.arange(n)))
+    # Repeats do not change the estimate
+    hll.add_hashes(hash_ids(np.arange(n // 2)))
+
+    assert abs(hll.estimate() - n) <= 3 * hll.relative_error * n
+
+
+def test_sketches_of_parts_merge_into_the_sketch_of_the_union():
+    ids = np.arange(5000)
+    parts = [ids[:3000], ids[2000:]]
+    converted = ids % 7 == 0
+
+    whole_hll, whole_sample = HyperLogLog(10), LeadSample(200)
+    whole_hll.add_hashes(hash_ids(ids))
+    whole_sample.add_hashes(hash_ids(ids), converted)
+    merged_hll, merged_sample = HyperLogLog(10), LeadSample(200)
+    for part in parts:
+        part_hll, part_sample = HyperLogLog(10), LeadSample(200)
+        part_hll.add_hashes(hash_ids(part))
+        part_sample.add_hashes(hash_ids(part), converted[part])
+        merged_hll.merge(part_hll)
+        merged_sample.merge(part_sample)
+
+    assert np.array_equal(merged_hll.registers, whole_hll.registers)
+    assert np.array_equal(merged_sample.hashes, whole_sample.hashes)
+    assert np.array_equal(merged_sample.converted, whole_sample.converted)
+    with pytest.raises(ValueError):
+        merged_hll.merge(HyperLogLog(12))
+
+
+def test_sample_rate_interval_covers_the_true_rate():
+    ids = np.arange(100000)
+    sample = LeadSample(1024)
+    sample.add_hashes(hash_ids(ids), ids % 10 < 3)
+
+    rate, low, high = sample.rate(0.95)
+
+    assert len(sample.hashes) == 1024
+    assert low <= 0.3 <= high
+    assert high - low < 0.06
+    assert LeadSample(10).rate() == (None, None, None)
+
+
+def test_recorded_sketches_match_a_rebuild_and_bound_the_exact_reach(db):
+    service = AnalyticsSketchService(db)
+    interactions = []
+    for n in range(3000):
+        lead_id = n % 1700
+        interaction = UserItemInteraction(
+            1,
+            1,
+            "conversion" if lead_id % 4 == 0 else "viewed",
+            lead_id=lead_id,
+            campaign_id=n % 2 + 1,
+            timestamp=DAY + timedelta(days=n % 3),
+        )
+        db.add(interaction)
+        service.record_interaction(interaction)
+        interactions.append(interaction)
+    db.commit()
+
+    start, end = DAY.date(), DAY.date() + timedelta(days=2)
+    recorded = service.reach([1, 2], start, end)
+    single = service.reach([1], start, DAY.date())
+    service.rebuild()
+
+    assert service.reach([1, 2], start, end) == recorded
+    low, high = recorded["unique_leads_interval"]
+    assert low <= 1700 <= high
+    low, high = recorded["lead_conversion_rate_interval"]
+    assert low <= 0.25 <= high
+
+    leads = {row.lead_id for row in interactions if row.campaign_id == 1 and row.timestamp.date() == DAY.date()}
+    low, high = single["unique_leads_interval"]
+    assert low <= len(leads) <= high
+    assert service.reach([3], start, end)["unique_leads"] == 0
+    assert service.reach([1, 2], date(2020, 1, 1), date(2020, 1, 2))["lead_conversion_rate"] is None
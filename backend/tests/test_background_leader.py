@@ -0,0 +1,22 @@
+from backend.services.background_leader import BackgroundJobLeader
+
+
+def test_only_one_process_leads_until_it_releases(tmp_path):
+    config = {"enabled": True, "lock_path": str(tmp_path / "background_jobs.lock")}
+    first, second = BackgroundJobLeader(config), BackgroundJobLeader(config)
+
+    assert first.acquire()
+    assert first.acquire()
+    assert not second.acquire()
+
+    first.release()
+    assert second.acquire()
+    assert not first.acquire()
+    second.release()
+
+
+def test_disabled_hosts_never_lead(tmp_path):
+    leader = BackgroundJobLeader({"enabled": False, "lock_path": str(tmp_path / "background_jobs.lock")})
+
+    assert not leader.acquire()
+    assert not leader.is_leader
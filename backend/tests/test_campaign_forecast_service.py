@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from backend.config.ai_config import ENDPOINTS
+from backend.models.campaign import Campaign
+from backend.models.campaign_forecast import CampaignForecast
+from backend.models.user import User
+from backend.services.analytics_service import AnalyticsService
+
+
+class FakePerformanceEndpoint:
+    """Records the feature rows it is sent and predicts the same for each."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def predict_batches(self, endpoint_id, instances, batch_size):
+        self.requests.append(instances)
+        prediction = {
+            "expected_interactions": 100,
+            "expected_conversions": 5,
+            "expected_engagement_rate": 0.5,
+            "expected_conversion_rate": 0.05,
+            "growth_trajectory": "flat",
+            "confidence": 0.9,
+            "contributing_factors": [],
+            "recommendations": []
+        }
+        return [dict(prediction) for _ in instances], [{"batch": 0, "size": len(instances), "attempts": 1}]
+
+
+@pytest.fixture
+def analytics(monkeypatch):
+    monkeypatch.setitem(ENDPOINTS, "performance", "test-endpoint")
+    service = AnalyticsService()
+    service.ai_service = FakePerformanceEndpoint()
+    return service
+
+
+@pytest.fixture
+def campaigns(db):
+    user = User("owner@example.com", "hash", "Owner", "Test", "Example")
+    db.add(user)
+    db.flush()
+    campaigns = [Campaign(name=f"Campaign {i}", type="email", status="active", created_by=user.id) for i in range(3)]
+    db.add_all(campaigns)
+    db.commit()
+    return campaigns
+
+
+def test_stored_forecasts_are_served_until_refreshed(db, analytics, campaigns):
+    ids = [campaign.id for campaign in campaigns]
+
+    first = asyncio.run(analytics.predict_campaigns_performance(ids, db))
+    second = asyncio.run(analytics.predict_campaigns_performance(ids, db))
+
+    assert [result["source"] for result in first] == ["generated"] * 3
+    assert [result["source"] for result in second] == ["stored"] * 3
+    assert len(analytics.ai_service.requests) == 1
+    assert [row["days_ahead"] for row in analytics.ai_service.requests[0]] == [30] * 3
+    assert db.query(CampaignForecast).count() == 3
+
+    refreshed = asyncio.run(analytics.predict_campaign_performance(ids[0], db, refresh=True))
+    assert refreshed["source"] == "generated"
+
+
+def test_other_horizons_are_generated_without_replacing_stored_forecasts(db, analytics, campaigns):
+    asyncio.run(analytics.predict_campaigns_performance([campaigns[0].id], db))
+    stored_at = db.query(CampaignForecast).one().generated_at
+
+    result = asyncio.run(analytics.predict_campaign_performance(campaigns[0].id, db, days_ahead=90))
+
+    assert (result["source"], result["days_ahead"]) == ("generated", 90)
+    assert analytics.ai_service.requests[-1][0]["days_ahead"] == 90
+    db.expire_all()
+    assert db.query(CampaignForecast).one().generated_at == stored_at
@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from backend.config.ai_config import MODEL_PARAMETERS
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.collaborative_filtering import implicit_als
+from backend.services.collaborative_filtering_service import CollaborativeFilteringService
+from backend.services.model_registry import model_registry
+
+GROUPS = [range(1, 7), range(7, 13)]
+
+
+@pytest.fixture(autouse=True)
+def small_model(monkeypatch, tmp_path):
+    """A small factorization solved in several blocks, with artifacts in a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+    config = MODEL_PARAMETERS["collaborative_filtering"]
+    monkeypatch.setitem(config, "factors", 2)
+    monkeypatch.setitem(config, "regularization", 0.1)
+    monkeypatch.setitem(config, "max_block_bytes", 256)
+    monkeypatch.setitem(config, "query_chunk_size", 7)
+
+
+@pytest.fixture
+def interactions(db):
+    """Two groups of users, each interacting with its own items; every user skipped one item of their group."""
+    rows = []
+    for group, items in enumerate(GROUPS):
+        for user in range(10):
+            user_id = group * 100 + user
+            for n, item_id in enumerate(items):
+                if n == user % len(items):
+                    continue
+                rows.append(UserItemInteraction(user_id, item_id, "viewed"))
+                if n % 2:
+                    rows.append(UserItemInteraction(user_id, item_id, "purchased"))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_interaction_matrix_sums_weights_per_user_and_item(db, interactions):
+    config = MODEL_PARAMETERS["collaborative_filtering"]
+    weights = defaultdict(float)
+    for row in interactions:
+        weights[row.user_id, row.item_id] += config["interaction_weights"][row.interaction_type]
+
+    matrix, user_ids, item_ids = CollaborativeFilteringService(db)._interaction_matrix()
+
+    assert matrix.nnz == len(weights)
+    for (user_id, item_id), weight in weights.items():
+        row, col = list(user_ids).index(user_id), list(item_ids).index(item_id)
+        assert matrix[row, col] == pytest.approx(1.0 + config["alpha"] * weight)
+
+
+def test_users_are_recommended_the_unseen_item_of_their_group(db, interactions):
+    metrics = CollaborativeFilteringService(db).train_model()
+    assert (metrics["n_users"], metrics["n_items"]) == (20, 12)
+
+    service = CollaborativeFilteringService(db)
+    for group, items in enumerate(GROUPS):
+        for user in range(10):
+            recommendations = service.recommend_items(group * 100 + user, n_recommendations=3)
+            seen = {row.item_id for row in interactions if row.user_id == group * 100 + user}
+
+            assert recommendations[0]["item_id"] == items[user % len(items)]
+            assert not seen & {item["item_id"] for item in recommendations}
+
+    assert service.recommend_items(999) == []
+
+
+def test_solving_in_blocks_matches_a_single_block(db, interactions):
+    matrix, _, _ = CollaborativeFilteringService(db)._interaction_matrix()
+
+    blocked = implicit_als(matrix, factors=2, regularization=0.1, iterations=5, max_block_bytes=256)
+    whole = implicit_als(matrix, factors=2, regularization=0.1, iterations=5, max_block_bytes=10 ** 9)
+
+    for blocked_factors, whole_factors in zip(blocked, whole):
+        assert np.allclose(blocked_factors, whole_factors, atol=1e-4)
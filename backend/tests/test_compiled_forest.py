@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from backend.services.compiled_forest import CompiledForest
+from backend.services.model_artifacts import save_artifact, load_artifact
+
+
+def synthetic_features(n_rows: int, rng: np.random.Generator) -> np.ndarray:
+    """Rows shaped like LeadScoringService FEATURE_NAMES."""
+    return np.column_stack([
+        rng.integers(0, 2, n_rows),              # has_company
+        rng.integers(0, 2, n_rows),              # has_phone
+        rng.poisson(12, n_rows),                 # total_events
+        rng.poisson(1, n_rows),                  # form_submissions
+        rng.poisson(8, n_rows),                  # page_views
+        rng.poisson(0.5, n_rows),                # resource_downloads
+        rng.lognormal(4, 1.5, n_rows).round(),   # company_size
+        rng.integers(0, 720, n_rows),            # days_since_creation
+    ]).astype(np.float64)
+
+
+@pytest.fixture(scope="module")
+def trained():
+    """Forest and scaler trained with the settings of LeadScoringService.train_model, plus held-out rows."""
+    rng = np.random.default_rng(42)
+    X = synthetic_features(5000, rng)
+    logits = 0.4 * X[:, 3] + 0.8 * X[:, 5] + 0.05 * X[:, 4] - 0.002 * X[:, 7] + rng.normal(size=len(X))
+    y = (logits > 1.0).astype(int)
+
+    scaler = StandardScaler()
+    forest = RandomForestClassifier(n_estimators=50, max_depth=10, random_state=42)
+    forest.fit(scaler.fit_transform(X), y)
+    return forest, scaler, synthetic_features(2000, rng)
+
+
+def test_predict_proba_one_matches_sklearn(trained):
+    forest, scaler, X_test = trained
+    compiled = CompiledForest.from_sklearn(forest, scaler)
+    expected = forest.predict_proba(scaler.transform(X_test))
+
+    for row, probabilities in zip(X_test[:300], expected):
+        np.testing.assert_array_equal(compiled.predict_proba_one(row), probabilities)
+
+
+def test_batch_predict_proba_matches_sklearn(trained):
+    forest, scaler, X_test = trained
+    compiled = CompiledForest.from_sklearn(forest, scaler)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X_test), forest.predict_proba(scaler.transform(X_test)))
+
+
+def test_artifact_round_trip_matches_sklearn(trained, tmp_path):
+    forest, scaler, X_test = trained
+    compiled = CompiledForest.from_sklearn(forest, scaler)
+    path = save_artifact(str(tmp_path / "lead_scoring"), compiled.to_arrays(), compiled.to_objects())
+    loaded = CompiledForest.from_arrays(*load_artifact(path))
+    expected = forest.predict_proba(scaler.transform(X_test))
+
+    np.testing.assert_array_equal(loaded.predict_proba(X_test), expected)
+    np.testing.assert_array_equal(loaded.predict_proba_one(X_test[0]), expected[0])
+    np.testing.assert_array_equal(loaded.feature_importances_, forest.feature_importances_)
@@ -0,0 +1,71 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from backend.models.event import Event
+from backend.models.lead import Lead
+from backend.models.lead_feature import LeadEventBucket
+from backend.services.event_service import EventService
+from backend.services.feature_store_service import FeatureStoreService
+
+EVENT_TYPES = ["form_submitted", "page_viewed", "resource_downloaded"]
+
+
+def raw_counts(db, since):
+    """Per-lead event type counts aggregated straight from the events table."""
+    counts = defaultdict(Counter)
+    start = datetime.combine(since.date(), datetime.min.time())
+    for event in db.query(Event).filter(Event.lead_id.isnot(None), Event.timestamp >= start):
+        counts[event.lead_id][event.event_type] += 1
+    return {lead_id: dict(counter) for lead_id, counter in counts.items()}
+
+
+def test_tracked_events_are_counted_in_buckets(db):
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(4)]
+    db.add_all(leads)
+    db.commit()
+
+    events = EventService(db)
+    for i, lead in enumerate(leads):
+        for n in range(3 * i):
+            events.track_event(EVENT_TYPES[n % 3], {"page": f"/p{n}"}, lead_id=lead.id)
+    events.track_event("page_viewed", {"page": "/"})
+
+    since = datetime.utcnow() - timedelta(days=30)
+    counts = FeatureStoreService(db).get_event_counts([lead.id for lead in leads], since)
+
+    assert counts == raw_counts(db, since)
+    assert counts[leads[3].id] == {event_type: 3 for event_type in EVENT_TYPES}
+    assert leads[0].id not in counts
+
+
+def test_rebuild_matches_raw_aggregation_across_days(db):
+    now = datetime.utcnow()
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(5)]
+    db.add_all(leads)
+    db.flush()
+    db.add_all(
+        Event(
+            lead_id=lead.id,
+            event_type=EVENT_TYPES[(i + n) % 3],
+            properties={},
+            timestamp=now - timedelta(days=(i * 7 + n * 3) % 50, hours=n),
+        )
+        for i, lead in enumerate(leads)
+        for n in range(12)
+    )
+    db.commit()
+    lead_ids = [lead.id for lead in leads]
+    store = FeatureStoreService(db)
+
+    assert store.rebuild() > 0
+    for days in (1, 7, 30, 60):
+        since = now - timedelta(days=days)
+        assert store.get_event_counts(lead_ids, since, chunk_size=2) == raw_counts(db, since)
+
+    # A partial rebuild rewrites only the recent buckets
+    db.query(LeadEventBucket).update({LeadEventBucket.count: LeadEventBucket.count + 100})
+    db.commit()
+    store.rebuild(since=now - timedelta(days=10))
+    since = now - timedelta(days=10)
+    assert store.get_event_counts(lead_ids, since) == raw_counts(db, since)
+    assert store.get_event_counts(lead_ids, now - timedelta(days=60)) != raw_counts(db, now - timedelta(days=60))
@@ -0,0 +1,61 @@
+import pytest
+
+from backend.models.event import Event
+from backend.models.lead import Lead
+from backend.models.lead_facet import LeadFacetSummary
+from backend.services.lead_facet_service import LeadFacetService, lead_facet_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    lead_facet_cache.clear()
+    yield
+    lead_facet_cache.clear()
+
+
+@pytest.fixture
+def leads(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            data={"company": {"industry": "software", "employees": 10 ** i}},
+        )
+        for i in range(5)
+    ]
+    db.add_all(leads)
+    db.flush()
+    db.add(Event(lead_id=leads[0].id, event_type="page_view", properties={"interests": ["pricing", "api"]}))
+    db.commit()
+    return leads
+
+
+def test_rebuild_writes_every_summary_and_keeps_the_session_usable(db, leads):
+    lead = leads[0]
+
+    assert LeadFacetService(db).rebuild(chunk_size=2) == len(leads)
+
+    assert lead in db
+    assert lead.email == "lead0@example.com"
+    summaries = {summary.lead_id: summary for summary in db.query(LeadFacetSummary)}
+    assert set(summaries) == {lead.id for lead in leads}
+    assert summaries[lead.id].interests == ["api", "pricing"]
+    assert summaries[leads[3].id].employee_bucket > summaries[leads[0].id].employee_bucket
+
+
+def test_unsummarized_leads_are_derived_on_read_without_being_written(db, leads):
+    facets = LeadFacetService(db).get_facets([leads[0].id])
+
+    assert facets[leads[0].id]["interests"] == frozenset({"api", "pricing"})
+    assert facets[leads[0].id]["industry"] == "software"
+    assert db.query(LeadFacetSummary).count() == 0
+
+
+def test_recording_a_lead_creates_its_summary(db, leads):
+    leads[1].data = {"company": {"industry": "retail", "employees": 50}}
+    LeadFacetService(db).record_lead(leads[1])
+    db.commit()
+
+    summary = db.query(LeadFacetSummary).one()
+    assert (summary.lead_id, summary.industry) == (leads[1].id, "retail")
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from backend.models.ai_model import AIModel
+from backend.models.lead import Lead
+from backend.services.feature_store_service import FeatureStoreService
+from backend.services.lead_scoring_service import LeadScoringService
+from backend.services.model_registry import model_registry
+
+EVENT_TYPES = ["form_submitted", "page_viewed", "resource_downloaded"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch, tmp_path):
+    """Artifacts in a temporary directory and no versions cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+
+
+def test_superseded_artifacts_are_pruned(db):
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(8)]
+    db.add_all(leads)
+    db.commit()
+    training_data = [{"lead_id": lead.id, "converted": i % 2 == 0} for i, lead in enumerate(leads)]
+
+    for _ in range(5):
+        LeadScoringService(db).train_model(training_data, n_jobs=1)
+
+    kept = db.query(AIModel).filter(AIModel.filepath.isnot(None)).order_by(AIModel.version).all()
+    assert [model.version for model in kept] == [3, 4, 5]
+    assert kept[-1].is_active
+    assert LeadScoringService(db).score_lead(leads[0]) is not None
+
+
+def test_batch_scores_match_single_lead_scores(db):
+    now = datetime.utcnow()
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name="Lead",
+            last_name=str(i),
+            company="Example" if i % 2 else None,
+            phone="555-0100" if i % 3 == 0 else None,
+            data={"company": {"employees": 25 * i}},
+            created_at=now - timedelta(days=3 * i),
+        )
+        for i in range(12)
+    ]
+    db.add_all(leads)
+    db.commit()
+    store = FeatureStoreService(db)
+    for i, lead in enumerate(leads):
+        for n in range(i % 5):
+            store.record_event(lead.id, EVENT_TYPES[n % 3], now - timedelta(days=n * 10))
+    db.commit()
+    training_data = [{"lead_id": lead.id, "converted": i % 5 > 1} for i, lead in enumerate(leads)]
+    LeadScoringService(db).train_model(training_data, n_jobs=1)
+
+    service = LeadScoringService(db)
+    single = [service.score_lead(lead) for lead in leads]
+    assert len(set(single)) > 1
+    results = service.batch_score_leads(leads)
+
+    assert np.allclose(service.score_leads(leads), single)
+    assert [result["lead_id"] for result in results] == [lead.id for lead in leads]
+    assert np.allclose([result["score"] for result in results], single)
+    db.expire_all()
+    assert np.allclose([lead.lead_score for lead in leads], single)
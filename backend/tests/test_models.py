@@ -0,0 +1,40 @@
+from backend.models.action import Action
+from backend.models.campaign import Campaign, campaign_members
+from backend.models.lead import Lead
+from backend.models.trigger import Trigger
+from backend.models.user import User
+from backend.models.workflow import Workflow
+
+
+def test_campaign_leads_are_a_membership_list(db):
+    user = User("owner@example.com", "hash", "Owner", "Test", "Example")
+    db.add(user)
+    db.flush()
+    campaign = Campaign(name="Spring", type="email", created_by=user.id)
+    lead = Lead(email="lead@example.com", first_name="Lead", last_name="Test")
+    db.add_all([campaign, lead])
+    db.flush()
+
+    campaign.leads.append(lead)
+    db.commit()
+
+    assert lead in campaign.leads
+    assert lead.campaigns == [campaign]
+    assert user.campaigns == [campaign]
+
+    db.delete(lead)
+    db.commit()
+    assert db.query(campaign_members).count() == 0
+
+
+def test_workflow_actions_span_its_triggers(db):
+    workflow = Workflow("Nurture", "", True, None)
+    db.add(workflow)
+    db.flush()
+    triggers = [Trigger("email_opened", workflow.id), Trigger("form_submitted", workflow.id)]
+    db.add_all(triggers)
+    db.flush()
+    db.add_all([Action("send_email", triggers[0].id), Action("update_lead", triggers[1].id)])
+    db.commit()
+
+    assert sorted(action.type for action in workflow.actions) == ["send_email", "update_lead"]
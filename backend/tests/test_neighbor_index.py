@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from backend.services.neighbor_index import NeighborIndex, build_neighbor_index
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    """L2-normalized sparse rows with random weights, so no two similarities tie."""
+    rng = np.random.default_rng(7)
+    dense = rng.random((60, 40)) * (rng.random((60, 40)) < 0.15)
+    dense[5] = 0.0  # a row with no terms has no neighbors
+    return normalize(sparse.csr_matrix(dense))
+
+
+def brute_force_top_k(matrix, k):
+    similarities = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(similarities, 0.0)
+    lists = []
+    for row in similarities:
+        order = np.argsort(-row, kind="stable")[:k]
+        lists.append([(int(column), row[column]) for column in order if row[column] > 0])
+    return lists
+
+
+def test_chunked_index_matches_brute_force(matrix):
+    # Budget of a few query rows per chunk, so rows are spread over many chunks
+    index = build_neighbor_index(matrix, k=8, chunk_rows=1024, max_chunk_bytes=3 * (40 * 4 + 60 * 16))
+
+    for row, expected in enumerate(brute_force_top_k(matrix, 8)):
+        rows, scores = index.neighbors(row)
+        assert rows.tolist() == [column for column, _ in expected]
+        np.testing.assert_allclose(scores, [score for _, score in expected], rtol=1e-5)
+    assert index.neighbors(5)[0].size == 0
+
+
+def test_external_ids_map_to_rows_in_any_order(matrix):
+    ids = np.random.default_rng(1).permutation(np.arange(1000, 1060))
+    index = build_neighbor_index(matrix, ids=ids, k=5)
+    restored = NeighborIndex.from_arrays(index.to_arrays())
+
+    assert [restored.row_of(lead_id) for lead_id in ids] == list(range(60))
+    assert restored.row_of(999) is None
+    assert restored.row_of(5000) is None
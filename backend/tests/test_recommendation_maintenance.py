@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models.ai_model import AIModel
+from backend.models.lead import Lead
+from backend.models.recommendation_list import RecommendationList
+from backend.models.recommendation_update_queue import RecommendationUpdateQueue
+from backend.models.training_job import TrainingJob
+from backend.config.ai_config import MODEL_PARAMETERS
+from backend.services.model_registry import model_registry
+from backend.services.recommendation_list_service import RecommendationListService
+from backend.services.recommendation_maintenance import RecommendationMaintenanceScheduler
+from backend.services.recommendation_service import RecommendationService
+
+INDUSTRIES = ["software", "retail", "finance", "healthcare"]
+SIZES = ["small", "medium", "large"]
+
+MAINTENANCE = {
+    "enabled": False,
+    "poll_interval": 60,
+    "fold_in_interval": 300,
+    "fold_in_batch_size": 10,
+    "compaction_interval": 3600,
+    "keep_artifacts": 3,
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch, tmp_path):
+    """Artifacts in a temporary directory and no versions cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+
+
+@pytest.fixture
+def leads(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company=f"{INDUSTRIES[i % 4]} corp",
+            data={"industry": INDUSTRIES[i % 4], "company_size": SIZES[i % 3]},
+        )
+        for i in range(30)
+    ]
+    db.add_all(leads)
+    db.commit()
+    return leads
+
+
+def stored_lists(db):
+    return {
+        row.lead_id: (row.model_version, [item["lead_id"] for item in row.recommendations])
+        for row in db.query(RecommendationList)
+    }
+
+
+def test_fold_in_rewrites_only_affected_lists(db, leads, monkeypatch):
+    monkeypatch.setitem(MODEL_PARAMETERS["recommendation"], "index_neighbors", 3)
+    RecommendationService(db).train_model_streaming()
+    RecommendationListService(db).refresh()
+
+    changed = [leads[0].id, leads[1].id]
+    for lead in leads[:2]:
+        lead.data = {"industry": "manufacturing", "company_size": "large"}
+    service = RecommendationService(db)
+    assert service.queue_updates(changed + [10 ** 6]) == 2
+    db.commit()
+    service.update_queued_leads()
+
+    assert db.query(RecommendationUpdateQueue).count() == 0
+    service = RecommendationService(db)
+    assert service.base_version == 1
+    assert set(changed) <= set(service.affected_ids.tolist())
+    assert len(service.affected_ids) < len(leads)
+
+    run = RecommendationListService(db).refresh()
+    incremental = stored_lists(db)
+    assert run.model_version == 2
+    assert run.n_leads == len(leads)
+
+    RecommendationListService(db).refresh(force=True)
+    assert stored_lists(db) == incremental
+
+
+def test_leads_queued_during_a_fold_in_stay_queued(db, leads):
+    RecommendationService(db).train_model_streaming()
+    service = RecommendationService(db)
+    service.queue_updates([leads[0].id, leads[1].id], at=datetime(2024, 1, 1))
+    db.commit()
+
+    def requeue(session, model):
+        service.queue_updates([leads[1].id])
+
+    service.update_queued_leads(before_activate=requeue)
+
+    assert [row.lead_id for row in db.query(RecommendationUpdateQueue)] == [leads[1].id]
+
+
+def test_scheduler_queues_one_fold_in_then_compaction(db, leads):
+    scheduler = RecommendationMaintenanceScheduler(MAINTENANCE)
+    assert scheduler.schedule(db)["job"] is None
+
+    RecommendationService(db).train_model_streaming()
+    start = datetime.utcnow()
+    RecommendationService(db).queue_updates([leads[0].id], at=start)
+    db.commit()
+
+    assert scheduler.schedule(db, now=start)["job"] is None
+    assert scheduler.schedule(db, now=start + timedelta(seconds=301))["job"] == "update"
+    assert scheduler.schedule(db, now=start + timedelta(seconds=302))["job"] is None
+
+    db.query(TrainingJob).delete()
+    RecommendationService(db).update_queued_leads()
+    assert scheduler.schedule(db, now=start + timedelta(seconds=303))["job"] is None
+    assert scheduler.schedule(db, now=start + timedelta(hours=2))["job"] == "compact"
+
+
+def test_superseded_artifacts_are_pruned(db, leads):
+    service = RecommendationService(db)
+    for _ in range(5):
+        service.train_model_streaming()
+
+    kept = db.query(AIModel).filter(AIModel.filepath.isnot(None)).order_by(AIModel.version).all()
+    assert [model.version for model in kept] == [3, 4, 5]
+    assert kept[-1].is_active
@@ -0,0 +1,139 @@
+import pytest
+from sqlalchemy import event
+
+from backend.models.lead import Lead
+from backend.services.lead_facet_service import lead_facet_cache
+from backend.services.model_registry import model_registry
+from backend.services.recommendation_service import RecommendationService
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch, tmp_path):
+    """Artifacts in a temporary directory and no models or facets cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+    lead_facet_cache.clear()
+    yield
+    lead_facet_cache.clear()
+
+
+def test_deleted_leads_are_not_recommended_from_cached_facets(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company="software corp",
+            data={"industry": "software", "company_size": "small"},
+        )
+        for i in range(5)
+    ]
+    db.add_all(leads)
+    db.commit()
+    RecommendationService(db).train_model_streaming()
+
+    service = RecommendationService(db)
+    recommended = [item["lead_id"] for item in service.get_recommendations(leads[0], n_recommendations=4)]
+    assert leads[1].id in recommended
+
+    deleted_id = leads[1].id
+    db.delete(leads[1])
+    db.commit()
+
+    recommended = [item["lead_id"] for item in service.get_recommendations(leads[0], n_recommendations=4)]
+    assert deleted_id not in recommended
+    assert recommended
+
+
+def test_deleted_leads_are_dropped_before_taking_the_top_n(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company="software corp",
+            data={"industry": "software", "company_size": "small"},
+        )
+        for i in range(6)
+    ]
+    db.add_all(leads)
+    db.commit()
+    RecommendationService(db).train_model_streaming()
+
+    service = RecommendationService(db)
+    top = [item["lead_id"] for item in service.get_recommendations(leads[0], n_recommendations=2)]
+    for lead in leads[1:]:
+        if lead.id in top:
+            db.delete(lead)
+    db.commit()
+
+    single = service.get_recommendations(leads[0], n_recommendations=2)
+    batch = next(service.iter_batch_recommendations([leads[0].id], n_recommendations=2))["recommendations"]
+
+    assert len(single) == 2
+    assert not {item["lead_id"] for item in single} & set(top)
+    assert [item["lead_id"] for item in batch] == [item["lead_id"] for item in single]
+
+
+def test_reloaded_model_maps_leads_to_rows_without_reading_profiles(db, engine, monkeypatch):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company=f"{['software', 'retail'][i % 2]} corp",
+            data={"industry": ["software", "retail"][i % 2], "company_size": "small"},
+        )
+        for i in range(8)
+    ]
+    db.add_all(leads)
+    db.commit()
+    RecommendationService(db).train_model(leads)
+    expected = RecommendationService(db).get_recommendations(leads[2], n_recommendations=3)
+
+    # A fresh process: the artifact is loaded from disk
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+    service = RecommendationService(db)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        recommendations = service.get_recommendations(leads[2], n_recommendations=3)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert recommendations == expected
+    assert service.model.row_of(leads[2].id) is not None
+    # Only the existence check and facet lookups; no query over every lead's profile
+    assert not [statement for statement in statements if "FROM leads" in statement and "WHERE" not in statement]
+
+
+def test_batch_recommendations_match_single_lead_recommendations(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company=f"{['software', 'retail', 'finance'][i % 3]} corp",
+            data={"industry": ["software", "retail", "finance"][i % 3], "company_size": ["small", "large"][i % 2]},
+        )
+        for i in range(10)
+    ]
+    db.add_all(leads)
+    db.commit()
+    RecommendationService(db).train_model_streaming()
+
+    service = RecommendationService(db)
+    lead_ids = [lead.id for lead in reversed(leads)] + [10 ** 6]
+    batch = list(service.iter_batch_recommendations(lead_ids, n_recommendations=3, explain=True, chunk_size=4))
+
+    assert [result["lead_id"] for result in batch] == lead_ids
+    assert batch[-1]["recommendations"] == []
+    for lead, result in zip(reversed(leads), batch):
+        assert result["recommendations"] == service.get_recommendations(lead, n_recommendations=3)
+    assert all(result["recommendations"] for result in batch[:-1])
@@ -0,0 +1,100 @@
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import backend
+from backend.database import get_db
+from backend.models.lead import Lead
+from backend.models.recommendation_list import RecommendationList
+from backend.services.lead_facet_service import lead_facet_cache
+from backend.services.model_registry import model_registry
+from backend.services.recommendation_list_service import RecommendationListService
+from backend.services.recommendation_service import RecommendationService
+
+
+def load_ai_router():
+    """The AI router module on its own: the routers package also imports schemas these tests do not need."""
+    path = Path(backend.__file__).parent / "routers" / "ai.py"
+    spec = importlib.util.spec_from_file_location("backend.routers.ai", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.router
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch, tmp_path):
+    """Artifacts in a temporary directory and no models or facets cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+    lead_facet_cache.clear()
+    yield
+    lead_facet_cache.clear()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(load_ai_router())
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+@pytest.fixture
+def leads(db):
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            company="software corp",
+            data={"industry": "software", "company_size": "small"},
+        )
+        for i in range(6)
+    ]
+    db.add_all(leads)
+    db.commit()
+    return leads
+
+
+def test_empty_stored_list_is_served_as_is(db, client, leads):
+    db.add(RecommendationList(lead_id=leads[0].id, model_version=1, recommendations=[], computed_at=datetime.utcnow()))
+    db.commit()
+
+    response = client.post(f"/ai/leads/{leads[0].id}/recommendations")
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert response.headers["X-Recommendations-Source"] == "precomputed"
+
+
+def test_previous_lists_are_served_until_the_refresh_after_activation(db, client, leads):
+    RecommendationService(db).train_model_streaming()
+    RecommendationListService(db).refresh()
+    RecommendationService(db).train_model_streaming()
+    url = f"/ai/leads/{leads[0].id}/recommendations"
+
+    response = client.post(url)
+    assert response.status_code == 200
+    assert response.json()
+    assert response.headers["X-Recommendations-Source"] == "precomputed"
+    assert response.headers["X-Recommendations-Model-Version"] == "1"
+
+    RecommendationListService(db).refresh()
+    response = client.post(url)
+    assert response.headers["X-Recommendations-Source"] == "precomputed"
+    assert response.headers["X-Recommendations-Model-Version"] == "2"
+
+
+def test_lead_without_a_list_is_computed_live(db, client, leads):
+    RecommendationService(db).train_model_streaming()
+
+    response = client.post(f"/ai/leads/{leads[0].id}/recommendations")
+
+    assert response.status_code == 200
+    assert response.headers["X-Recommendations-Source"] == "live"
+    assert leads[1].id in [item["lead_id"] for item in response.json()]
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from backend.models.lead_rescore_queue import LeadRescoreQueue
+from backend.services import rescoring_service
+from backend.services.rescoring_service import RescoringService
+
+
+def mark_leads(db, lead_ids, start):
+    service = RescoringService(db)
+    for offset, lead_id in enumerate(lead_ids):
+        service.mark_dirty(lead_id, start + timedelta(seconds=offset))
+    db.commit()
+
+
+def test_concurrent_claims_do_not_overlap(session_factory):
+    worker_a, worker_b = session_factory(), session_factory()
+    start = datetime(2024, 1, 1)
+    mark_leads(worker_a, range(1, 6), start)
+
+    _, claimed_a = RescoringService(worker_a).claim(3, claim_timeout=600, now=start + timedelta(minutes=1))
+    _, claimed_b = RescoringService(worker_b).claim(3, claim_timeout=600, now=start + timedelta(minutes=1))
+
+    assert claimed_a == [1, 2, 3]
+    assert sorted(claimed_b) == [4, 5]
+    assert RescoringService(worker_a).claim(3, claim_timeout=600, now=start + timedelta(minutes=2))[1] == []
+
+
+def test_stale_claims_are_taken_over(db):
+    start = datetime(2024, 1, 1)
+    mark_leads(db, [1, 2], start)
+    service = RescoringService(db)
+
+    service.claim(10, claim_timeout=600, now=start)
+    token, lead_ids = service.claim(10, claim_timeout=600, now=start + timedelta(seconds=601))
+
+    assert sorted(lead_ids) == [1, 2]
+    assert db.query(LeadRescoreQueue).filter(LeadRescoreQueue.claim_token == token).count() == 2
+
+
+def test_release_keeps_leads_marked_during_the_batch(db):
+    start = datetime(2024, 1, 1)
+    mark_leads(db, [1, 2], start)
+    service = RescoringService(db)
+
+    snapshot = start + timedelta(minutes=1)
+    token, _ = service.claim(10, claim_timeout=600, now=snapshot)
+    service.mark_dirty(2, snapshot + timedelta(seconds=5))
+    service.release(token, snapshot)
+
+    remaining = db.query(LeadRescoreQueue).all()
+    assert [(row.lead_id, row.claim_token) for row in remaining] == [(2, None)]
+
+
+def test_batch_of_deleted_leads_counts_as_claimed(db, monkeypatch):
+    class ScoringService:
+        model = object()
+
+        def __init__(self, db):
+            pass
+
+        def batch_score_leads(self, leads):
+            return []
+
+    monkeypatch.setattr(rescoring_service, "LeadScoringService", ScoringService)
+    mark_leads(db, [1, 2], datetime(2024, 1, 1))
+
+    assert RescoringService(db).rescore_batch(10, claim_timeout=600) == (2, 0)
+    assert db.query(LeadRescoreQueue).count() == 0
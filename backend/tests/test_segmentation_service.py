@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.config.ai_config import MODEL_PARAMETERS
+from backend.models.lead import Lead
+from backend.models.lead_segment import LeadSegment
+from backend.models.user_item_interaction import UserItemInteraction
+from backend.services.model_registry import model_registry
+from backend.services.segmentation_service import SegmentationService
+
+TYPES = ["viewed", "clicked", "purchased", "conversion"]
+
+
+@pytest.fixture(autouse=True)
+def local_segmentation(monkeypatch, tmp_path):
+    """In-process model only, with artifacts in a temporary directory and nothing cached from other tests."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_registry, "_artifacts", {})
+    monkeypatch.setattr(model_registry, "_active", {})
+    monkeypatch.setitem(MODEL_PARAMETERS["segmentation"], "backend", "local")
+    monkeypatch.setitem(MODEL_PARAMETERS["segmentation"]["local_model"], "n_clusters", 3)
+
+
+@pytest.fixture
+def leads(db):
+    now = datetime.utcnow()
+    leads = [
+        Lead(
+            email=f"lead{i}@example.com",
+            first_name=f"Lead{i}",
+            last_name="Test",
+            lead_score=i / 40,
+            created_at=now - timedelta(days=i * 7),
+            # Some leads were never enriched; one has a budget that is not a number
+            data={"company": {"industry": "software", "employees": 10 * i}, "budget": "unknown" if i == 3 else i * 1000}
+            if i % 4 else {},
+        )
+        for i in range(40)
+    ]
+    db.add_all(leads)
+    db.flush()
+    db.add_all(
+        UserItemInteraction(
+            user_id=1,
+            lead_id=lead.id,
+            item_id=n,
+            interaction_type=TYPES[(i + n) % 4],
+            timestamp=now - timedelta(days=i + n),
+        )
+        for i, lead in enumerate(leads)
+        for n in range(i % 6)
+    )
+    db.commit()
+    return leads
+
+
+def test_features_come_from_lead_columns_and_interactions(db, leads):
+    service = SegmentationService()
+    bulk = service.prepare_batch_segmentation_features(leads, db)
+
+    for lead, features in zip(leads, bulk):
+        assert features == service.prepare_segmentation_features(lead, db)
+
+    assert bulk[5]["company_size"] == 50.0
+    assert bulk[5]["score"] == 5 / 40
+    assert bulk[5]["budget"] == 5000.0
+    assert bulk[3]["budget"] == 0.0
+    assert bulk[4]["company_size"] == 0.0
+    assert bulk[0]["days_since_last_interaction"] == 999
+    assert bulk[7]["days_since_last_interaction"] == 7
+
+
+def test_batch_features_use_one_grouped_query_per_chunk(db, engine, leads, monkeypatch):
+    monkeypatch.setitem(MODEL_PARAMETERS["segmentation"], "feature_chunk_size", 15)
+    # A type outside the configured ones still counts towards the totals
+    db.add(UserItemInteraction(user_id=1, lead_id=leads[5].id, item_id=99, interaction_type="shared"))
+    db.commit()
+    service = SegmentationService()
+    batch = leads + [leads[5]]
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        bulk = service.prepare_batch_segmentation_features(batch, db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len([statement for statement in statements if "user_item_interactions" in statement]) == 3
+    assert bulk[-1] == bulk[5]
+    for lead, features in zip(batch, bulk):
+        assert features == service.prepare_segmentation_features(lead, db)
+
+
+def test_local_model_trains_and_assigns_real_leads(db, leads):
+    service = SegmentationService()
+    metrics = asyncio.run(service.train_local_model(db))
+    assert metrics["n_samples"] == len(leads)
+
+    results = asyncio.run(service.batch_segment_leads(leads, db))
+
+    assert [result["lead_id"] for result in results] == [lead.id for lead in leads]
+    assert {result["segment"] for result in results} <= set(service.segment_mapping.values())
+    assert db.query(LeadSegment).count() == len(leads)
+
+
+def test_interrupted_sweep_resumes_after_last_committed_chunk(db, leads, monkeypatch):
+    monkeypatch.setitem(MODEL_PARAMETERS["segmentation"], "sweep_chunk_size", 20)
+    service = SegmentationService()
+    asyncio.run(service.train_local_model(db))
+
+    predicted = []
+    predict = service._predict
+
+    async def interrupted(all_features, db):
+        if predicted:
+            raise RuntimeError("worker stopped")
+        predicted.extend(features["lead_id"] for features in all_features)
+        return await predict(all_features, db)
+
+    monkeypatch.setattr(service, "_predict", interrupted)
+    run = service.start_run(db)
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.segment_all_leads(db, run))
+
+    assert run.status == "failed"
+    assert run.last_lead_id == leads[19].id
+    assert predicted == [lead.id for lead in leads[:20]]
+    assert db.query(LeadSegment).count() == 20
+
+    resumed = service.start_run(db)
+    assert resumed.id == run.id
+    calls = []
+
+    async def recorded(all_features, db):
+        calls.extend(features["lead_id"] for features in all_features)
+        return await predict(all_features, db)
+
+    monkeypatch.setattr(service, "_predict", recorded)
+    asyncio.run(service.segment_all_leads(db, resumed))
+
+    assert resumed.status == "succeeded"
+    assert calls == [lead.id for lead in leads[20:]]
+    assert (resumed.processed, resumed.predicted) == (40, 40)
+    assert db.query(LeadSegment).count() == 40
@@ -0,0 +1,188 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.lead import Lead
+from backend.models.training_job import TrainingJob
+from backend.services.lead_scoring_service import save_training_data
+from backend.services.training_job_service import TrainingJobService, run_training_job
+
+
+def test_claim_takes_oldest_queued_jobs_once(session_factory):
+    first, second = session_factory(), session_factory()
+    jobs = [TrainingJobService(first).submit("recommendation") for _ in range(3)]
+
+    claimed = TrainingJobService(first).claim(2)
+    assert claimed == [jobs[0].id, jobs[1].id]
+    # The limit counts jobs running anywhere, not just those this runner claimed
+    assert TrainingJobService(second).claim(2) == []
+    assert TrainingJobService(second).claim(3) == [jobs[2].id]
+    assert TrainingJobService(second).claim(4) == []
+
+    statuses = {job.id: job.status for job in second.query(TrainingJob)}
+    assert set(statuses.values()) == {"running"}
+
+
+def test_finished_jobs_free_their_slot(db):
+    service = TrainingJobService(db)
+    first, second = service.submit("recommendation"), service.submit("lead_scoring")
+
+    assert service.claim(1) == [first.id]
+    assert service.claim(1) == []
+    service.finish(first.id, 1)
+    assert service.claim(1) == [second.id]
+    db.refresh(second)
+    assert second.slot == 0
+
+
+def test_submit_rejects_unknown_models(db):
+    with pytest.raises(ValueError):
+        TrainingJobService(db).submit("unknown")
+
+
+def test_cancel_queued_job_is_immediate(db):
+    service = TrainingJobService(db)
+    job = service.submit("lead_scoring")
+
+    service.request_cancel(job)
+
+    assert job.status == "cancelled"
+    assert job.finished_at is not None
+    assert service.claim(1) == []
+
+
+def test_cancel_running_job_is_recorded_when_its_worker_exits(db):
+    service = TrainingJobService(db)
+    job = service.submit("lead_scoring")
+    service.claim(1)
+
+    service.request_cancel(job)
+    assert (job.status, job.cancel_requested) == ("running", True)
+
+    assert service.finish(job.id, -15) == "cancelled"
+
+
+def test_crashed_worker_marks_job_failed(db):
+    service = TrainingJobService(db)
+    job = service.submit("lead_scoring")
+    service.claim(1)
+
+    assert service.finish(job.id, 1) == "failed"
+    db.refresh(job)
+    assert job.error == "Training worker exited with code 1"
+
+
+def test_finish_keeps_status_written_by_worker(db):
+    service = TrainingJobService(db)
+    job = service.submit("lead_scoring")
+    service.claim(1)
+    job.status = "succeeded"
+    db.commit()
+
+    assert service.finish(job.id, 0) == "succeeded"
+
+
+def test_reclaim_stale_closes_jobs_of_lost_runners(db):
+    service = TrainingJobService(db)
+    lost, lost_cancelled, alive = (service.submit("recommendation") for _ in range(3))
+    service.claim(3)
+    service.request_cancel(lost_cancelled)
+    now = datetime.utcnow()
+    for job in (lost, lost_cancelled):
+        job.heartbeat_at = now - timedelta(minutes=5)
+    db.commit()
+    service.heartbeat([alive.id])
+
+    assert service.reclaim_stale(60, now=now + timedelta(seconds=1)) == 2
+
+    for job in (lost, lost_cancelled, alive):
+        db.refresh(job)
+    assert lost.status == "failed"
+    assert lost.error.startswith("Training worker lost")
+    assert lost_cancelled.status == "cancelled"
+    assert alive.status == "running"
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """File database, since a training worker opens its own engine from the URL."""
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    yield url
+    engine.dispose()
+
+
+def run_job(database_url, job_id):
+    run_training_job(job_id, database_url, {"niceness": 0, "max_cpus": len(os.sched_getaffinity(0))})
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        return db.query(TrainingJob).filter(TrainingJob.id == job_id).one()
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def submit_running(database_url, model_name, params, cancel=False):
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        service = TrainingJobService(db)
+        job = service.submit(model_name, params)
+        service.claim(1)
+        if cancel:
+            service.request_cancel(job)
+        return job.id
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only")
+def test_worker_records_training_failure(database_url):
+    job_id = submit_running(database_url, "recommendation", {"mode": "full"})
+
+    job = run_job(database_url, job_id)
+
+    assert job.status == "failed"
+    assert job.error == "No leads available for training"
+    assert job.finished_at is not None
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only")
+def test_worker_stops_at_stage_boundary_when_cancelled(database_url):
+    job_id = submit_running(database_url, "recommendation", {"mode": "full"}, cancel=True)
+
+    job = run_job(database_url, job_id)
+
+    assert job.status == "cancelled"
+    assert job.model_id is None
+    assert json.loads(job.params) == {"mode": "full"}
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only")
+def test_worker_trains_from_a_training_data_file(database_url, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    leads = [Lead(email=f"lead{i}@example.com", first_name="Lead", last_name=str(i)) for i in range(8)]
+    db.add_all(leads)
+    db.commit()
+    training_data = [{"lead_id": lead.id, "converted": i % 2 == 0} for i, lead in enumerate(leads)]
+    db.close()
+    engine.dispose()
+
+    path = save_training_data(training_data)
+    job_id = submit_running(database_url, "lead_scoring", {"training_data_path": path})
+
+    job = run_job(database_url, job_id)
+
+    assert job.status == "succeeded", job.error
+    assert job.model_id is not None
+    assert not os.path.exists(path)